@@ -0,0 +1,251 @@
+"""Benchmarks of the Clinic Info Tool on synthetic Fac Lists.
+
+Each size gets a synthetic workbook (clinic_synth, generated once and kept
+in the data directory).  It is then loaded into the real ClinicInfoTool
+window under the offscreen Qt platform, and the handlers are timed:
+
+    load (parse)      workbook to ready window, empty parse cache
+    load (cache)      the same with the parse cache warm
+    load (snapshot)   the same from a published shared snapshot
+    update_groups, on_group_clicked, on_region_clicked, update_clinics,
+    get_clinic_info (Fac#), get_clinic_info (search), All Groups
+
+Every size runs in a fresh process with its own cache and snapshot
+directories, and with the clinic service and share replica turned off.
+Results are written as JSON, by default to bench_results.json in the data
+directory (CLINIC_TOOL_BENCH_DIR, or ClinicInfoTool-bench in the temp
+directory).  Given a baseline, operations whose median got slower than the
+tolerance allows are listed and the exit status is 1.
+
+There is no baseline in the repository: timings only compare on the same
+machine.  To check a change, run the benchmark on the commit before it to
+make the baseline, then on the change against it:
+
+    git worktree add ../clinic-base HEAD~1
+    python ../clinic-base/clinic_bench.py --output bench_baseline.json
+    python clinic_bench.py --baseline bench_baseline.json
+
+    python clinic_bench.py --sizes 1000 10000 --format csv --output bench.json
+"""
+
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from clinic_perf import rss_bytes
+
+SIZES = (1000, 10000, 100000)
+REPEAT = 20
+TOLERANCE = 0.25  # fraction slower than the baseline median that counts as a regression
+NOISE_FLOOR_MS = 1.0  # differences smaller than this are never regressions
+
+
+def data_dir():
+    base = os.environ.get('CLINIC_TOOL_BENCH_DIR')
+    if not base:
+        base = os.path.join(tempfile.gettempdir(), 'ClinicInfoTool-bench')
+    os.makedirs(base, exist_ok=True)
+    return base
+
+
+def workbook(rows, fmt='xlsx', groups=12, regions=6, areas=8, seed=0):
+    """Path of the synthetic workbook for these parameters, generating it the first time."""
+    from clinic_synth import generate, write
+
+    path = os.path.join(data_dir(), f'synth-{rows}-{groups}x{regions}x{areas}-s{seed}.{fmt}')
+    if not os.path.exists(path):
+        partial = os.path.join(data_dir(), f'.partial-{os.getpid()}.{fmt}')
+        write(generate(rows, groups, regions, areas, seed), partial)
+        os.replace(partial, path)
+    return path
+
+
+def _stats(samples):
+    ordered = sorted(samples)
+    return {
+        'median_ms': statistics.median(ordered) * 1000,
+        'min_ms': ordered[0] * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        'runs': len(ordered),
+    }
+
+
+def _bench_file(path, repeat):
+    """Time every operation on one workbook; runs in its own process."""
+    scratch = tempfile.mkdtemp(prefix='clinic-bench-')
+    os.environ.update({
+        'QT_QPA_PLATFORM': 'offscreen',
+        'CLINIC_TOOL_SERVICE': 'off',
+        'CLINIC_TOOL_REPLICA': 'off',
+        'CLINIC_TOOL_CACHE_DIR': os.path.join(scratch, 'cache'),
+        'CLINIC_TOOL_SNAPSHOT_DIR': os.path.join(scratch, 'snapshots'),
+    })
+    from PyQt5.QtCore import QEventLoop, QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    import clinic_tool3
+
+    app = QApplication.instance() or QApplication([])
+    results = {}
+
+    def open_tool():
+        start = time.perf_counter()
+        tool = clinic_tool3.ClinicInfoTool(path)
+        loop = QEventLoop()
+        failures = []
+        tool.data_ready.connect(loop.quit)
+        tool.load_failed.connect(lambda message: (failures.append(message), loop.quit()))
+        tool.show()
+        loop.exec_()
+        if failures:
+            raise RuntimeError(failures[0])
+        return tool, time.perf_counter() - start
+
+    def close(tool):
+        tool.close()
+        tool.loader.wait()
+        tool.deleteLater()
+        app.processEvents()
+
+    os.environ['CLINIC_TOOL_SNAPSHOT'] = 'off'
+    for name in ('load (parse)', 'load (cache)'):
+        tool, seconds = open_tool()
+        results[name] = _stats([seconds])
+        close(tool)
+    os.environ['CLINIC_TOOL_SNAPSHOT'] = 'on'
+    close(open_tool()[0])  # Publishes the snapshot
+    tool, seconds = open_tool()
+    results['load (snapshot)'] = _stats([seconds])
+
+    store = tool.store
+    groups = range(1, tool.group_model.rowCount())
+    facs = [store.fac_at(position) for position in range(0, len(store), max(len(store) // repeat, 1))]
+    areas = tool.hierarchy.areas
+
+    def region_click(i):
+        tool.on_group_clicked(tool.group_model.index(groups[i % len(groups)]))
+        return lambda: tool.on_region_clicked(tool.region_model.index(1 + i % (tool.region_model.rowCount() - 1)))
+
+    def lookup(text):
+        def run():
+            tool.clinic_number_input.setText(text)
+            tool.get_clinic_info()
+        return run
+
+    operations = {
+        'update_groups': lambda i: tool.update_groups,
+        'on_group_clicked': lambda i: lambda: tool.on_group_clicked(tool.group_model.index(groups[i % len(groups)])),
+        'on_region_clicked': region_click,
+        'update_clinics': lambda i: lambda: tool.update_clinics(areas[i * 7 % len(areas)]),
+        'get_clinic_info (Fac#)': lambda i: lookup(str(facs[i % len(facs)])),
+        'get_clinic_info (search)': lambda i: lookup(('boston dialysis', 'garcia', 'kidney center 3', 'oak')[i % 4]),
+        'All Groups': lambda i: lambda: tool.on_group_clicked(tool.group_model.index(0)),
+    }
+    for name, make in operations.items():
+        samples = []
+        for i in range(repeat):
+            tool.reset_to_defaults()
+            app.processEvents()
+            run = make(i)  # Any setup (such as the group click before a region click) is not timed
+            start = time.perf_counter()
+            run()
+            app.processEvents()
+            samples.append(time.perf_counter() - start)
+        results[name] = _stats(samples)
+
+    rows = len(store)
+    rss = rss_bytes()
+    browse_cache = tool.browse_cache.stats()
+    close(tool)
+    return {'rows': rows, 'rss_bytes': rss, 'browse_cache': browse_cache, 'operations': results}
+
+
+def run(sizes=SIZES, fmt='xlsx', repeat=REPEAT, groups=12, regions=6, areas=8):
+    from concurrent.futures import ProcessPoolExecutor
+
+    import pandas as pd
+    from PyQt5.QtCore import QT_VERSION_STR
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.processor(), 'pandas': pd.__version__, 'qt': QT_VERSION_STR},
+        'workbook': {'format': fmt, 'groups': groups, 'regions': regions, 'areas': areas},
+        'sizes': {},
+    }
+    for rows in sizes:
+        path = workbook(rows, fmt, groups, regions, areas)
+        # A fresh process per size, so one size's caches and heap do not skew the next.
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            report['sizes'][str(rows)] = pool.submit(_bench_file, path, repeat).result()
+    return report
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """(size, operation, baseline ms, current ms) for each operation slower than the baseline allows."""
+    regressions = []
+    for size, entry in report['sizes'].items():
+        before = baseline.get('sizes', {}).get(size, {}).get('operations', {})
+        for name, stats in entry['operations'].items():
+            if name not in before:
+                continue
+            old, new = before[name]['median_ms'], stats['median_ms']
+            if new > old * (1 + tolerance) and new - old > NOISE_FLOOR_MS:
+                regressions.append((size, name, old, new))
+    return regressions
+
+
+def format_report(report, baseline=None):
+    lines = []
+    for size, entry in report['sizes'].items():
+        before = (baseline or {}).get('sizes', {}).get(size, {}).get('operations', {})
+        lines.append(f"{int(size):,} rows (RSS {entry['rss_bytes'] / 1048576:.0f} MB)" if entry['rss_bytes']
+                     else f'{int(size):,} rows')
+        for name, stats in entry['operations'].items():
+            line = f"  {name:<26} {stats['median_ms']:10.2f} ms  (min {stats['min_ms']:.2f}, p95 {stats['p95_ms']:.2f})"
+            if name in before:
+                line += f"  baseline {before[name]['median_ms']:.2f} ms"
+            lines.append(line)
+        cache = entry.get('browse_cache')
+        if cache:
+            lines.append(f"  browse cache: {cache['hits']} hits, {cache['misses']} misses, "
+                         f"{cache['evictions']} evictions, {cache['bytes'] / 1048576:.1f} MB held")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Benchmark the Clinic Info Tool on synthetic Fac Lists')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help='rows per workbook')
+    parser.add_argument('--format', choices=('xlsx', 'xlsm', 'csv', 'parquet'), default='xlsx')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='runs of each handler')
+    parser.add_argument('--groups', type=int, default=12)
+    parser.add_argument('--regions', type=int, default=6, help='regions per group')
+    parser.add_argument('--areas', type=int, default=8, help='areas per region')
+    parser.add_argument('--output',
+                        help='where to write the results (default: bench_results.json in the data directory)')
+    parser.add_argument('--baseline', help='results JSON to compare against; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='fraction slower than the baseline median that counts as a regression')
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.format, args.repeat, args.groups, args.regions, args.areas)
+    output = args.output or os.path.join(data_dir(), 'bench_results.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {output}', file=sys.stderr)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print(format_report(report, baseline))
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        for size, name, old, new in regressions:
+            print(f'REGRESSION {int(size):,} rows {name}: {old:.2f} -> {new:.2f} ms', file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,106 @@
+"""The clinics the browse pane lists for each area, cached per data version.
+
+Clicking back and forth between areas asks for the same clinic lists again
+and again; with the clinic service each one is a round trip, and in process
+it gathers three columns.  The pane keeps what it was given in a
+least-recently-used cache keyed by (store version, area key), bounded by an
+estimate of the bytes it holds: CLINIC_TOOL_BROWSE_CACHE_MB megabytes, 64 by
+default; 0 turns the cache off.  A reload clears it, since entries of the
+previous version can never be hit again.  The latency overlay
+(Ctrl+Shift+L) shows its hit and miss counts.
+
+Only the clinic lists are cached.  The group, region and area panes list
+the children of a node straight from dictionaries in the hierarchy the
+window already holds, also for the service, so a cache in front of them
+would cost more than the lookup it saves.  Nor are the Qt models cached:
+set_clinics only hands the cached arrays to the one model the pane shows.
+"""
+
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CEILING_MB = 64
+SIZE_SAMPLE = 32  # Strings measured per object array
+
+
+def ceiling_bytes():
+    value = os.environ.get('CLINIC_TOOL_BROWSE_CACHE_MB', '')
+    try:
+        megabytes = float(value) if value.strip() else DEFAULT_CEILING_MB
+    except ValueError:
+        megabytes = DEFAULT_CEILING_MB
+    return max(int(megabytes * 1048576), 0)
+
+
+def size_of(value):
+    """Rough bytes held by a cached value: arrays, the strings in them, and tuples or lists of those.
+
+    The strings of an object array are estimated from an even sample of
+    SIZE_SAMPLE of them, so a miss costs the same however long the list.
+    Strings shared with the store count as if copied, so for an in-process
+    store the estimate errs high.
+    """
+    if isinstance(value, np.ndarray):
+        if value.dtype == object and len(value):
+            sample = value[::-(-len(value) // SIZE_SAMPLE)]
+            return value.nbytes + len(value) * sum(map(sys.getsizeof, sample.tolist())) // len(sample)
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class BrowseCache:
+    """A least-recently-used map bounded by the bytes its values hold.
+
+    ``hits``, ``misses`` and ``evictions`` count since the cache was made;
+    a value bigger than the whole ceiling is returned but not kept.
+    """
+
+    def __init__(self, ceiling=None):
+        self.ceiling = ceiling_bytes() if ceiling is None else ceiling
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, build):
+        """The value cached for ``key``, calling ``build()`` for it on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        value = build()
+        size = size_of(value)
+        if size <= self.ceiling:
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.ceiling:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self.size -= dropped
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def describe(self):
+        """e.g. 'Browse cache: 12 hits, 3 misses, 0 evictions; 1.2 of 64.0 MB'."""
+        return (f'Browse cache: {self.hits:,} hits, {self.misses:,} misses, {self.evictions:,} evictions; '
+                f'{self.size / 1048576:,.1f} of {self.ceiling / 1048576:,.1f} MB')
+
+    def stats(self):
+        return {
+            'entries': len(self._entries), 'bytes': self.size, 'ceiling': self.ceiling,
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+        }
@@ -0,0 +1,196 @@
+"""Local cache of parsed workbook sheets.
+
+Parsing the .xlsm with openpyxl is the slowest part of startup, so the parsed
+frame is stored on the local disk in a binary columnar format (Feather when
+pyarrow is installed, pickle otherwise).  Entries are keyed by the source
+path, size, mtime and a SHA-256 of the file contents; anything stale or
+unreadable is ignored and rewritten after a full parse.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+CACHE_VERSION = 1
+CHUNK_SIZE = 1 << 20
+
+
+def cache_dir():
+    base = os.environ.get('CLINIC_TOOL_CACHE_DIR')
+    if not base:
+        root = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+        base = os.path.join(root, 'ClinicInfoTool', 'cache')
+    os.makedirs(base, exist_ok=True)
+    return base
+
+
+def read_source(path, progress=None):
+    """Read the whole source file, returning (bytes, sha256 hex digest).
+
+    The bytes are parsed from memory afterwards, so a file on a slow share is
+    only transferred once.  ``progress(bytes_read, total)`` is called per chunk.
+    """
+    total = os.path.getsize(path)
+    digest = hashlib.sha256()
+    buffer = io.BytesIO()
+    done = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            buffer.write(chunk)
+            done += len(chunk)
+            if progress:
+                progress(done, total)
+    return buffer.getvalue(), digest.hexdigest()
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write(path, write):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class ParsedCache:
+    """One cached sheet.  ``variant`` names the post-processing applied to the
+    parsed frame, so entries written under an older schema are ignored."""
+
+    def __init__(self, source, sheet_name, variant='', directory=None):
+        self.source = os.path.abspath(source)
+        self.sheet_name = sheet_name
+        self.variant = variant
+        self.directory = directory or cache_dir()
+        key = hashlib.sha1(f'{self.source}|{sheet_name}'.lower().encode('utf-8')).hexdigest()[:20]
+        self.base_path = os.path.join(self.directory, key)
+        self.manifest_path = self.base_path + '.json'
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (manifest.get('version') != CACHE_VERSION or manifest.get('source') != self.source
+                or manifest.get('variant', '') != self.variant):
+            return None
+        return manifest
+
+    def _write_manifest(self, manifest):
+        def write(tmp):
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=1)
+        _atomic_write(self.manifest_path, write)
+
+    def load(self):
+        """Return the cached frame, or None on a miss, a stale entry or a corrupt file."""
+        manifest = self._read_manifest()
+        if manifest is None:
+            return None
+        try:
+            st = os.stat(self.source)
+        except OSError:
+            return None
+        if st.st_size != manifest['size']:
+            return None
+        if st.st_mtime_ns != manifest['mtime_ns']:
+            # Touched or re-copied; only trust the entry if the contents still match.
+            if file_digest(self.source) != manifest['sha256']:
+                return None
+            manifest['mtime_ns'] = st.st_mtime_ns
+            try:
+                self._write_manifest(manifest)
+            except OSError:
+                pass
+        try:
+            return self._read_frame(manifest['format'], manifest['data'])
+        except Exception:
+            return None
+
+    def _read_frame(self, fmt, name):
+        path = os.path.join(self.directory, name)
+        if fmt == 'feather':
+            return pd.read_feather(path)
+        return pd.read_pickle(path)
+
+    def save(self, df, sha256, size, mtime_ns):
+        """Write ``df`` for the source version described by the arguments."""
+        fmt, name = self._write_frame(df)
+        self._write_manifest({
+            'version': CACHE_VERSION,
+            'source': self.source,
+            'sheet': self.sheet_name,
+            'variant': self.variant,
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'sha256': sha256,
+            'format': fmt,
+            'data': name,
+        })
+
+    def _write_frame(self, df):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            pyarrow = None
+        if pyarrow is not None:
+            path = self.base_path + '.feather'
+            try:
+                _atomic_write(path, lambda tmp: df.to_feather(tmp))
+                return 'feather', os.path.basename(path)
+            except (ValueError, TypeError, pyarrow.ArrowException):
+                pass  # Mixed-type object columns; fall back to pickle below.
+        path = self.base_path + '.pkl'
+        _atomic_write(path, lambda tmp: df.to_pickle(tmp))
+        return 'pickle', os.path.basename(path)
+
+
+def read_cached(path, sheet_name, parse, progress=None, variant=''):
+    """Return ``parse(buffer, progress)`` for ``path``, served from the local cache when current.
+
+    ``parse`` receives the file contents as a BytesIO and must return the
+    finished frame; pass a new ``variant`` whenever its output changes.
+    ``progress(stage, done, total)`` is called with stage 'cache' on a hit, and
+    with 'read' (bytes) and 'parse' (rows) on a miss.
+    """
+    progress = progress or (lambda stage, done, total: None)
+    cache = ParsedCache(path, sheet_name, variant)
+    df = cache.load()
+    if df is not None:
+        progress('cache', len(df), len(df))
+        return df
+    st = os.stat(path)
+    data, sha256 = read_source(path, lambda done, total: progress('read', done, total))
+    progress('parse', 0, 0)
+    df = parse(io.BytesIO(data), progress)
+    progress('parse', len(df), len(df))
+    try:
+        cache.save(df, sha256, st.st_size, st.st_mtime_ns)
+    except OSError:
+        pass  # A read-only or full profile directory just means no cache.
+    return df
+
+
+def read_excel_cached(path, sheet_name, progress=None, prepare=None, variant='', **kwargs):
+    """``pd.read_excel`` for one sheet through the cache; ``prepare(df)`` post-processes a fresh parse."""
+    def parse(buffer, progress):
+        df = pd.read_excel(buffer, sheet_name=sheet_name, **kwargs)
+        return prepare(df) if prepare is not None else df
+
+    return read_cached(path, sheet_name, parse, progress, variant)
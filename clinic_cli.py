@@ -0,0 +1,163 @@
+"""Look up clinics from the command line, without Qt.
+
+Reads Fac#s (one per line) from the arguments, a file or stdin, and writes
+one record per Fac# with the fields the detail pane shows, as JSON lines or
+CSV.  Records are written as each Fac# is read, so memory stays flat however
+long the input is.  Lookups go to the clinic service when one is running;
+otherwise the parsed-data cache makes startup a cache read.
+
+With --near, the clinics nearest a ZIP are written instead, nearest first,
+each with its distance in miles (see clinic_geo for the ZIP table).
+
+    python clinic_cli.py 1001 1002
+    python clinic_cli.py -i tickets.txt -f csv -o clinics.csv
+    type facs.txt | python clinic_cli.py --workbook fac_list.xlsm
+    python clinic_cli.py --near 02118 --within 25
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+import numpy as np
+
+from clinic_data import DEFAULT_WORKBOOK, ZIP_COLUMN, FacIndex, load_fac_list, parse_fac, row_values
+from clinic_geo import GeoIndex, load_centroids
+from clinic_readers import ReaderError
+from clinic_replica import local_source
+from clinic_render import value_fields
+from clinic_service import connect
+
+
+def _read_facs(args):
+    if args.facs:
+        yield from args.facs
+        return
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8-sig')
+    try:
+        for line in source:
+            line = line.strip()
+            if line:
+                yield line
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+class Lookup:
+    """Fac# -> {label: value} from the clinic service, or over the cached Fac List."""
+
+    def __init__(self, workbook, reader=None, service=True):
+        self.store = connect(workbook) if service else None
+        if self.store is None:
+            # Only the Fac# index is needed, not a whole ClinicStore.
+            self.df = load_fac_list(local_source(workbook), reader=reader)
+            self.index = FacIndex(self.df)
+            self.geo = None
+        self.fields = value_fields()
+        self.columns = [column for _, columns, _ in self.fields for column in columns]
+        self.labels = ['Fac#'] + [label for label, _, _ in self.fields]
+
+    def record(self, text):
+        """The record for one Fac#, or None when there is no such clinic."""
+        fac = parse_fac(text)
+        if fac is None:
+            return None
+        if self.store is not None:
+            position = self.store.row(fac)
+            values = None if position is None else self.store.row_values(position, self.columns)
+        else:
+            position = self.index.get(fac)
+            values = None if position is None else row_values(self.df, position, self.columns)
+        if values is None:
+            return None
+        values = iter(values)
+        record = {'Fac#': fac}
+        for label, columns, value_format in self.fields:
+            record[label] = value_format.format(*(next(values) for _ in columns))
+        return record
+
+    def nearest(self, zip_code, count=None, radius=None):
+        """[(Fac#, miles)] of the clinics nearest a ZIP, nearest first; None when the ZIP cannot be placed."""
+        if self.store is not None:
+            found = self.store.nearest(zip_code, count, radius)
+            if found is None:
+                return None
+            rows, miles = found
+            facs = self.store.clinics_at(rows)[0]
+        else:
+            if self.geo is None:
+                centroids = load_centroids()
+                if centroids is None:
+                    return None
+                rows = np.flatnonzero(self.index.numbers >= 0)
+                self.geo = GeoIndex(self.df[ZIP_COLUMN].to_numpy(dtype=object)[rows], rows, centroids)
+            location = self.geo.centroids.get(zip_code)
+            if location is None:
+                return None
+            rows, miles = self.geo.nearest(*location, count, radius)
+            facs = self.index.numbers[rows]
+        return list(zip(facs.tolist(), miles.tolist()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Look up clinics by Fac# and print their details')
+    parser.add_argument('facs', nargs='*', help='Fac#s to look up; read from --input when none are given')
+    parser.add_argument('-i', '--input', default='-', help='file with one Fac# per line (default: stdin)')
+    parser.add_argument('-o', '--output', default='-', help='file to write (default: stdout)')
+    parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default='jsonl')
+    parser.add_argument('--workbook', default=DEFAULT_WORKBOOK,
+                        help='Fac List workbook, or a CSV/Parquet export of it (default: $CLINIC_TOOL_WORKBOOK or the shared workbook)')
+    parser.add_argument('--reader', help='reader engine (default: $CLINIC_TOOL_READER or auto)')
+    parser.add_argument('--no-service', action='store_true', help='load the workbook here even if the clinic service is running')
+    parser.add_argument('--near', metavar='ZIP', help='write the clinics nearest this ZIP instead')
+    parser.add_argument('--count', type=int, help='with --near: how many clinics (default 10 without --within)')
+    parser.add_argument('--within', type=float, metavar='MILES', help='with --near: every clinic within this distance')
+    args = parser.parse_args(argv)
+
+    try:
+        lookup = Lookup(args.workbook, args.reader, service=not args.no_service)
+    except (OSError, ReaderError) as e:
+        print(f'clinic_cli: cannot load {args.workbook}: {e}', file=sys.stderr)
+        return 2
+
+    distances = {}
+    if args.near:
+        nearest = lookup.nearest(args.near, args.count or (None if args.within else 10), args.within)
+        if nearest is None:
+            print(f'clinic_cli: no location for ZIP {args.near}', file=sys.stderr)
+            return 2
+        distances = dict(nearest)
+        facs = [fac for fac, _ in nearest]
+    else:
+        facs = _read_facs(args)
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    missing = 0
+    try:
+        if args.format == 'csv':
+            labels = lookup.labels + ['Miles'] if args.near else lookup.labels
+            writer = csv.DictWriter(out, fieldnames=labels, lineterminator='\n')
+            writer.writeheader()
+        for text in facs:
+            record = lookup.record(text)
+            if record is None:
+                missing += 1
+                print(f'clinic_cli: clinic {text} not found', file=sys.stderr)
+                record = {'Fac#': text}
+            if text in distances:
+                record['Miles'] = round(distances[text], 1)
+            if args.format == 'csv':
+                writer.writerow(record)  # Not-found rows keep their place with blank fields
+            else:
+                out.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if missing else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,986 @@
+"""Data layer for the Clinic Info Tool.
+
+Everything here runs without Qt so it can be used from a worker thread, and
+from scripts that never open a window.
+"""
+
+import gc
+import io
+import itertools
+import json
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from clinic_cache import ParsedCache, _atomic_write, read_cached, read_source
+from clinic_people import PeopleIndex
+from clinic_perf import format_bytes, latency, rss_bytes
+from clinic_readers import ENGINES, choose_engine, engines_for
+from clinic_replica import share_path
+from clinic_search import SearchIndex
+
+SHEET_NAME = 'Fac List'
+
+# The shared workbook the tool reads unless told otherwise.
+DEFAULT_WORKBOOK = os.environ.get('CLINIC_TOOL_WORKBOOK') or share_path('FMC Clinic Info Tool2-SW.xlsm')
+
+_versions = itertools.count(1)
+
+# Bump whenever apply_schema changes, so older cache entries are re-parsed.
+SCHEMA_VERSION = 3
+CACHE_VARIANT = f'schema-{SCHEMA_VERSION}'
+
+# The columns the tool uses; everything else on the sheet is skipped at read time.
+COLUMNS = (
+    'Fac#',
+    'Clinic Name',
+    'Address',
+    'City',
+    'State',
+    'Zip ',
+    'Clinic PH / FX',
+    'Clinic Manager',
+    'Area',
+    'Area Team Lead (ATL)',
+    'In-Center DO',
+    'REG',
+    'RVP',
+    'GRP',
+    'DIV',
+    'GVP Name',
+    'PAS Office Location',
+    'GVP/GM Assistant / Phone',
+    'RVP Admin Assist / Phone',
+    'Modalities Offered',
+    'Clinic Details',
+    'Clip / Ph / Fx',
+    'PAS Supervisor',
+    'PAS Supervisor Direct #',
+    'PAS Team Lead',
+    'PAS PICS',
+    'Medical Director',
+    'Isolation?',
+    'Escalation List (DO, RVP, HPSM, PAS TL, PAS Supervisor, etc)',
+    'Clinical Quality Manager',
+    'Educators',
+    'Revenue Center',
+    'FC Supervisor',
+    'Financial Coordinators',
+    'VP of Marketing Development',
+    'Dir of Marketing Development',
+    'Dir of HPS',
+    'Dir. of Commercial Integrations',
+    'HPSM',
+    'TOPS Coordinator',
+    'Social Worker',
+    'In-Center DO Phone',
+    'Home Therapy DO',
+    'Home Therapy DO Phone',
+    'GM Name',
+    'GM Cell',
+    'Commercial Extras',
+    'CIT Phone',
+    'HPSM Phone',
+    'RFA Extras',
+    'CVO Email for Blast',
+    'HT Group',
+    'Schedule Letter Extras',
+    'Sr. Manager SW Svcs',
+    'New Perm/NonFKC EIFs',
+    'Traveler EIFs',
+    'CVO Group',
+    'OnBase Queue',
+    'TCU',
+    'Transport Program',
+    'BC Case Manager',
+    'TCU Days/Week',
+    'KCA',
+    'Dietitian',
+    'Sr. Manager Clinical Quality',
+    'Sr. Manager Nutrition Svcs',
+    'Manager Nutrition Svcs',
+    'Manager SW Svcs',
+    'Sr. Manager Clinical Education',
+    'Clinical Educator',
+    'Clinic County',
+    'eCC Instance',
+    'CVO Special Note',
+    'PAS Manager',
+    'FAS Leadership',
+    'Senior HPSM',
+)
+COLUMN_SET = frozenset(COLUMNS)
+
+ZIP_COLUMN = 'Zip '
+
+# Text columns that repeat a handful of values across thousands of rows.
+CATEGORY_COLUMNS = (
+    'GRP', 'REG', 'Area', 'DIV', 'State', 'GVP Name', 'RVP', 'In-Center DO', 'Area Team Lead (ATL)',
+    'PAS Office Location', 'GVP/GM Assistant / Phone', 'RVP Admin Assist / Phone', 'Modalities Offered',
+    'Isolation?', 'HT Group', 'CVO Group', 'OnBase Queue', 'TCU', 'Transport Program', 'TCU Days/Week',
+    'KCA', 'eCC Instance', 'PAS Manager', 'FAS Leadership', 'GM Name', 'GM Cell',
+)
+
+# Columns that name people (staff and leadership), possibly several per cell.
+PEOPLE_COLUMNS = (
+    'Clinic Manager', 'Area Team Lead (ATL)', 'In-Center DO', 'RVP', 'GVP Name', 'GVP/GM Assistant / Phone',
+    'RVP Admin Assist / Phone', 'PAS Supervisor', 'PAS Team Lead', 'PAS PICS', 'Medical Director',
+    'Clinical Quality Manager', 'Educators', 'FC Supervisor', 'Financial Coordinators',
+    'VP of Marketing Development', 'Dir of Marketing Development', 'Dir of HPS', 'Dir. of Commercial Integrations',
+    'HPSM', 'TOPS Coordinator', 'Social Worker', 'Home Therapy DO', 'GM Name', 'Sr. Manager SW Svcs',
+    'BC Case Manager', 'Dietitian', 'Sr. Manager Clinical Quality', 'Sr. Manager Nutrition Svcs',
+    'Manager Nutrition Svcs', 'Manager SW Svcs', 'Sr. Manager Clinical Education', 'Clinical Educator',
+    'PAS Manager', 'FAS Leadership', 'Senior HPSM',
+)
+
+# Free-text search fields and their weights: a name hit outranks a staff hit.
+SEARCH_FIELDS = {'Clinic Name': 3.0, 'Address': 2.0, 'City': 2.0, 'State': 2.0, ZIP_COLUMN: 2.0}
+SEARCH_FIELDS.update({column: 1.0 for column in PEOPLE_COLUMNS})
+
+# Columns that make up the browse hierarchy; each gets a normalized key column.
+HIERARCHY_COLUMNS = ('GRP', 'REG', 'Area')
+
+# The clinic detail page, top to bottom, as (label, columns[, value format]).
+# The value format joins several columns; a single column shows as is.  Rows
+# without columns are headings, or a blank spacer when the label is empty.
+DETAIL_FIELDS = (
+    ('Clinic Name', ('Clinic Name',)),
+    ('Street', ('Address',)),
+    ('City, State, Zip', ('City', 'State', ZIP_COLUMN), '{}, {} {}'),
+    ('Phone', ('Clinic PH / FX',)),
+    ('Clinic Manager', ('Clinic Manager',)),
+    ('Area', ('Area',)),
+    ('Area Manager', ('Area Team Lead (ATL)',)),
+    ('DO', ('In-Center DO',)),
+    ('Region', ('REG',)),
+    ('RVP', ('RVP',)),
+    ('Group', ('GRP',)),
+    ('Division', ('DIV',)),
+    ('GVPO', ('GVP Name',)),
+    ('', ()),
+    ('Additional Info', ()),
+    ('PAS Office Location', ('PAS Office Location',)),
+    ('GVP/GM Assistant / Phone', ('GVP/GM Assistant / Phone',)),
+    ('RVP Admin Assist / Phone', ('RVP Admin Assist / Phone',)),
+    ('Modalities Offered', ('Modalities Offered',)),
+    ('Clinic Details', ('Clinic Details',)),
+    ('Clip / Ph / Fx', ('Clip / Ph / Fx',)),
+    ('PAS Supervisor', ('PAS Supervisor',)),
+    ('PAS Supervisor Direct #', ('PAS Supervisor Direct #',)),
+    ('PAS Team Lead', ('PAS Team Lead',)),
+    ('PAS PICS', ('PAS PICS',)),
+    ('Medical Director', ('Medical Director',)),
+    ('Isolation?', ('Isolation?',)),
+    ('Escalation List (DO, RVP, HPSM, PAS TL, PAS Supervisor, etc)', ('Escalation List (DO, RVP, HPSM, PAS TL, PAS Supervisor, etc)',)),
+    ('Clinical Quality Manager', ('Clinical Quality Manager',)),
+    ('Educators', ('Educators',)),
+    ('Revenue Center', ('Revenue Center',)),
+    ('FC Supervisor', ('FC Supervisor',)),
+    ('Financial Coordinators', ('Financial Coordinators',)),
+    ('VP of Marketing Development', ('VP of Marketing Development',)),
+    ('Dir of Marketing Development', ('Dir of Marketing Development',)),
+    ('Dir of HPS', ('Dir of HPS',)),
+    ('Dir. of Commercial Integrations', ('Dir. of Commercial Integrations',)),
+    ('HPSM', ('HPSM',)),
+    ('TOPS Coordinator', ('TOPS Coordinator',)),
+    ('Social Worker', ('Social Worker',)),
+    ('In-Center DO Phone', ('In-Center DO Phone',)),
+    ('Home Therapy DO', ('Home Therapy DO',)),
+    ('Home Therapy DO Phone', ('Home Therapy DO Phone',)),
+    ('GM Name', ('GM Name',)),
+    ('GM Cell', ('GM Cell',)),
+    ('Commercial Extras', ('Commercial Extras',)),
+    ('CIT Phone', ('CIT Phone',)),
+    ('HPSM Phone', ('HPSM Phone',)),
+    ('RFA Extras', ('RFA Extras',)),
+    ('CVO Email for Blast', ('CVO Email for Blast',)),
+    ('HT Group', ('HT Group',)),
+    ('Schedule Letter Extras', ('Schedule Letter Extras',)),
+    ('Sr. Manager SW Svcs', ('Sr. Manager SW Svcs',)),
+    ('New Perm/NonFKC EIFs', ('New Perm/NonFKC EIFs',)),
+    ('Traveler EIFs', ('Traveler EIFs',)),
+    ('CVO Group', ('CVO Group',)),
+    ('OnBase Queue', ('OnBase Queue',)),
+    ('TCU', ('TCU',)),
+    ('Transport Program', ('Transport Program',)),
+    ('BC Case Manager', ('BC Case Manager',)),
+    ('TCU Days/Week', ('TCU Days/Week',)),
+    ('KCA', ('KCA',)),
+    ('Dietitian', ('Dietitian',)),
+    ('Sr. Manager Clinical Quality', ('Sr. Manager Clinical Quality',)),
+    ('Sr. Manager Nutrition Svcs', ('Sr. Manager Nutrition Svcs',)),
+    ('Manager Nutrition Svcs', ('Manager Nutrition Svcs',)),
+    ('Manager SW Svcs', ('Manager SW Svcs',)),
+    ('Sr. Manager Clinical Education', ('Sr. Manager Clinical Education',)),
+    ('Clinical Educator', ('Clinical Educator',)),
+    ('Clinic County', ('Clinic County',)),
+    ('eCC Instance', ('eCC Instance',)),
+    ('CVO Special Note', ('CVO Special Note',)),
+    ('PAS Manager', ('PAS Manager',)),
+    ('FAS Leadership', ('FAS Leadership',)),
+    ('Senior HPSM', ('Senior HPSM',)),
+)
+
+
+def key_column(column):
+    """Name of the precomputed lowercase/stripped key column for ``column``."""
+    return f'{column}_key'
+
+
+def _cell_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # 5551234567.0 -> '5551234567'
+    return str(value)
+
+
+def _as_text(column):
+    column = column.astype(object)
+    if pd.api.types.infer_dtype(column, skipna=True) not in ('string', 'empty'):
+        column = column.map(_cell_text, na_action='ignore')
+    return column.where(column.notna(), np.nan)  # One missing marker, whichever reader ran
+
+
+def _as_zip(column):
+    text = _as_text(column)
+    # Numeric ZIPs lose their leading zeros in Excel ('2134' -> '02134').
+    short = text.str.fullmatch(r'\d{3,4}').fillna(False).astype(bool)
+    return text.mask(short, text.str.zfill(5))
+
+
+def apply_schema(df):
+    """Project, type and encode a raw 'Fac List' frame.
+
+    Fac# becomes a nullable integer, Zip a string, other columns text, and the
+    low-cardinality columns categoricals.  Columns missing from the sheet are
+    added empty, so lookups never hit a KeyError.
+    """
+    columns = {}
+    for column in COLUMNS:
+        if column not in df:
+            values = pd.Series(np.nan, index=df.index, dtype=object)
+        elif column == 'Fac#':
+            values = pd.to_numeric(df[column], errors='coerce')
+            values = values.where(values == values.round()).astype('Int64')
+        elif column == ZIP_COLUMN:
+            values = _as_zip(df[column])
+        else:
+            values = _as_text(df[column])
+        if column in CATEGORY_COLUMNS:
+            values = values.astype('category')
+        columns[column] = values
+    for column in HIERARCHY_COLUMNS:
+        columns[key_column(column)] = pd.Categorical(normalize_keys(columns[column]))
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(df)))
+
+
+def apply_text_schema(df):
+    """The generic counterpart of apply_schema for other reference sheets: every column as text."""
+    return pd.DataFrame({column: _as_text(df[column]) for column in df.columns}, index=pd.RangeIndex(len(df)))
+
+
+def parse_fac_list(source, engine, progress=None):
+    """Read the Fac List from ``source`` (a path or file object) with ``engine`` and normalize it."""
+    progress = progress or (lambda stage, done, total: None)
+    return apply_schema(engine.read(source, SHEET_NAME, COLUMN_SET, progress))
+
+
+def load_fac_list(excel_file, progress=None, reader=None):
+    """Load the Fac List through the local cache, reporting ``progress(stage, done, total)``.
+
+    ``reader`` names a clinic_readers engine; by default it is auto-detected.
+    """
+    engine = choose_engine(excel_file, reader)
+    return read_cached(
+        excel_file, SHEET_NAME, lambda buffer, progress: parse_fac_list(buffer, engine, progress),
+        progress=progress, variant=CACHE_VARIANT,
+    )
+
+
+def check_parity(paths):
+    """Read every path with every engine that supports it and compare the frames.
+
+    Returns a list of (path, engine, problem) tuples; empty when all agree.
+    """
+    problems = []
+    reference = None
+    for path in paths:
+        names = engines_for(path)
+        if not names:
+            problems.append((path, None, 'no installed engine can read this file'))
+        for name in names:
+            try:
+                df = parse_fac_list(path, ENGINES[name])
+            except Exception as e:
+                problems.append((path, name, f'{type(e).__name__}: {e}'))
+                continue
+            if reference is None:
+                reference = df
+                continue
+            try:
+                pd.testing.assert_frame_equal(reference, df)
+            except AssertionError as e:
+                problems.append((path, name, str(e).strip().splitlines()[0]))
+    return problems
+
+
+def _measure_load(excel_file, typed):
+    import openpyxl  # noqa: F401  (imported up front so it is not counted as frame memory)
+
+    data, _ = read_source(excel_file)
+    gc.collect()
+    before = rss_bytes()
+    if typed:
+        df = parse_fac_list(io.BytesIO(data), choose_engine(excel_file))
+    else:
+        df = pd.read_excel(io.BytesIO(data), sheet_name=SHEET_NAME, engine='openpyxl')
+    del data
+    gc.collect()
+    return {
+        'rss_before': before,
+        'rss_after': rss_bytes(),
+        'frame_bytes': int(df.memory_usage(deep=True).sum()),
+        'rows': len(df),
+        'columns': df.shape[1],
+    }
+
+
+def memory_report(excel_file):
+    """Parse the sheet raw (every column, as read) and through the schema.
+
+    Each parse runs in a fresh process so the resident set sizes before and
+    after are not skewed by the other.  The cache is bypassed.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    report = {}
+    for name, typed in (('raw', False), ('typed', True)):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            report[name] = pool.submit(_measure_load, excel_file, typed).result()
+    return report
+
+
+def format_memory_report(report):
+    lines = [f"Fac List rows: {report['raw']['rows']:,}"]
+    for name in ('raw', 'typed'):
+        entry = report[name]
+        grew = None
+        if entry['rss_after'] is not None and entry['rss_before'] is not None:
+            grew = entry['rss_after'] - entry['rss_before']
+        lines.append(
+            f"{name:>5}: {entry['columns']} columns, frame {format_bytes(entry['frame_bytes'])}, "
+            f"RSS {format_bytes(entry['rss_before'])} -> {format_bytes(entry['rss_after'])} "
+            f"(+{format_bytes(grew)})")
+    return '\n'.join(lines)
+
+
+def display_value(value):
+    """Cell value for display; missing values become an empty string."""
+    if pd.isna(value):
+        return ''
+    return value
+
+
+def normalize_keys(column):
+    """Lowercased, stripped keys for a text column.  Blank and non-text cells become ''."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Normalize each distinct value once, then expand through the codes.
+        keys = normalize_keys(pd.Series(column.cat.categories, dtype=object))
+        codes = column.cat.codes.to_numpy()
+        if not len(keys):  # Missing or blank column: every code is -1
+            return np.full(len(codes), '', dtype=object)
+        return np.where(codes >= 0, keys[codes], '').astype(object)
+    if not (pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column)):
+        return np.full(len(column), '', dtype=object)
+    return column.str.lower().str.strip().fillna('').to_numpy(dtype=object)
+
+
+class HierarchyIndex:
+    """Group -> Region -> Area -> clinic rows, built once per load.
+
+    Every browse click becomes a dictionary lookup: node keys are the
+    normalized column values, children lists are pre-sorted, and each node has
+    its display label (with the GVP, RVP or DO of its first row).
+    """
+
+    def __init__(self, df):
+        self.group_keys = self._keys(df, 'GRP')
+        self.region_keys = self._keys(df, 'REG')
+        self.area_keys = self._keys(df, 'Area')
+
+        self.group_labels = self._labels(df, self.group_keys, 'GVP Name', 'GVP')
+        self.region_labels = self._labels(df, self.region_keys, 'RVP', 'RVP')
+        self.area_labels = self._labels(df, self.area_keys, 'In-Center DO', 'DO')
+
+        self.groups = sorted(self.group_labels)
+        self.regions = sorted(self.region_labels)
+        self.areas = sorted(self.area_labels)
+        self.regions_by_group = self._children(self.group_keys, self.region_keys)
+        self.areas_by_region = self._children(self.region_keys, self.area_keys)
+        self.rows_by_area = {
+            key: rows for key, rows in pd.Series(self.area_keys).groupby(self.area_keys, sort=False).indices.items()
+            if key
+        }
+
+    @staticmethod
+    def _keys(df, column):
+        if key_column(column) in df:
+            return df[key_column(column)].to_numpy(dtype=object)
+        if column not in df:
+            return np.full(len(df), '', dtype=object)
+        return normalize_keys(df[column])
+
+    @staticmethod
+    def _labels(df, keys, label_column, prefix):
+        first = (keys != '') & ~pd.Series(keys).duplicated().to_numpy()
+        if label_column in df:
+            names = df[label_column].to_numpy()[first]
+        else:
+            names = [''] * int(first.sum())
+        return {key: f'{key.title()} ({prefix}: {display_value(name)})' for key, name in zip(keys[first], names)}
+
+    @staticmethod
+    def _children(parent_keys, child_keys):
+        pairs = pd.DataFrame({'parent': parent_keys, 'child': child_keys})
+        pairs = pairs[(pairs['parent'] != '') & (pairs['child'] != '')].drop_duplicates()
+        children = {}
+        for parent, child in zip(pairs['parent'], pairs['child']):
+            children.setdefault(parent, []).append(child)
+        for keys in children.values():
+            keys.sort()
+        return children
+
+    NODES = ('groups', 'regions', 'areas', 'regions_by_group', 'areas_by_region',
+             'group_labels', 'region_labels', 'area_labels')
+
+    def state(self):
+        """(arrays, meta): per-row keys and the area rows as arrays, the small node tables as a dict."""
+        names = list(self.rows_by_area)
+        parts = [self.rows_by_area[name] for name in names]
+        arrays = {
+            'group_keys': np.asarray(self.group_keys, dtype=str),
+            'region_keys': np.asarray(self.region_keys, dtype=str),
+            'area_keys': np.asarray(self.area_keys, dtype=str),
+            'area_rows': np.concatenate(parts).astype(np.intp) if parts else np.empty(0, dtype=np.intp),
+            'area_offsets': np.cumsum([0] + [len(rows) for rows in parts]).astype(np.int64),
+        }
+        meta = {name: getattr(self, name) for name in self.NODES}
+        meta['area_order'] = names
+        return arrays, meta
+
+    @classmethod
+    def from_state(cls, arrays, meta):
+        index = cls.__new__(cls)
+        for name in ('group_keys', 'region_keys', 'area_keys'):
+            setattr(index, name, arrays[name])
+        for name in cls.NODES:
+            setattr(index, name, meta[name])
+        rows, offsets = arrays['area_rows'], arrays['area_offsets']
+        index.rows_by_area = {name: rows[offsets[i]:offsets[i + 1]] for i, name in enumerate(meta['area_order'])}
+        return index
+
+    def path(self, position):
+        """(group, region, area) keys of one row; '' where the row has none."""
+        return str(self.group_keys[position]), str(self.region_keys[position]), str(self.area_keys[position])
+
+    def clinic_rows(self, area=None):
+        """Row positions for one area, or for every row when ``area`` is None."""
+        if area is None:
+            return np.arange(len(self.area_keys))
+        return self.rows_by_area.get(area, np.empty(0, dtype=np.intp))
+
+    def node_rows(self, level, key=None):
+        """Row positions under one 'group', 'region' or 'area' key, or every row when ``key`` is None."""
+        if level == 'area' or key is None:
+            return self.clinic_rows(key)
+        keys = {'group': self.group_keys, 'region': self.region_keys}[level]
+        return np.flatnonzero(keys == key)
+
+
+def row_values(df, position, columns):
+    """Display values of ``columns`` for one row of ``df``; missing cells and columns are ''."""
+    row = df.iloc[position]
+    return [display_value(row.get(column)) for column in columns]
+
+
+def parse_fac(value):
+    """Fac# as an int, or None if ``value`` is not a clinic number."""
+    try:
+        fac = int(str(value).strip())
+    except ValueError:
+        return None
+    return fac if fac >= 0 else None
+
+
+class FacIndex:
+    """Fac# -> row position with integer keys.
+
+    When a Fac# appears on more than one row the first row wins, as with the
+    old ``df.loc[df['Fac#'] == n].values[0]`` lookups.
+    """
+
+    def __init__(self, df):
+        if 'Fac#' in df:
+            numbers = pd.to_numeric(df['Fac#'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        else:
+            numbers = np.full(len(df), np.nan)
+        valid = (numbers >= 0) & (numbers == np.floor(numbers))
+        # Per-row Fac# as int64, -1 where the cell is not a clinic number.
+        self.numbers = np.where(valid, numbers, -1).astype(np.int64)
+        self.keys, first = np.unique(self.numbers, return_index=True)
+        self.rows = first.astype(np.intp)
+        if len(self.keys) and self.keys[0] == -1:
+            self.keys, self.rows = self.keys[1:], self.rows[1:]
+        # Fac# text in string order, so every Fac# starting with a typed
+        # prefix is one contiguous range found by bisection.
+        texts = self.keys.astype(str)
+        order = np.argsort(texts, kind='stable')
+        self.texts = texts[order]
+        self.text_rows = self.rows[order]
+
+    ARRAYS = ('numbers', 'keys', 'rows', 'texts', 'text_rows')
+
+    def state(self):
+        """(arrays, meta): the index as named NumPy arrays plus a small JSON-able dict."""
+        return {name: getattr(self, name) for name in self.ARRAYS}, {}
+
+    @classmethod
+    def from_state(cls, arrays, meta):
+        index = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(index, name, arrays[name])
+        return index
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, fac):
+        return self.get(fac) is not None
+
+    def get(self, fac):
+        """Row position for ``fac``, or None."""
+        if not 0 <= fac < 2 ** 63:
+            return None
+        i = int(np.searchsorted(self.keys, fac))
+        if i < len(self.keys) and self.keys[i] == fac:
+            return int(self.rows[i])
+        return None
+
+    def prefix_rows(self, prefix, limit=None):
+        """Row positions of the clinics whose Fac# text starts with ``prefix``, in Fac# text order."""
+        lo, hi = np.searchsorted(self.texts, [prefix, prefix + ':'])  # ':' sorts right after '9'
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self.text_rows[lo:hi]
+
+    def rows_for(self, facs):
+        """Row positions for an array of known Fac# values."""
+        return self.rows[np.searchsorted(self.keys, facs)]
+
+
+class ClinicStore:
+    """The loaded Fac List frame together with its lookup indexes.
+
+    ``version`` is unique per load within the process, for keying caches, and
+    ``source_stat`` is the (size, mtime_ns) of the file the data came from.
+
+    The GUI and CLI only use the query methods below, which take and return
+    plain values and arrays, so clinic_service.RemoteStore can stand in for
+    a store loaded by another process.
+    """
+
+    def __init__(self, df, progress=None, source_stat=None, indexes=None):
+        progress = progress or (lambda stage, done, total: None)
+        self.df = df
+        self.version = next(_versions)
+        self.source_stat = source_stat
+        self._geo = None
+        self._geo_built = False
+        self._geo_lock = threading.Lock()
+        if indexes is not None:
+            # Already built, e.g. mapped from a clinic_snapshot
+            self.hierarchy, self.fac_index, self.search_index, self.people_index = indexes
+            return
+        progress('index', 0, 4)
+        self.hierarchy = HierarchyIndex(df)
+        progress('index', 1, 4)
+        self.fac_index = FacIndex(df)
+        progress('index', 2, 4)
+        self.search_index = SearchIndex(df, SEARCH_FIELDS)
+        progress('index', 3, 4)
+        self.people_index = PeopleIndex(df, PEOPLE_COLUMNS)
+        progress('index', 4, 4)
+
+    def __len__(self):
+        return len(self.df)
+
+    def has_column(self, name):
+        return name in self.df
+
+    def _gather(self, name, positions):
+        if name in self.df:
+            return self.df[name].iloc[positions].to_numpy(dtype=object)
+        return np.full(len(positions), '', dtype=object)
+
+    def row(self, fac):
+        """Row position for a Fac# (int or text), or None if there is no such clinic."""
+        fac = parse_fac(fac)
+        return None if fac is None else self.fac_index.get(fac)
+
+    def fac_at(self, position):
+        """Fac# of the row at ``position``, or None when the row has no valid Fac#."""
+        fac = int(self.fac_index.numbers[position])
+        return fac if fac >= 0 else None
+
+    def browse_tree(self):
+        """The hierarchy's node lists, children and labels, for building the browse panes."""
+        hierarchy = self.hierarchy
+        return {
+            'groups': hierarchy.groups,
+            'regions': hierarchy.regions,
+            'areas': hierarchy.areas,
+            'regions_by_group': hierarchy.regions_by_group,
+            'areas_by_region': hierarchy.areas_by_region,
+            'group_labels': hierarchy.group_labels,
+            'region_labels': hierarchy.region_labels,
+            'area_labels': hierarchy.area_labels,
+        }
+
+    @latency.timed('store.area_clinics')
+    def area_clinics(self, area=None):
+        """clinic_table() for the clinics in one area, or in every area when ``area`` is None."""
+        return self.clinic_table(self.hierarchy.clinic_rows(area))
+
+    def clinic_table(self, rows):
+        """Unique clinics among ``rows`` as (Fac#, clinic name, clinic manager) arrays.
+
+        Clinics are ordered by Fac# text, the order the clinics list has always
+        shown, and the other two columns come from one gather per column.
+        """
+        return self.clinics_at(self._listed(rows))
+
+    def _listed(self, rows):
+        """One row per clinic among ``rows``, in clinics-list order (by Fac# text)."""
+        facs = self.fac_index.numbers[rows]
+        facs = np.unique(facs[facs >= 0])
+        facs = facs[np.argsort(facs.astype(str), kind='stable')]
+        return self.fac_index.rows_for(facs)
+
+    @latency.timed('store.node_rows')
+    def node_rows(self, level, key=None):
+        """Row positions of the clinics under a browse node, in the order the clinics list shows them.
+
+        ``level`` is 'group', 'region' or 'area'; ``key`` None means every clinic.
+        """
+        return self._listed(self.hierarchy.node_rows(level, key))
+
+    def node_path(self, position):
+        """(group, region, area) browse keys of one clinic; '' where it has none."""
+        return self.hierarchy.path(position)
+
+    def clinics_at(self, positions):
+        """(Fac#, clinic name, clinic manager) arrays for row positions, in the given order."""
+        facs = self.fac_index.numbers[positions]
+        return facs, self._gather('Clinic Name', positions), self._gather('Clinic Manager', positions)
+
+    def fac_prefix(self, text, limit=50):
+        """Row positions of the clinics whose Fac# starts with the digits in ``text``."""
+        text = str(text).strip()
+        if not text.isdigit():
+            return np.empty(0, dtype=np.intp)
+        return self.fac_index.prefix_rows(text, limit)
+
+    def row_values(self, position, columns):
+        """Display values of ``columns`` for one row; missing cells and columns are ''."""
+        return row_values(self.df, position, columns)
+
+    def column_values(self, positions, columns):
+        """Display values of ``columns`` for many rows, as one list per column; missing cells are ''.
+
+        Callers export large selections a chunk of positions at a time.
+        """
+        values = []
+        for column in columns:
+            gathered = self._gather(column, positions)
+            gathered[pd.isna(gathered)] = ''
+            values.append(gathered.tolist())
+        return values
+
+    @property
+    def geo_index(self):
+        """clinic_geo.GeoIndex of the clinics, built on first use; None when there is no ZIP centroid table."""
+        with self._geo_lock:
+            if not self._geo_built:
+                from clinic_geo import GeoIndex, load_centroids
+
+                centroids = load_centroids()
+                if centroids is not None:
+                    rows = np.flatnonzero(self.fac_index.numbers >= 0)
+                    self._geo = GeoIndex(self._gather(ZIP_COLUMN, rows), rows, centroids)
+                self._geo_built = True
+            return self._geo
+
+    @latency.timed('store.nearest')
+    def nearest(self, zip_code, count=None, radius=None):
+        """(row positions, miles) of the clinics nearest a ZIP, nearest first.
+
+        ``count`` caps the number of clinics and ``radius`` the distance in
+        miles; at least one must be given.  None when the ZIP cannot be
+        placed (not a ZIP, not in the centroid table, or no table at all).
+        """
+        geo = self.geo_index
+        location = None if geo is None else geo.centroids.get(zip_code)
+        if location is None:
+            return None
+        return geo.nearest(*location, count, radius)
+
+    @latency.timed('store.people')
+    def people(self, query, limit=50):
+        """(person ids, names, clinic counts) of the people best matching a name, best first."""
+        index = self.people_index
+        people = index.find(query, limit) if query.strip() else np.empty(0, dtype=np.intp)
+        return people, index.names[people].astype(object), index.clinic_counts[people]
+
+    def person_roles(self, person):
+        """[(role, number of clinics)] for one person, in PEOPLE_COLUMNS order."""
+        index = self.people_index
+        counts = np.bincount(index.postings(person)[1], minlength=len(index.role_names))
+        return [(role, int(count)) for role, count in zip(index.role_names, counts) if count]
+
+    @latency.timed('store.person_clinics')
+    def person_clinics(self, person, roles=None):
+        """(row positions, roles) of the clinics naming one person, in clinics-list order.
+
+        ``roles`` limits the match to those columns; a clinic's roles are
+        given as one text, e.g. 'RVP, GVP Name'.
+        """
+        index = self.people_index
+        wanted = None if roles is None else [index.role_names.index(role) for role in roles
+                                             if role in index.role_names]
+        rows, found = index.postings(person, wanted)
+        by_fac = {}
+        for fac, role in zip(self.fac_index.numbers[rows].tolist(), found.tolist()):
+            by_fac.setdefault(fac, []).append(index.role_names[role])
+        listed = self._listed(rows)
+        facs = self.fac_index.numbers[listed].tolist()
+        return listed, [', '.join(dict.fromkeys(by_fac[fac])) for fac in facs]
+
+    @latency.timed('store.search')
+    def search(self, query, limit=50):
+        """Row positions of the clinics best matching free text, best first.
+
+        Matches clinic name, address, city, state, ZIP and staff names, and
+        tolerates partial words and typos.
+        """
+        rows, _ = self.search_index.search(query, limit * 2)
+        rows = rows[self.fac_index.numbers[rows] >= 0]  # Only rows that can be opened by Fac#
+        return rows[:limit]
+
+
+def source_stat(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+# A ClinicStore's indexes by attribute, in the order ClinicStore(indexes=...) takes them.
+INDEXES = {
+    'hierarchy': HierarchyIndex, 'fac_index': FacIndex, 'search_index': SearchIndex, 'people_index': PeopleIndex,
+}
+INDEX_CACHE_FORMAT = 1
+
+
+def _index_cache_path(excel_file):
+    return ParsedCache(excel_file, SHEET_NAME, CACHE_VARIANT).base_path + '.indexes.npz'
+
+
+def save_indexes(store, excel_file):
+    """Keep ``store``'s index state beside its parse-cache entry, for read_indexes on the next start."""
+    meta = {'format': INDEX_CACHE_FORMAT, 'source_stat': list(store.source_stat), 'rows': len(store), 'indexes': {}}
+    arrays = {}
+    for name in INDEXES:
+        index_arrays, index_meta = getattr(store, name).state()
+        for array_name, array in index_arrays.items():
+            arrays[f'{name}.{array_name}'] = np.ascontiguousarray(array)
+        meta['indexes'][name] = {'arrays': list(index_arrays), 'meta': index_meta}
+    arrays['meta'] = np.array(json.dumps(meta))
+
+    def write(tmp):
+        with open(tmp, 'wb') as f:  # A file object, or savez would add .npz to the name
+            np.savez(f, **arrays)
+
+    _atomic_write(_index_cache_path(excel_file), write)
+
+
+def read_indexes(excel_file, stat, rows):
+    """The indexes save_indexes kept for this (size, mtime_ns) and row count, or None."""
+    try:
+        with np.load(_index_cache_path(excel_file), allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if (meta['format'] != INDEX_CACHE_FORMAT or tuple(meta['source_stat']) != tuple(stat)
+                    or meta['rows'] != rows):
+                return None
+            indexes = []
+            for name, cls in INDEXES.items():
+                info = meta['indexes'][name]
+                arrays = {array_name: data[f'{name}.{array_name}'] for array_name in info['arrays']}
+                indexes.append(cls.from_state(arrays, info['meta']))
+            return tuple(indexes)
+    except Exception:
+        return None  # Missing, damaged or from another version of the tool: built afresh and saved again
+
+
+def load_clinic_store(excel_file, progress=None, reader=None, origin=None):
+    """The clinic data for ``excel_file``.
+
+    A current shared snapshot is mapped when there is one; otherwise the
+    workbook is parsed and indexed here and published as the new snapshot.
+    ``origin`` is the share path when ``excel_file`` is a local replica, so
+    every replica of it shares one snapshot.  Where there are no snapshots
+    (no pyarrow, turned off, or an unwritable directory), the indexes are
+    kept beside the parse cache instead, so a cache hit does not build them.
+    """
+    from clinic_snapshot import open_snapshot, publish
+
+    progress = progress or (lambda stage, done, total: None)
+    stat = source_stat(excel_file)
+    store = open_snapshot(origin or excel_file, stat)
+    if store is not None:
+        progress('snapshot', len(store), len(store))
+        return store
+    df = load_fac_list(excel_file, progress, reader)
+    indexes = read_indexes(excel_file, stat, len(df))
+    store = ClinicStore(df, progress, stat, indexes)
+    if indexes is None:
+        try:
+            save_indexes(store, excel_file)
+        except (OSError, ValueError):
+            pass  # As with the parse cache, a read-only or full profile directory just means no cache
+    return publish(store, origin or excel_file) or store
+
+
+def _compare_text(values):
+    """Cells as the text the diff compares: missing and blank cells are both ''."""
+    return np.array([str(display_value(value)) for value in values], dtype=object)
+
+
+def _member(keys, values):
+    """``np.isin(values, keys)`` for sorted unique ``keys``; several times faster than np.isin at 100k."""
+    if not len(keys):
+        return np.zeros(len(values), dtype=bool)
+    at = np.minimum(np.searchsorted(keys, values), len(keys) - 1)
+    return keys[at] == values
+
+
+def gathered_changes(old, new, column, old_rows, new_rows):
+    """(positions, old text, new text) where ``column`` differs between the rows, via the stores' _gather."""
+    old_values = old._gather(column, old_rows)
+    new_values = new._gather(column, new_rows)
+    # The object comparison is cheap; only the cells it flags are turned into text.
+    at = np.flatnonzero((old_values != new_values).astype(bool))
+    old_text, new_text = _compare_text(old_values[at]), _compare_text(new_values[at])
+    keep = old_text != new_text  # NaN != NaN, and a blank cell equals a missing one
+    return at[keep], old_text[keep], new_text[keep]
+
+
+# What changed between two versions, keyed by Fac#: the Fac#s only in the new
+# one and only in the old one, and for each column with differences in the
+# clinics in both, (column, Fac#s, old text, new text), in sheet order.
+FacDiff = namedtuple('FacDiff', 'added removed fields')
+
+
+def compare_stores(old, new, column_changes=gathered_changes, map_columns=map):
+    """FacDiff of two stores, one vectorized comparison per column.
+
+    This is the one diff the tool has: diff_stores and the change history
+    both summarize it.  Cells are compared as text, a blank cell being the
+    same as a missing one, and a column only one side has is not compared.
+    ``column_changes(old, new, column, old_rows, new_rows)`` compares one
+    column; clinic_history passes one that compares in Arrow, and a thread
+    pool's map for ``map_columns``.
+    """
+    old_keys, new_keys = old.fac_index.keys, new.fac_index.keys
+    in_old = _member(old_keys, new_keys)
+    added, common = new_keys[~in_old], new_keys[in_old]
+    removed = old_keys[~_member(new_keys, old_keys)]
+    old_rows = old.fac_index.rows_for(common)
+    new_rows = new.fac_index.rows_for(common)
+
+    columns = [column for column in COLUMNS
+               if column != 'Fac#' and old.has_column(column) and new.has_column(column)]
+    found = map_columns(lambda column: column_changes(old, new, column, old_rows, new_rows), columns)
+    fields = [(column, common[at], old_text, new_text)
+              for column, (at, old_text, new_text) in zip(columns, found) if len(at)]
+    return FacDiff(added, removed, fields)
+
+
+class StoreDiff:
+    """Clinics added, removed and changed between two loads, keyed by Fac#.
+
+    ``groups``, ``regions`` and ``areas`` hold the hierarchy keys those
+    clinics belong to, in either version.
+    """
+
+    def __init__(self, added, removed, changed, groups, regions, areas):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.groups = groups
+        self.regions = regions
+        self.areas = areas
+
+    @property
+    def empty(self):
+        return not (len(self.added) or len(self.removed) or len(self.changed))
+
+    def touches(self, fac):
+        return fac in self.added or fac in self.removed or fac in self.changed
+
+    def __str__(self):
+        return f'{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed'
+
+    def as_dict(self):
+        return {name: sorted(getattr(self, name)) for name in ('added', 'removed', 'changed', 'groups', 'regions', 'areas')}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*(set(data[name]) for name in ('added', 'removed', 'changed', 'groups', 'regions', 'areas')))
+
+
+def diff_stores(old, new):
+    """compare_stores as a StoreDiff: the Fac#s, and the hierarchy keys they belong to."""
+    diff = compare_stores(old, new)
+    added, removed = diff.added, diff.removed
+    changed = np.unique(np.concatenate([facs for _, facs, _, _ in diff.fields])) if diff.fields else added[:0]
+
+    old_touched = old.fac_index.rows_for(np.concatenate([removed, changed]))
+    new_touched = new.fac_index.rows_for(np.concatenate([added, changed]))
+
+    def touched(attribute):
+        keys = set(getattr(old.hierarchy, attribute)[old_touched]) | set(getattr(new.hierarchy, attribute)[new_touched])
+        keys.discard('')
+        return keys
+
+    return StoreDiff(set(added.tolist()), set(removed.tolist()), set(changed.tolist()),
+                     touched('group_keys'), touched('region_keys'), touched('area_keys'))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Clinic Info Tool data checks')
+    parser.add_argument('files', nargs='+', help='Fac List workbook, or CSV/Parquet exports of it')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='compare memory use of the raw and schema-typed Fac List')
+    parser.add_argument('--parity', action='store_true',
+                        help='check that every reader engine produces the same frame from FILES')
+    args = parser.parse_args()
+    if args.memory_report:
+        print(format_memory_report(memory_report(args.files[0])))
+    if args.parity:
+        problems = check_parity(args.files)
+        for path, engine, problem in problems:
+            print(f'{path} [{engine}]: {problem}')
+        print('Readers disagree' if problems else 'All readers agree')
+        raise SystemExit(1 if problems else 0)
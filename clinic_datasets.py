@@ -0,0 +1,203 @@
+"""The other reference sheets and workbooks that sit beside the Fac List.
+
+The catalog lists every visible sheet of the workbook (other than the Fac
+List) and of the workbooks and exports in the same directory, without
+parsing any of them: sheet names come from each workbook's
+xl/workbook.xml.  A dataset is parsed the first time it is asked for,
+through the local replica and the parse cache like the Fac List, and gets a
+full-text index over its columns, plus a Fac# index when it has a Fac#
+column.  Loads run in a process pool, so sources asked for together load
+in parallel and none of them is on the startup path.
+
+    python clinic_datasets.py --list
+    python clinic_datasets.py "Escalations" "Holidays.xlsx/2026"
+"""
+
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from clinic_cache import read_cached
+from clinic_data import SHEET_NAME, FacIndex, apply_text_schema, display_value
+from clinic_readers import ALL_COLUMNS, EXCEL_EXTENSIONS, choose_engine, sheet_names
+from clinic_replica import local_source
+from clinic_search import SearchIndex
+
+# Bump whenever apply_text_schema or Dataset changes, so older cache entries are re-parsed.
+DATASET_SCHEMA = 1
+DATA_EXTENSIONS = EXCEL_EXTENSIONS + ('.csv', '.parquet')
+LOAD_WORKERS = min(4, os.cpu_count() or 1)
+
+# ``key`` names the dataset in the registry; ``sheet`` is None for CSV and Parquet exports.
+DatasetInfo = namedtuple('DatasetInfo', 'key path sheet title')
+
+
+def catalog(workbook, directory=None):
+    """DatasetInfo for every other sheet of ``workbook`` and every sheet of the data files beside it."""
+    directory = directory or os.path.dirname(workbook)
+    paths = [workbook]
+    try:
+        names = sorted(entry.name for entry in os.scandir(directory) if entry.is_file())
+    except OSError:
+        names = []
+    workbook_name = os.path.basename(workbook)
+    for name in names:
+        if name.startswith('~$') or name == workbook_name:
+            continue  # Excel lock files
+        if os.path.splitext(name)[1].lower() in DATA_EXTENSIONS:
+            paths.append(os.path.join(directory, name))
+
+    infos = []
+    for path in paths:
+        name = os.path.basename(path)
+        try:
+            # The workbook is replicated already; for the others, reading
+            # xl/workbook.xml off the share is cheaper than copying them.
+            sheets = sheet_names(local_source(path, refresh=False) if path == workbook else path)
+        except Exception:
+            continue  # Unreadable or unreachable files are left out of the catalog
+        for sheet in sheets:
+            if path == workbook and sheet == SHEET_NAME:
+                continue
+            if sheet is None:
+                infos.append(DatasetInfo(name, path, None, os.path.splitext(name)[0]))
+            elif path == workbook:
+                infos.append(DatasetInfo(sheet, path, sheet, sheet))
+            else:
+                infos.append(DatasetInfo(f'{name}/{sheet}', path, sheet, f'{sheet} ({name})'))
+    return infos
+
+
+class Dataset:
+    """One loaded reference sheet: its rows as text plus its indexes."""
+
+    def __init__(self, info, df):
+        self.info = info
+        self.df = df
+        self.columns = [str(column) for column in df.columns]
+        self.search_index = SearchIndex(df, {column: 1.0 for column in df.columns})
+        self.fac_index = FacIndex(df) if 'Fac#' in df else None
+
+    def __len__(self):
+        return len(self.df)
+
+    def cell(self, position, column):
+        """Display text of one cell, by row position and column number."""
+        return str(display_value(self.df.iat[position, column]))
+
+    def filter(self, query, limit=500):
+        """Row positions matching ``query``: Fac# prefixes for digits when there is a Fac# column, else full text."""
+        query = query.strip()
+        if not query:
+            return np.arange(min(len(self), limit) if limit else len(self))
+        if query.isdigit() and self.fac_index is not None:
+            rows = self.fac_index.prefix_rows(query, limit)
+            if len(rows):
+                return rows
+        return self.search_index.search(query, limit)[0]
+
+
+def load_dataset(info, reader=None):
+    """Parse and index one dataset; runs in a worker process."""
+    path = local_source(info.path)
+    engine = choose_engine(path, reader)
+    df = read_cached(
+        path, info.sheet or '', lambda buffer, progress: apply_text_schema(
+            engine.read(buffer, info.sheet, ALL_COLUMNS, progress)),
+        variant=f'dataset-{DATASET_SCHEMA}',
+    )
+    return Dataset(info, df)
+
+
+class DatasetRegistry:
+    """The catalog plus the datasets loaded so far, for one session.
+
+    ``request(key)`` returns a Future for the loaded Dataset and starts the
+    load the first time a key is asked for; a failed or cancelled load is
+    retried on the next request.  Everything here is safe to call from any thread.
+    """
+
+    def __init__(self, workbook, directory=None, workers=LOAD_WORKERS, reader=None):
+        self.workbook = workbook
+        self.directory = directory
+        self.workers = workers
+        self.reader = reader
+        self._infos = None
+        self._futures = {}
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def catalog(self):
+        """Every dataset available, listed once per session."""
+        with self._lock:
+            if self._infos is None:
+                self._infos = {info.key: info for info in catalog(self.workbook, self.directory)}
+            return list(self._infos.values())
+
+    def request(self, key):
+        infos = {info.key: info for info in self.catalog()}
+        if key not in infos:
+            raise KeyError(f'No dataset named {key!r}')
+        with self._lock:
+            future = self._futures.get(key)
+            # Failed loads are retried, and so are loads close() cancelled; exception() raises for those.
+            if future is None or future.cancelled() or (future.done() and future.exception() is not None):
+                try:
+                    future = self._executor().submit(load_dataset, infos[key], self.reader)
+                except BrokenProcessPool:
+                    # A worker died (out of memory, killed); start a fresh pool.
+                    self._pool = None
+                    future = self._executor().submit(load_dataset, infos[key], self.reader)
+                self._futures[key] = future
+            return future
+
+    def _executor(self):
+        if self._pool is None:
+            # Spawned rather than forked: the GUI process has Qt and loader threads running.
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def get(self, key, timeout=None):
+        return self.request(key).result(timeout)
+
+    def load(self, keys):
+        """Load several datasets in parallel; returns them in ``keys`` order."""
+        futures = [self.request(key) for key in keys]
+        return [future.result() for future in futures]
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from clinic_data import DEFAULT_WORKBOOK
+
+    parser = argparse.ArgumentParser(description='List or load the reference sheets beside the Fac List')
+    parser.add_argument('keys', nargs='*', help='datasets to load (see --list)')
+    parser.add_argument('--workbook', default=DEFAULT_WORKBOOK,
+                        help='Fac List workbook (default: $CLINIC_TOOL_WORKBOOK or the shared workbook)')
+    parser.add_argument('--list', action='store_true', help='list the datasets without loading any')
+    parser.add_argument('--reader', help='reader engine (default: $CLINIC_TOOL_READER or auto)')
+    args = parser.parse_args()
+
+    registry = DatasetRegistry(args.workbook, reader=args.reader)
+    if args.list or not args.keys:
+        for info in registry.catalog():
+            print(f'{info.key}\t{info.title}')
+    start = time.perf_counter()
+    for key, dataset in zip(args.keys, registry.load(args.keys)):
+        print(f'{key}: {len(dataset):,} rows, {len(dataset.columns)} columns')
+    if args.keys:
+        print(f'Loaded {len(args.keys)} in {time.perf_counter() - start:.2f} s')
+    registry.close()
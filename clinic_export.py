@@ -0,0 +1,213 @@
+"""Export clinics from the Fac List to CSV or XLSX, without Qt.
+
+Rows are read from the store and written a chunk at a time (csv.writer, or
+sheet XML streamed into the workbook's zip entry), so memory stays flat
+however many clinics are selected.  The file is written beside
+the destination and only moved into place once complete; a cancelled or
+failed export leaves any existing file alone.
+
+    python clinic_export.py region.xlsx --region "region 3-2"
+    python clinic_export.py boston.csv --search "boston dialysis" --columns "Fac#" "Clinic Name" "RVP"
+"""
+
+import csv
+import io
+import os
+import re
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape
+
+from clinic_data import ZIP_COLUMN
+
+CHUNK_ROWS = 2000
+EXPORT_FORMATS = ('.csv', '.xlsx')
+
+# Preselected in the column picker: who to call about a clinic, and who above them.
+DEFAULT_COLUMNS = (
+    'Fac#', 'Clinic Name', 'Address', 'City', 'State', ZIP_COLUMN, 'Clinic PH / FX', 'Clinic Manager',
+    'In-Center DO', 'In-Center DO Phone', 'RVP', 'GVP Name', 'GRP', 'REG', 'Area',
+    'Escalation List (DO, RVP, HPSM, PAS TL, PAS Supervisor, etc)',
+)
+
+
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_SHEET_START = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+_SHEET_END = '</sheetData></worksheet>'
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Clinics" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'),
+}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class _CsvWriter:
+    def __init__(self, fd):
+        # utf-8-sig so Excel opens the file with accented names intact
+        self._file = os.fdopen(fd, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def save(self, path):
+        self._file.close()
+
+    def close(self):
+        self._file.close()
+
+
+class _XlsxWriter:
+    """A one-sheet workbook streamed straight into its zip entry.
+
+    Cells are written as inline strings and numbers, so there is no shared
+    string table to hold in memory, and no per-cell objects to build.
+    """
+
+    def __init__(self, fd):
+        self._file = os.fdopen(fd, 'wb')
+        self._zip = zipfile.ZipFile(self._file, 'w', zipfile.ZIP_DEFLATED)
+        for name, xml in _XLSX_PARTS.items():
+            self._zip.writestr(name, xml)
+        self._sheet = io.TextIOWrapper(self._zip.open('xl/worksheets/sheet1.xml', 'w'), encoding='utf-8')
+        self._sheet.write(_SHEET_START)
+        self._row = 0
+        self._refs = []
+
+    def _cell_refs(self, count):
+        while len(self._refs) < count:
+            n, name = len(self._refs), ''
+            while True:
+                n, rem = divmod(n, 26)
+                name = chr(65 + rem) + name
+                if not n:
+                    break
+                n -= 1
+            self._refs.append(name)
+        return self._refs
+
+    def write(self, rows):
+        for row in rows:
+            self._row += 1
+            number = str(self._row)
+            refs = self._cell_refs(len(row))
+            parts = [f'<row r="{number}">']
+            for ref, value in zip(refs, row):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    parts.append(f'<c r="{ref}{number}"><v>{value}</v></c>')
+                elif value != '':
+                    # Control characters pasted into the Fac List are not allowed in XLSX cells.
+                    text = escape(_ILLEGAL_XML.sub('', str(value)))
+                    parts.append(f'<c r="{ref}{number}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+            parts.append('</row>')
+            self._sheet.write(''.join(parts))
+
+    def save(self, path):
+        self._sheet.write(_SHEET_END)
+        self.close()
+
+    def close(self):
+        if not self._file.closed:
+            self._sheet.close()
+            self._zip.close()
+            self._file.close()
+
+
+def export_rows(store, rows, columns, path, progress=None, cancelled=None):
+    """Write ``columns`` of the rows at positions ``rows`` to ``path`` (.csv or .xlsx).
+
+    ``progress(stage, done, total)`` is called with stage 'export' after
+    each chunk, and ``cancelled()`` is checked before each; when it returns
+    True, ExportCancelled is raised and nothing is written to ``path``.
+    Returns the number of rows written.
+    """
+    progress = progress or (lambda stage, done, total: None)
+    cancelled = cancelled or (lambda: False)
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXPORT_FORMATS:
+        raise ValueError(f'Cannot export to {ext or "files without an extension"}; use .csv or .xlsx')
+    columns = list(columns)
+    total = len(rows)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.export-', suffix=ext)
+    writer = _CsvWriter(fd) if ext == '.csv' else _XlsxWriter(fd)
+    try:
+        writer.write([columns])
+        progress('export', 0, total)
+        for start in range(0, total, CHUNK_ROWS):
+            if cancelled():
+                raise ExportCancelled(f'Export to {path} cancelled')
+            chunk = rows[start:start + CHUNK_ROWS]
+            writer.write(zip(*store.column_values(chunk, columns)))
+            progress('export', min(start + CHUNK_ROWS, total), total)
+        writer.save(tmp)
+        os.replace(tmp, path)
+        tmp = None
+    finally:
+        writer.close()
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+    return total
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    from clinic_data import DEFAULT_WORKBOOK, load_clinic_store
+    from clinic_replica import local_source
+    from clinic_service import connect
+
+    parser = argparse.ArgumentParser(description='Export clinics from the Fac List to CSV or XLSX')
+    parser.add_argument('output', help='.csv or .xlsx file to write')
+    parser.add_argument('--workbook', default=DEFAULT_WORKBOOK,
+                        help='Fac List workbook (default: $CLINIC_TOOL_WORKBOOK or the shared workbook)')
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument('--group', help='every clinic in this group')
+    selection.add_argument('--region', help='every clinic in this region')
+    selection.add_argument('--area', help='every clinic in this area')
+    selection.add_argument('--search', help='the clinics matching this text')
+    parser.add_argument('--limit', type=int, default=500, help='most search results to export')
+    parser.add_argument('--columns', nargs='+', default=list(DEFAULT_COLUMNS), help='columns to export')
+    args = parser.parse_args()
+
+    store = connect(args.workbook) or load_clinic_store(local_source(args.workbook), origin=args.workbook)
+    if args.search:
+        rows = store.search(args.search, args.limit)
+    else:
+        level, key = next(((level, getattr(args, level)) for level in ('group', 'region', 'area')
+                           if getattr(args, level)), ('area', None))
+        rows = store.node_rows(level, key and key.lower().strip())
+    print(f'Exported {export_rows(store, rows, args.columns, args.output):,} clinics to {args.output}', file=sys.stderr)
@@ -0,0 +1,250 @@
+"""Nearest clinics to a ZIP code, from an offline table of ZIP centroids.
+
+The table is a CSV with columns ``zip,lat,lon`` (5-digit ZIP, decimal
+degrees), one row per ZIP Code Tabulation Area.  It is looked for in
+CLINIC_TOOL_ZIP_CENTROIDS, then beside the tool (where a frozen build
+bundles it), then on the share through its local replica.  It is not kept
+in the repository; it is built from the Census Gazetteer ZCTA file, with
+
+    python clinic_geo.py --download
+
+which fetches the file and writes zip_centroids.csv beside the tool, or
+from a Gazetteer file already downloaded:
+
+    python clinic_geo.py 2020_Gaz_zcta_national.txt zip_centroids.csv
+
+A frozen build bundles it with ``--add-data zip_centroids.csv;.``.
+
+Each clinic is placed at the centroid of its ZIP, and the distinct ZIPs
+are kept as unit vectors, so straight-line (chord) distance ranks them
+exactly as great-circle distance does.  With scipy installed they go in a
+cKDTree.  scipy is optional: without it every query is a brute-force
+scan of all the ZIP points, about 2 ms over the 33k ZCTAs.
+"""
+
+import os
+import re
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from clinic_replica import ReplicaError, local_source, share_path
+from clinic_search import concat_ranges
+
+CENTROIDS_NAME = 'zip_centroids.csv'
+GAZETTEER_URL = 'https://www2.census.gov/geo/docs/maps-data/data/gazetteer/2020_Gazetteer/2020_Gaz_zcta_national.zip'
+EARTH_RADIUS_MI = 3958.8
+
+_ZIP = re.compile(r'\s*(\d{3,5})(?:-\d{4})?\s*$')
+
+
+def parse_zip(value):
+    """A ZIP ('02118', '02118-1234', or '2118' as Excel shows it) as an int, or None."""
+    match = _ZIP.match(str(value))
+    return int(match.group(1)) if match else None
+
+
+def zip_numbers(values):
+    """ZIPs as ints for an array of ZIP cells; -1 where a cell holds no ZIP."""
+    # A ZIP column has few distinct values, so each is parsed once.
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object).astype(str))
+    digits = pd.Series(uniques).str.extract(r'^\s*(\d{5})', expand=False)
+    numbers = pd.to_numeric(digits, errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    return numbers[codes] if len(numbers) else np.full(len(codes), -1, dtype=np.int64)
+
+
+def centroids_path():
+    path = os.environ.get('CLINIC_TOOL_ZIP_CENTROIDS')
+    if path:
+        return path
+    bundled = os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), CENTROIDS_NAME)
+    if os.path.exists(bundled):
+        return bundled
+    return local_source(share_path(CENTROIDS_NAME), refresh=False)
+
+
+class ZipCentroids:
+    """ZIP -> (lat, lon), as sorted parallel arrays."""
+
+    def __init__(self, zips, lat, lon):
+        order = np.argsort(zips, kind='stable')
+        self.zips = np.asarray(zips, dtype=np.int64)[order]
+        self.lat = np.asarray(lat, dtype=np.float64)[order]
+        self.lon = np.asarray(lon, dtype=np.float64)[order]
+
+    @classmethod
+    def read(cls, path):
+        df = pd.read_csv(path, dtype={'zip': str}, usecols=['zip', 'lat', 'lon'])
+        zips = zip_numbers(df['zip'].str.zfill(5))
+        keep = (zips >= 0) & df['lat'].notna().to_numpy() & df['lon'].notna().to_numpy()
+        return cls(zips[keep], df['lat'].to_numpy()[keep], df['lon'].to_numpy()[keep])
+
+    def __len__(self):
+        return len(self.zips)
+
+    def locate(self, zips):
+        """(lat, lon, found) arrays for an array of int ZIPs."""
+        zips = np.asarray(zips, dtype=np.int64)
+        if not len(self.zips):
+            return np.zeros(len(zips)), np.zeros(len(zips)), np.zeros(len(zips), dtype=bool)
+        at = np.minimum(np.searchsorted(self.zips, zips), len(self.zips) - 1)
+        return self.lat[at], self.lon[at], self.zips[at] == zips
+
+    def get(self, zip_code):
+        """(lat, lon) of a ZIP, or None when it is not in the table."""
+        number = parse_zip(zip_code)
+        if number is None:
+            return None
+        lat, lon, found = self.locate([number])
+        return (float(lat[0]), float(lon[0])) if found[0] else None
+
+
+_centroids = None
+_centroids_lock = threading.Lock()
+
+
+def load_centroids():
+    """The ZIP centroid table, read once per process; None when there is none to read."""
+    global _centroids
+    with _centroids_lock:
+        if _centroids is None:
+            try:
+                _centroids = ZipCentroids.read(centroids_path())
+            except (OSError, ReplicaError, ValueError, KeyError) as e:
+                print(f'clinic_geo: no ZIP centroid table ({e}); build one with: python clinic_geo.py --download',
+                      file=sys.stderr)
+                _centroids = False
+        return _centroids or None
+
+
+def _unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def _miles(chord):
+    return 2 * EARTH_RADIUS_MI * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def _chord(miles):
+    return 2 * np.sin(min(miles / EARTH_RADIUS_MI, np.pi) / 2)
+
+
+class GeoIndex:
+    """Row positions grouped by ZIP, with one point per ZIP at its centroid.
+
+    Every clinic in a ZIP is at the same point, so a query finds the nearest
+    points, through the cKDTree or by scanning them all without scipy, and
+    expands them to their rows.
+    Rows whose ZIP is blank or not in the table are left out; ``unplaced``
+    counts them.
+    """
+
+    def __init__(self, zip_values, rows, centroids):
+        numbers = zip_numbers(zip_values)
+        found = centroids.locate(numbers)[2]
+        self.centroids = centroids
+        self.unplaced = int((~found).sum())
+        numbers, rows = numbers[found], np.asarray(rows, dtype=np.intp)[found]
+        order = np.lexsort((rows, numbers))  # By ZIP, then sheet order within a ZIP
+        self.rows = rows[order]
+        self.zips, self.starts, self.counts = np.unique(numbers[order], return_index=True, return_counts=True)
+        lat, lon, _ = centroids.locate(self.zips)
+        self.points = _unit_vectors(lat, lon)
+        self._tree = None
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:
+            pass
+        else:
+            if len(self.points):
+                self._tree = cKDTree(self.points)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _near_points(self, point, count, bound):
+        """(point numbers, chord distances) nearest first, enough of them to cover ``count`` rows."""
+        size = len(self.points)
+        if self._tree is not None and count is not None:
+            # Every point has at least one row, so ``count`` points always cover ``count`` rows.
+            chord, hits = self._tree.query(point, k=min(count, size), distance_upper_bound=bound)
+            chord, hits = np.atleast_1d(chord), np.atleast_1d(hits)
+            keep = hits < size  # Missing neighbours beyond the bound come back as index ``size``
+            return hits[keep], chord[keep]
+        if self._tree is not None:
+            hits = np.asarray(self._tree.query_ball_point(point, bound), dtype=np.intp)
+            chord = np.linalg.norm(self.points[hits] - point, axis=1)
+        else:
+            distances = np.linalg.norm(self.points - point, axis=1)
+            hits = np.flatnonzero(distances <= bound)
+            if count is not None and count < len(hits):
+                hits = hits[np.argpartition(distances[hits], count - 1)[:count]]
+            chord = distances[hits]
+        order = np.argsort(chord, kind='stable')
+        return hits[order], chord[order]
+
+    def nearest(self, lat, lon, count=None, radius=None):
+        """(rows, miles) nearest first: the ``count`` nearest, every row within ``radius`` miles, or both.
+
+        Rows in the same ZIP are the same distance away and come in sheet order.
+        """
+        if count is None and radius is None:
+            raise ValueError('Give a count, a radius or both')
+        if not len(self.points) or count == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        point = _unit_vectors(np.array([lat]), np.array([lon]))[0]
+        bound = np.inf if radius is None else _chord(radius)
+        hits, chord = self._near_points(point, count, bound)
+        counts = self.counts[hits]
+        if count is not None:
+            # Only as many ZIPs as it takes to reach ``count`` rows, the last one cut short
+            used = int(np.searchsorted(np.cumsum(counts), count)) + 1
+            hits, chord, counts = hits[:used], chord[:used], counts[:used].copy()
+            counts[-1:] -= max(int(counts.sum()) - count, 0)
+        rows = self.rows[concat_ranges(self.starts[hits], counts)]
+        return rows, np.repeat(_miles(chord), counts)
+
+
+def centroids_from_gazetteer(source):
+    """The zip,lat,lon table from a Census Gazetteer ZCTA file (a path or text file object)."""
+    gazetteer = pd.read_csv(source, sep='\t', dtype={'GEOID': str})
+    gazetteer.columns = gazetteer.columns.str.strip()  # The last header has trailing spaces
+    out = pd.DataFrame({'zip': gazetteer['GEOID'].str.zfill(5),
+                        'lat': gazetteer['INTPTLAT'].round(6), 'lon': gazetteer['INTPTLONG'].round(6)})
+    return out.sort_values('zip', ignore_index=True)
+
+
+def download_gazetteer(url=GAZETTEER_URL):
+    """The Gazetteer ZCTA text, fetched from the Census Bureau and unzipped."""
+    import io
+    import urllib.request
+    import zipfile
+
+    with urllib.request.urlopen(url, timeout=60) as response:
+        archive = zipfile.ZipFile(io.BytesIO(response.read()))
+    name = next(name for name in archive.namelist() if name.endswith('.txt'))
+    return io.TextIOWrapper(archive.open(name), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Write the ZIP centroid table from a Census Gazetteer ZCTA file')
+    parser.add_argument('files', nargs='*', metavar='FILE',
+                        help=f'GAZETTEER [OUTPUT], or only OUTPUT with --download (default output: {CENTROIDS_NAME} '
+                             'beside this script)')
+    parser.add_argument('--download', action='store_true', help='fetch the Gazetteer file from the Census Bureau')
+    parser.add_argument('--url', default=GAZETTEER_URL, help=f'with --download (default: {GAZETTEER_URL})')
+    args = parser.parse_args()
+    inputs = 0 if args.download else 1
+    if len(args.files) < inputs or len(args.files) > inputs + 1:
+        parser.error('give a Gazetteer file and optionally an output, or --download and optionally an output')
+
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), CENTROIDS_NAME)
+    output = args.files[inputs] if len(args.files) > inputs else default
+    out = centroids_from_gazetteer(download_gazetteer(args.url) if args.download else args.files[0])
+    out.to_csv(output, index=False)
+    print(f'Wrote {len(out):,} ZIP centroids to {output}', file=sys.stderr)
@@ -0,0 +1,381 @@
+"""Every version of the Fac List the tool has loaded, and what changed between them.
+
+Each version's normalized table is kept as a zstd-compressed Arrow IPC
+file, named for the workbook's (mtime_ns, size):
+
+    <root>/<source id>/<mtime_ns>-<size>.arrow
+
+The root is CLINIC_TOOL_HISTORY_DIR, or a history directory beside the
+shared snapshots; like them it is machine-wide, so a version is written
+once however many sessions load it.  The newest HISTORY_KEEP versions are
+kept.  CLINIC_TOOL_HISTORY=off turns history off, and without pyarrow
+there is none.
+
+Two versions are compared by Fac# with clinic_data.compare_stores, the
+same diff a reload uses: clinics added and removed, and for the clinics in
+both, every field whose text differs, a blank cell being the same as a
+missing one.  Each user's last seen version is remembered in their cache
+directory, so the tool can show what changed since their last session.
+
+    python clinic_history.py --list
+    python clinic_history.py --key-fields
+    python clinic_history.py --from -3 --to -1 -f csv -o changes.csv
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from clinic_cache import cache_dir
+from clinic_data import COLUMNS, PEOPLE_COLUMNS, FacIndex, _compare_text, _member, compare_stores
+from clinic_snapshot import SnapshotStore, _source_dir, snapshot_root
+
+HISTORY_KEEP = 30
+DIFF_WORKERS = min(8, os.cpu_count() or 1)
+SEEN_NAME = 'history_seen.json'
+
+# The fields most worth hearing about: who runs a clinic and how to reach them.
+PHONE_COLUMNS = tuple(column for column in COLUMNS if re.search(r'phone|ph /|cell|direct #', column, re.IGNORECASE))
+KEY_FIELDS = frozenset(PEOPLE_COLUMNS + PHONE_COLUMNS + ('Clinic Name', 'Address'))
+
+# ``stat`` is the workbook's (size, mtime_ns) when the version was loaded.
+Version = namedtuple('Version', 'stat path')
+
+_VERSION_FILE = re.compile(r'(\d+)-(\d+)\.arrow$')
+
+
+def available():
+    if os.environ.get('CLINIC_TOOL_HISTORY', '').lower() in ('off', '0', 'no'):
+        return False
+    try:
+        import pyarrow.feather  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def history_root():
+    return os.environ.get('CLINIC_TOOL_HISTORY_DIR') or os.path.join(os.path.dirname(snapshot_root()), 'history')
+
+
+def _history_dir(source):
+    return os.path.join(history_root(), os.path.basename(_source_dir(source)))
+
+
+def version_label(version):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(version.stat[1] / 1e9))
+
+
+def versions(source):
+    """The recorded versions of ``source``, oldest first."""
+    directory = _history_dir(source)
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    found = []
+    for name in names:
+        match = _VERSION_FILE.match(name)
+        if match:
+            mtime_ns, size = int(match.group(1)), int(match.group(2))
+            found.append(Version((size, mtime_ns), os.path.join(directory, name)))
+    return sorted(found, key=lambda version: version.stat[1])
+
+
+def _table(store):
+    import pyarrow as pa
+
+    if isinstance(store.df, pa.Table):
+        return store.df  # A SnapshotStore's mapped table
+    return pa.Table.from_pandas(store.df, preserve_index=False)
+
+
+def record(store, source):
+    """Keep ``store``'s table as a version of ``source``; returns the Version, or None without history.
+
+    Does nothing when the version is already recorded.  Only a store loaded
+    in this process (not a clinic_service.RemoteStore) has a table to record.
+    """
+    if not available() or store.source_stat is None or not hasattr(store, 'df'):
+        return None
+    import pyarrow.feather as feather
+
+    size, mtime_ns = store.source_stat
+    directory = _history_dir(source)
+    path = os.path.join(directory, f'{mtime_ns}-{size}.arrow')
+    if not os.path.exists(path):
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix='.record-', suffix='.arrow')
+            os.close(fd)
+        except OSError:
+            return None
+        try:
+            # About a third the size of the table, and it reads back twice as fast as Parquet.
+            feather.write_feather(_table(store), tmp, compression='zstd')
+            os.replace(tmp, path)
+        except OSError:
+            if not os.path.exists(path):
+                return None
+        finally:
+            try:
+                os.remove(tmp)  # Left by a failed write of any kind; already gone after the replace
+            except OSError:
+                pass
+        for old in versions(source)[:-HISTORY_KEEP]:
+            try:
+                os.remove(old.path)
+            except OSError:
+                pass  # Another instance removed it first
+    return Version(tuple(store.source_stat), path)
+
+
+def read_version(version):
+    import pyarrow.feather as feather
+
+    return feather.read_table(version.path)
+
+
+def _seen_path():
+    return os.path.join(cache_dir(), SEEN_NAME)
+
+
+def last_seen(source):
+    """(size, mtime_ns) of the version of ``source`` this user last loaded, or None."""
+    try:
+        with open(_seen_path(), encoding='utf-8') as f:
+            stat = json.load(f).get(os.path.basename(_source_dir(source)))
+    except (OSError, ValueError):
+        return None
+    return tuple(stat) if stat else None
+
+
+def mark_seen(source, stat):
+    path = _seen_path()
+    try:
+        with open(path, encoding='utf-8') as f:
+            seen = json.load(f)
+    except (OSError, ValueError):
+        seen = {}
+    seen[os.path.basename(_source_dir(source))] = list(stat)
+    try:
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(seen, f)
+        os.replace(path + '.tmp', path)
+    except OSError:
+        pass
+
+
+class Changes:
+    """Differences between two versions, one entry per added or removed clinic or changed field.
+
+    Entries are parallel arrays sorted by Fac#, then field in sheet order:
+    ``facs``, ``kinds`` ('added', 'removed' or 'changed'), ``fields`` (''
+    for added and removed clinics), and ``old`` and ``new`` text.  ``names``
+    maps each Fac# to its clinic name, from the newer version when it has it.
+    """
+
+    def __init__(self, facs, kinds, fields, old, new, names):
+        self.facs = facs
+        self.kinds = kinds
+        self.fields = fields
+        self.old = old
+        self.new = new
+        self.names = names
+
+    def __len__(self):
+        return len(self.facs)
+
+    def count(self, kind):
+        return int((self.kinds == kind).sum())
+
+    def clinics(self):
+        """Number of clinics with any entry."""
+        return len(np.unique(self.facs))
+
+    def __str__(self):
+        return (f"{self.count('added')} added, {self.count('removed')} removed, "
+                f"{self.count('changed')} field changes in {len(np.unique(self.facs[self.kinds == 'changed']))} clinics")
+
+    def only(self, fields):
+        """The added and removed clinics, and the changes to ``fields`` only."""
+        keep = (self.kinds != 'changed') | np.isin(self.fields, list(fields))
+        return Changes(self.facs[keep], self.kinds[keep], self.fields[keep], self.old[keep], self.new[keep], self.names)
+
+    def records(self):
+        for fac, kind, field, old, new in zip(self.facs.tolist(), self.kinds, self.fields, self.old, self.new):
+            yield {'Fac#': fac, 'Clinic': self.names.get(fac, ''), 'Change': kind, 'Field': field, 'Old': old, 'New': new}
+
+
+class _TableRows:
+    """Just enough of a ClinicStore over a version's pyarrow Table for compare_stores."""
+
+    def __init__(self, table):
+        self.df = table
+        self._columns = frozenset(table.column_names)
+        self.fac_index = FacIndex(pd.DataFrame({'Fac#': table.column('Fac#').to_pandas()})
+                                  if 'Fac#' in self._columns else pd.DataFrame(index=range(table.num_rows)))
+
+    has_column = SnapshotStore.has_column
+    _gather = SnapshotStore._gather
+
+
+def _text(column):
+    """A column as strings with nulls as '', so a blank cell equals a missing one."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    if not pa.types.is_string(column.type) and not pa.types.is_large_string(column.type):
+        column = column.cast(pa.string())
+    return pc.fill_null(column, '')
+
+
+def _take(column, rows):
+    """``column`` at ``rows``, without a take when they are every row in order (the usual edit)."""
+    import pyarrow as pa
+
+    if len(rows) == len(column) and (rows == np.arange(len(rows))).all():
+        return column
+    return column.take(pa.array(rows))
+
+
+def _arrow_changes(old, new, column, old_rows, new_rows):
+    """clinic_data.gathered_changes done in Arrow, which compares without the GIL and makes no Python strings."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    old_values = _text(_take(old.df.column(column), old_rows))
+    new_values = _text(_take(new.df.column(column), new_rows))
+    differs = pc.not_equal(old_values, new_values)
+    if not pc.any(differs).as_py():
+        return np.empty(0, dtype=np.intp), None, None
+    at = np.flatnonzero(differs.to_numpy(zero_copy_only=False))
+    taken = pa.array(at)
+    return (at, old_values.take(taken).to_numpy(zero_copy_only=False).astype(object),
+            new_values.take(taken).to_numpy(zero_copy_only=False).astype(object))
+
+
+def diff_tables(old, new):
+    """Changes from the ``old`` to the ``new`` pyarrow Table, from clinic_data.compare_stores."""
+    old, new = _TableRows(old), _TableRows(new)
+    # Arrow's take and compare run without the GIL, so columns compare in parallel.
+    with ThreadPoolExecutor(DIFF_WORKERS) as pool:
+        diff = compare_stores(old, new, _arrow_changes, pool.map)
+    blank = np.full(len(diff.added) + len(diff.removed), '', dtype=object)
+    fac_parts, kind_parts = [diff.added, diff.removed], [np.full(len(diff.added), 'added', dtype=object),
+                                                         np.full(len(diff.removed), 'removed', dtype=object)]
+    order_parts, old_parts, new_parts = [np.full(len(blank), -1, dtype=np.int16)], [blank], [blank]
+    for number, (_, facs, old_text, new_text) in enumerate(diff.fields):
+        fac_parts.append(facs)
+        kind_parts.append(np.full(len(facs), 'changed', dtype=object))
+        order_parts.append(np.full(len(facs), number, dtype=np.int16))
+        old_parts.append(old_text)
+        new_parts.append(new_text)
+    facs, orders = np.concatenate(fac_parts).astype(np.int64), np.concatenate(order_parts)
+    order = np.lexsort((orders, facs))
+    field_names = np.array([''] + [field for field, _, _, _ in diff.fields], dtype=object)
+
+    names = {}
+    for table, wanted in ((old, diff.removed), (new, np.unique(facs))):
+        wanted = wanted[_member(table.fac_index.keys, wanted)]
+        if len(wanted):
+            rows = table.fac_index.rows_for(wanted)
+            names.update(zip(wanted.tolist(), _compare_text(table._gather('Clinic Name', rows))))
+    return Changes(facs[order], np.concatenate(kind_parts)[order], field_names[orders[order] + 1],
+                   np.concatenate(old_parts)[order], np.concatenate(new_parts)[order], names)
+
+
+def diff_versions(old, new):
+    return diff_tables(read_version(old), read_version(new))
+
+
+def changes_since_seen(source, current_stat, seen):
+    """(versions, from index, to index, Changes or None) for what changed since ``seen``.
+
+    ``seen`` is the (size, mtime_ns) this user had last seen, read with
+    last_seen before this session marked its own.  The changes run up to
+    ``current_stat``'s version, or the latest one when it was not recorded;
+    when nothing changed since ``seen``, they are those of that version over
+    the one before.  Changes is None when there are not two versions.
+    """
+    recorded = versions(source)
+    stats = [version.stat for version in recorded]
+    current = tuple(current_stat) if current_stat else None
+    end = stats.index(current) if current in stats else len(recorded) - 1
+    start = stats.index(seen) if seen in stats and stats.index(seen) < end else end - 1
+    if start < 0:
+        return recorded, start, end, None
+    return recorded, start, end, diff_versions(recorded[start], recorded[end])
+
+
+if __name__ == '__main__':
+    import argparse
+    import csv
+
+    from clinic_data import DEFAULT_WORKBOOK
+
+    parser = argparse.ArgumentParser(description='List the recorded Fac List versions and what changed between two')
+    parser.add_argument('--workbook', default=DEFAULT_WORKBOOK,
+                        help='Fac List workbook (default: $CLINIC_TOOL_WORKBOOK or the shared workbook)')
+    parser.add_argument('--list', action='store_true', help='list the recorded versions')
+    parser.add_argument('--record', action='store_true', help='load the workbook and record its current version first')
+    parser.add_argument('--from', dest='start', type=int, default=-2, help='version number from --list (default: -2)')
+    parser.add_argument('--to', dest='end', type=int, default=-1, help='version number from --list (default: -1, the latest)')
+    parser.add_argument('--key-fields', action='store_true', help='only people, phone, name and address changes')
+    parser.add_argument('-f', '--format', choices=('text', 'csv', 'jsonl'), default='text')
+    parser.add_argument('-o', '--output', default='-', help='file to write (default: stdout)')
+    args = parser.parse_args()
+
+    if args.record:
+        from clinic_data import load_clinic_store
+        from clinic_replica import local_source
+
+        record(load_clinic_store(local_source(args.workbook), origin=args.workbook), args.workbook)
+    recorded = versions(args.workbook)
+    if args.list:
+        for number, version in enumerate(recorded):
+            print(f'{number}\t{version_label(version)}\t{version.stat[0]:,} bytes')
+        sys.exit(0)
+    try:
+        old, new = recorded[args.start], recorded[args.end]
+    except IndexError:
+        print(f'clinic_history: {len(recorded)} versions recorded for {args.workbook}', file=sys.stderr)
+        sys.exit(2)
+    start = time.perf_counter()
+    changes = diff_versions(old, new)
+    seconds = time.perf_counter() - start
+    if args.key_fields:
+        changes = changes.only(KEY_FIELDS)
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        if args.format == 'csv':
+            writer = csv.DictWriter(out, fieldnames=['Fac#', 'Clinic', 'Change', 'Field', 'Old', 'New'],
+                                    lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(changes.records())
+        elif args.format == 'jsonl':
+            for entry in changes.records():
+                out.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        else:
+            out.write(f'{version_label(old)} -> {version_label(new)}: {changes}\n')
+            for entry in changes.records():
+                if entry['Change'] == 'changed':
+                    out.write(f"{entry['Fac#']} {entry['Clinic']}: {entry['Field']}: "
+                              f"{entry['Old'] or '(blank)'} -> {entry['New'] or '(blank)'}\n")
+                else:
+                    out.write(f"{entry['Fac#']} {entry['Clinic']}: clinic {entry['Change']}\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f'Compared in {seconds:.2f} s', file=sys.stderr)
@@ -0,0 +1,227 @@
+"""Qt list and table models for the browse panes, reference sheets and change history.
+
+The models wrap the arrays and dictionaries precomputed by clinic_data, and
+build row text only when a view asks for a visible row, so a list of 100k
+clinics costs no more than the rows on screen.
+
+Nothing here imports pandas, so the window can be built and painted before
+the data layer has been imported.
+"""
+
+import numpy as np
+from PyQt5.QtCore import QAbstractListModel, QAbstractTableModel, QModelIndex, Qt
+
+KEY_ROLE = Qt.UserRole
+
+
+def _text(value):
+    """Cell value for display; None and NaN (the frame's missing markers) become ''."""
+    return '' if value is None or value != value else value
+
+
+class NodeListModel(QAbstractListModel):
+    """An "All ..." row followed by hierarchy nodes.
+
+    ``KEY_ROLE`` is the node key, or None for the "All ..." row.
+    """
+
+    def __init__(self, all_text, parent=None):
+        super().__init__(parent)
+        self.all_text = all_text
+        self._keys = None  # None means cleared: not even the "All ..." row
+        self._labels = {}
+
+    def set_nodes(self, keys, labels):
+        self.beginResetModel()
+        self._keys = keys
+        self._labels = labels
+        self.endResetModel()
+
+    def clear(self):
+        self.set_nodes(None, {})
+
+    @property
+    def keys(self):
+        return self._keys
+
+    @property
+    def labels(self):
+        return self._labels
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self._keys is None:
+            return 0
+        return len(self._keys) + 1
+
+    def row_of(self, key):
+        """Row showing ``key`` (None for the "All ..." row), or None if it is not listed."""
+        if self._keys is None:
+            return None
+        if key is None:
+            return 0
+        try:
+            return self._keys.index(key) + 1
+        except ValueError:
+            return None
+
+    def key(self, row):
+        return None if row == 0 else self._keys[row - 1]
+
+    def label(self, row):
+        return self.all_text if row == 0 else self._labels[self._keys[row - 1]]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.label(index.row())
+        if role == KEY_ROLE:
+            return self.key(index.row())
+        return None
+
+
+class ClinicListModel(QAbstractListModel):
+    """Clinics as "Fac# - Clinic Name (CM: manager)" over parallel arrays.
+
+    With ``notes`` (e.g. distances for nearest-clinic results, or a person's
+    roles) each row ends in its note.  ``KEY_ROLE`` is the Fac# as an int.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._facs = ()
+        self._names = ()
+        self._managers = ()
+        self._notes = None
+
+    def set_clinics(self, facs, names, managers, notes=None):
+        self.beginResetModel()
+        self._facs = facs
+        self._names = names
+        self._managers = managers
+        self._notes = notes
+        self.endResetModel()
+
+    def clear(self):
+        self.set_clinics((), (), ())
+
+    @property
+    def facs(self):
+        return self._facs
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._facs)
+
+    def row_of(self, fac):
+        rows = np.flatnonzero(np.asarray(self._facs) == fac)
+        return int(rows[0]) if len(rows) else None
+
+    def fac(self, row):
+        return int(self._facs[row])
+
+    def label(self, row):
+        name = _text(self._names[row])
+        cm = _text(self._managers[row])
+        if self._notes is not None:
+            return f"{self.fac(row)} - {name} (CM: {cm}) - {self._notes[row]}"
+        return f"{self.fac(row)} - {name} (CM: {cm})"
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.label(index.row())
+        if role == KEY_ROLE:
+            return self.fac(index.row())
+        return None
+
+
+class DatasetTableModel(QAbstractTableModel):
+    """Rows of a reference dataset, every row or a filter's matches.
+
+    ``rows`` are row positions in the dataset; cell text is only built for
+    the cells a view paints.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._dataset = None
+        self._rows = ()
+
+    def set_rows(self, dataset, rows):
+        self.beginResetModel()
+        self._dataset = dataset
+        self._rows = rows
+        self.endResetModel()
+
+    def clear(self):
+        self.set_rows(None, ())
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or self._dataset is None else len(self._dataset.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self._dataset.cell(int(self._rows[index.row()]), index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or self._dataset is None:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._dataset.columns[section]
+        return str(int(self._rows[section]) + 2)  # The sheet's row number, below the header row
+
+
+class ChangeTableModel(QAbstractTableModel):
+    """The entries of a clinic_history.Changes, one row each.
+
+    ``KEY_ROLE`` is the entry's Fac# as an int.
+    """
+
+    HEADERS = ('Fac#', 'Clinic', 'Field', 'Old', 'New')
+    KIND_TEXT = {'added': '(clinic added)', 'removed': '(clinic removed)'}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._changes = None
+
+    def set_changes(self, changes):
+        self.beginResetModel()
+        self._changes = changes
+        self.endResetModel()
+
+    def clear(self):
+        self.set_changes(None)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or self._changes is None else len(self._changes)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        changes, row = self._changes, index.row()
+        fac = int(changes.facs[row])
+        if role == KEY_ROLE:
+            return fac
+        if role != Qt.DisplayRole:
+            return None
+        column = index.column()
+        if column == 0:
+            return str(fac)
+        if column == 1:
+            return changes.names.get(fac, '')
+        if column == 2:
+            return self.KIND_TEXT.get(changes.kinds[row], changes.fields[row])
+        return _text(changes.old[row] if column == 3 else changes.new[row])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or orientation != Qt.Horizontal:
+            return None
+        return self.HEADERS[section]
@@ -0,0 +1,189 @@
+"""Reverse index from people to the clinics they staff or lead.
+
+Every cell of the people columns is split into names: cells holding several
+are separated by ';', '/', '&', 'and', line breaks, or commas between full
+names.  Phone numbers, e-mail addresses and notes in parentheses are
+dropped, and so are titles in front of a name and credentials after it or
+in their own comma-separated piece; the rest is normalized, so 'Dr. Ana B.
+Smith, MD', 'Smith, Ana, MD' and 'Ana B Smith' are the same people they
+read as.  Credentials that are also given names ('Do', 'Pa') only count as
+credentials written in capitals or with dots.  Postings are (person, row,
+role), the role being the column the name was found in.  People are found
+by name through a SearchIndex over their names, so partial names and typos
+work as in the main search.
+"""
+
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+from clinic_search import SearchIndex, concat_ranges
+
+_SEPARATORS = re.compile(r'\s*(?:;|\||\n|/|&|\band\b)\s*', re.IGNORECASE)
+_NOISE = re.compile(r'\S+@\S+|\([^)]*\)')
+_WORD_EDGES = '.,:;-\'"'
+_DIGIT = re.compile(r'\d')
+_LETTER = re.compile(r'[^\W\d_]')
+
+# Dropped in front of a name.
+TITLES = frozenset({'dr', 'mr', 'mrs', 'ms', 'miss', 'interim'})
+# Dropped after a name or as their own comma-separated piece.
+CREDENTIALS = frozenset({
+    'md', 'do', 'rn', 'bsn', 'msn', 'np', 'aprn', 'pa', 'pa-c', 'msw', 'lcsw', 'lmsw', 'lsw', 'rd', 'rdn', 'ld',
+    'ldn', 'cdn', 'cdces', 'phd', 'mba', 'mha', 'cnn', 'crrn', 'facp',
+})
+# Credentials that are also given names: only credentials as 'DO' or 'D.O.', not 'Do'.
+NAME_CREDENTIALS = frozenset({'do', 'pa'})
+# Cells that hold no one.
+PLACEHOLDERS = frozenset({
+    'tbd', 'tba', 'vacant', 'open', 'n a', 'na', 'none', 'pending', 'unknown', 'position open', 'see above',
+})
+
+
+def _credential(display, key):
+    return key in CREDENTIALS and (key not in NAME_CREDENTIALS or display.isupper() or '.' in display)
+
+
+def _words(text):
+    """(display word, key word) pairs of one name, without titles, credentials or numbers."""
+    pairs = []
+    for word in _NOISE.sub(' ', text).split():
+        key = word.strip(_WORD_EDGES).lower().replace('.', '')
+        if key and not _DIGIT.search(key):
+            pairs.append((word.strip(',;:'), key))
+    while pairs and pairs[0][1] in TITLES:
+        del pairs[0]
+    while len(pairs) > 1 and _credential(*pairs[-1]):
+        del pairs[-1]
+    # Written with dots ('M.D.', 'D.O.') they are credentials anywhere after the first word.
+    return [pair for i, pair in enumerate(pairs) if not (i and '.' in pair[0] and _credential(*pair))]
+
+
+def _credentials_only(piece):
+    words = piece.split()
+    return bool(words) and all(_credential(word, word.strip(_WORD_EDGES).lower().replace('.', '')) for word in words)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _part_people(part):
+    """split_people for one part of a cell between separators; parts recur far more than whole cells."""
+    pieces = [piece for piece in part.split(',') if not _credentials_only(piece)]  # 'Smith, Ana, MD, RN'
+    named = [_words(piece) for piece in pieces]
+    if len(pieces) > 1 and all(len(words) >= 2 for words in named):
+        names = named  # 'Ana Smith, Ben Lee'
+    elif len(pieces) == 2 and len(named[0]) == 1 and named[1]:
+        names = [named[1] + named[0]]  # 'Smith, Ana' is Ana Smith
+    else:
+        names = [[pair for words in named for pair in words]]  # 'Ana Smith, MD'
+    people = []
+    for words in names:
+        key = ' '.join(key for _, key in words)
+        if len(key) > 1 and key not in PLACEHOLDERS and _LETTER.search(key):
+            people.append((key, ' '.join(display for display, _ in words)))
+    return tuple(people)
+
+
+def split_people(cell):
+    """[(key, display name)] for the people named in one cell, in order, without repeats."""
+    if cell is None or cell != cell:
+        return []
+    people = {}
+    for part in _SEPARATORS.split(str(cell)):
+        for key, name in _part_people(part):
+            people.setdefault(key, name)
+    return list(people.items())
+
+
+class PeopleIndex:
+    """Person -> (row, role) postings over the people columns.
+
+    ``names`` holds each person's name as first seen.  The postings of
+    person ``p`` are ``rows[offsets[p]:offsets[p + 1]]``, sorted by row, with
+    the matching ``roles`` as indexes into ``role_names``.
+    """
+
+    def __init__(self, df, columns):
+        self.role_names = [column for column in columns if column in df]
+        person_ids, names, parsed = {}, [], {}
+        person_parts, row_parts, role_parts = [], [], []
+        for role, column in enumerate(self.role_names):
+            codes, uniques = pd.factorize(df[column])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            pair_values, pair_people = [], []
+            for u, value in enumerate(uniques):
+                ids = parsed.get(value)
+                if ids is None:
+                    # The same names recur across columns, so each distinct cell is split once.
+                    ids = []
+                    for key, name in split_people(value):
+                        person = person_ids.get(key)
+                        if person is None:
+                            person = person_ids[key] = len(names)
+                            names.append(name)
+                        ids.append(person)
+                    parsed[value] = ids
+                pair_values.extend([u] * len(ids))
+                pair_people.extend(ids)
+            if not pair_values:
+                continue
+            pair_values = np.array(pair_values, dtype=np.intp)
+            lengths = bounds[pair_values + 1] - bounds[pair_values]
+            row_parts.append(order[concat_ranges(bounds[pair_values], lengths)])
+            person_parts.append(np.repeat(np.array(pair_people, dtype=np.int64), lengths))
+            role_parts.append(np.full(int(lengths.sum()), role, dtype=np.int16))
+
+        if row_parts:
+            people, rows, roles = (np.concatenate(parts) for parts in (person_parts, row_parts, role_parts))
+        else:
+            people, rows, roles = np.empty(0, np.int64), np.empty(0, np.intp), np.empty(0, np.int16)
+        # One packed key sorts several times faster than np.lexsort over the three arrays.
+        order = np.argsort((people * len(df) + rows) * max(len(self.role_names), 1) + roles)
+        people = people[order]
+        self.rows = rows[order].astype(np.int32)
+        self.roles = roles[order]
+        self.offsets = np.searchsorted(people, np.arange(len(names) + 1)).astype(np.int64)
+        self.names = np.array(names, dtype=str) if names else np.empty(0, dtype='U1')
+        # Distinct rows per person; everyone has at least one posting.
+        first = np.ones(len(self.rows), dtype=bool)
+        first[1:] = (self.rows[1:] != self.rows[:-1]) | (people[1:] != people[:-1])
+        self.clinic_counts = (np.add.reduceat(first, self.offsets[:-1]) if len(names)
+                              else np.empty(0, dtype=np.int64)).astype(np.int64)
+        self.name_index = SearchIndex(pd.DataFrame({'name': self.names}), {'name': 1.0})
+
+    ARRAYS = ('rows', 'roles', 'offsets', 'names', 'clinic_counts')
+
+    def state(self):
+        """(arrays, meta): the index as named NumPy arrays plus a small JSON-able dict."""
+        name_arrays, name_meta = self.name_index.state()
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays.update({f'name_{name}': array for name, array in name_arrays.items()})
+        return arrays, {'role_names': self.role_names, 'name_index': name_meta}
+
+    @classmethod
+    def from_state(cls, arrays, meta):
+        index = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(index, name, arrays[name])
+        index.role_names = meta['role_names']
+        index.name_index = SearchIndex.from_state(
+            {name[5:]: array for name, array in arrays.items() if name.startswith('name_')}, meta['name_index'])
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, query, limit=50):
+        """Person ids best matching a name, best first."""
+        return self.name_index.search(query, limit)[0]
+
+    def postings(self, person, roles=None):
+        """(rows, role indexes) of one person, only for ``roles`` (role indexes) when given."""
+        lo, hi = self.offsets[person], self.offsets[person + 1]
+        rows, found = self.rows[lo:hi], self.roles[lo:hi]
+        if roles is not None:
+            keep = np.isin(found, roles)
+            rows, found = rows[keep], found[keep]
+        return rows, found
@@ -0,0 +1,343 @@
+"""Process measurements used by the load reports, startup timing and handler latencies.
+
+This module is imported before anything heavy, so it only uses the standard
+library at import time.
+"""
+
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+
+def _windows_memory_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters
+
+
+def rss_bytes():
+    """Current resident set size of this process in bytes, or None if unavailable."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    if sys.platform == 'win32':
+        counters = _windows_memory_counters()
+        return counters.WorkingSetSize if counters else None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes():
+    """Largest resident set size this process has reached, in bytes, or None if unavailable."""
+    if sys.platform == 'win32':
+        counters = _windows_memory_counters()
+        return counters.PeakWorkingSetSize if counters else None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports kilobytes
+
+
+def _linux_process_age():
+    # starttime (field 22 of /proc/self/stat) counts clock ticks since boot;
+    # psutil turns it into wall time via a boot time rounded to the second.
+    with open('/proc/self/stat') as f:
+        ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+    return time.clock_gettime(time.CLOCK_BOOTTIME) - ticks / os.sysconf('SC_CLK_TCK')
+
+
+def process_age():
+    """Seconds since the process was launched, or None if unavailable.
+
+    For a PyInstaller --onefile exe this counts from when the bootloader that
+    unpacks the bundle started, so it includes the extraction.
+    """
+    onefile = getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS')
+    if sys.platform.startswith('linux') and not onefile:
+        try:
+            return _linux_process_age()
+        except (OSError, ValueError, IndexError, AttributeError):
+            pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        process = psutil.Process()
+        if onefile:
+            parent = process.parent()
+            if parent is not None and parent.name() == process.name():
+                process = parent
+        return max(time.time() - process.create_time(), 0.0)
+    except psutil.Error:
+        return None
+
+
+def timing_log_path():
+    """Where startup timings are appended: $CLINIC_TOOL_TIMING_LOG, or beside the parse cache."""
+    path = os.environ.get('CLINIC_TOOL_TIMING_LOG')
+    if path:
+        return path
+    from clinic_cache import cache_dir
+    return os.path.join(os.path.dirname(cache_dir()), 'startup-timing.jsonl')
+
+
+class PhaseTimer:
+    """Startup phases with monotonic timestamps and memory use.
+
+    Each ``mark(name)`` ends a phase that began at the previous mark, or at
+    process launch for the first one.  When the timer is not enabled every
+    call is a no-op, so the marks can stay in the code for good.
+    """
+
+    def __init__(self, enabled, budget=None):
+        self.enabled = enabled
+        self.budget = budget  # seconds from launch; None = no limit
+        self.phases = []
+        self.origin = time.monotonic()
+        if enabled:
+            age = process_age()
+            if age is not None:
+                self.origin -= age  # Count from the launch, on the monotonic clock
+                self.mark('launch')
+
+    @classmethod
+    def from_environment(cls, argv=None):
+        """Enabled by --timing or CLINIC_TOOL_TIMING=1; a budget from --startup-budget SECONDS or CLINIC_TOOL_STARTUP_BUDGET."""
+        argv = sys.argv if argv is None else argv
+        enabled = '--timing' in argv or os.environ.get('CLINIC_TOOL_TIMING', '') not in ('', '0')
+        budget = os.environ.get('CLINIC_TOOL_STARTUP_BUDGET')
+        if '--startup-budget' in argv[:-1]:
+            budget = argv[argv.index('--startup-budget') + 1]
+        try:
+            budget = float(budget) if budget else None
+        except ValueError:
+            print(f'Ignoring startup budget {budget!r}: not a number of seconds', file=sys.stderr)
+            budget = None
+        return cls(enabled or budget is not None, budget)
+
+    def mark(self, name):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        start = self.phases[-1]['end'] if self.phases else 0.0
+        self.phases.append({
+            'phase': name,
+            'start': round(start, 4),
+            'end': round(now - self.origin, 4),
+            'rss': rss_bytes(),
+            'peak_rss': peak_rss_bytes(),
+        })
+
+    @property
+    def elapsed(self):
+        return self.phases[-1]['end'] if self.phases else 0.0
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.elapsed > self.budget
+
+    def report(self):
+        lines = [f"{'Phase':<24}{'Seconds':>10}{'At':>10}{'Peak RSS':>14}"]
+        for phase in self.phases:
+            lines.append(f"{phase['phase']:<24}{phase['end'] - phase['start']:>10.3f}{phase['end']:>10.3f}"
+                         f"{format_bytes(phase['peak_rss']):>14}")
+        total = f'Total {self.elapsed:.3f} s'
+        if self.budget is not None:
+            total += f" ({'over' if self.over_budget else 'within'} budget of {self.budget:g} s)"
+        lines.append(total)
+        return '\n'.join(lines)
+
+    def write_log(self, path=None):
+        """Append this run as one JSON line and return the log path."""
+        path = path or timing_log_path()
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'frozen': bool(getattr(sys, 'frozen', False)),
+            'total': self.elapsed,
+            'budget': self.budget,
+            'over_budget': self.over_budget,
+            'phases': self.phases,
+        }
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        return path
+
+
+# Upper bounds of the latency histogram buckets, in ms; one more bucket holds anything slower.
+LATENCY_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def latency_log_path():
+    """Where latency histograms are appended: $CLINIC_TOOL_LATENCY_LOG, or beside the parse cache."""
+    path = os.environ.get('CLINIC_TOOL_LATENCY_LOG')
+    if path:
+        return path
+    from clinic_cache import cache_dir
+    return os.path.join(os.path.dirname(cache_dir()), 'latency.jsonl')
+
+
+def percentile_ms(buckets, fraction):
+    """Upper bound in ms of the bucket holding the ``fraction`` point of the calls; inf past the last bound."""
+    target = fraction * sum(buckets)
+    seen = 0
+    for bound, count in zip(LATENCY_BOUNDS_MS + (float('inf'),), buckets):
+        seen += count
+        if count and seen >= target:
+            return bound
+    return 0.0
+
+
+class LatencyRecorder:
+    """Call counts and latency histograms per handler or data operation.
+
+    Functions are wrapped once with ``timed(name)`` and the recorder can be
+    turned on and off at any time; while it is off a call costs one extra
+    attribute check.  Times are inclusive, so a handler that calls another
+    counts the inner one's time too.  Safe to record from any thread.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.since = time.time()
+        self._operations = {}  # name -> [calls, total seconds, max seconds, bucket counts]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls, argv=None):
+        """Enabled by --latency or CLINIC_TOOL_LATENCY=1."""
+        argv = sys.argv if argv is None else argv
+        return cls('--latency' in argv or os.environ.get('CLINIC_TOOL_LATENCY', '') not in ('', '0'))
+
+    def timed(self, name=None):
+        def decorate(function):
+            label = name or function.__name__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.add(label, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def add(self, name, seconds):
+        bucket = bisect.bisect_left(LATENCY_BOUNDS_MS, seconds * 1000)
+        with self._lock:
+            operation = self._operations.get(name)
+            if operation is None:
+                operation = self._operations[name] = [0, 0.0, 0.0, [0] * (len(LATENCY_BOUNDS_MS) + 1)]
+            operation[0] += 1
+            operation[1] += seconds
+            operation[2] = max(operation[2], seconds)
+            operation[3][bucket] += 1
+
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+            self.since = time.time()
+
+    def operations(self):
+        """{name: {calls, total_ms, max_ms, buckets}}, a copy."""
+        with self._lock:
+            return {name: {'calls': calls, 'total_ms': round(total * 1000, 3), 'max_ms': round(longest * 1000, 3),
+                           'buckets': list(buckets)}
+                    for name, (calls, total, longest, buckets) in self._operations.items()}
+
+    def report(self, operations=None):
+        operations = self.operations() if operations is None else operations
+        lines = [f"{'Operation':<28}{'Calls':>7}{'Mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'Max ms':>10}"]
+        for name, entry in sorted(operations.items(), key=lambda item: -item[1]['total_ms']):
+            # Bucket bounds, but never above the slowest call
+            p50, p95 = (min(percentile_ms(entry['buckets'], fraction), entry['max_ms']) for fraction in (0.5, 0.95))
+            lines.append(f"{name:<28}{entry['calls']:>7}{entry['total_ms'] / entry['calls']:>10.2f}"
+                         f"{p50:>9.2f}{p95:>9.2f}{entry['max_ms']:>10.2f}")
+        return '\n'.join(lines)
+
+    def write_log(self, path=None):
+        """Append the histograms so far as one JSON line and return the log path."""
+        path = path or latency_log_path()
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'since': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.since)),
+            'frozen': bool(getattr(sys, 'frozen', False)),
+            'bounds_ms': list(LATENCY_BOUNDS_MS),
+            'operations': self.operations(),
+        }
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        return path
+
+
+def merge_latency(entries):
+    """Sum the operations of several write_log entries, e.g. collected from many users."""
+    merged = {}
+    for entry in entries:
+        for name, operation in entry['operations'].items():
+            total = merged.setdefault(name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                             'buckets': [0] * len(operation['buckets'])})
+            total['calls'] += operation['calls']
+            total['total_ms'] += operation['total_ms']
+            total['max_ms'] = max(total['max_ms'], operation['max_ms'])
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], operation['buckets'])]
+    return merged
+
+
+# The one recorder the tool's modules wrap their handlers and data operations with.
+latency = LatencyRecorder.from_environment()
+
+
+def format_bytes(value):
+    if value is None:
+        return 'n/a'
+    return f'{value / 1048576:,.1f} MB'
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Combine latency logs written by the Clinic Info Tool')
+    parser.add_argument('logs', nargs='*', help=f'latency.jsonl files (default: {latency_log_path()})')
+    args = parser.parse_args()
+
+    entries = []
+    for path in args.logs or [latency_log_path()]:
+        with open(path, encoding='utf-8') as f:
+            entries.extend(json.loads(line) for line in f if line.strip())
+    print(f'{len(entries)} sessions')
+    print(LatencyRecorder().report(merge_latency(entries)))
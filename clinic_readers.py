@@ -0,0 +1,216 @@
+"""Reader engines for the Fac List source.
+
+Every engine returns the raw sheet restricted to the wanted columns, with
+blank cells as None; clinic_data.apply_schema then turns that into the
+normalized frame, so all engines produce identical results.
+
+Engines:
+    openpyxl  -- read-only streaming iter_rows over .xlsx/.xlsm
+    calamine  -- Rust-backed python-calamine, when it is installed
+    csv       -- a CSV export of the sheet
+    parquet   -- a Parquet export of the sheet
+
+The engine comes from the ``reader`` argument, the CLINIC_TOOL_READER
+environment variable, or is picked from the file extension ('auto').
+Passing ALL_COLUMNS as the wanted set reads every column of a sheet.
+"""
+
+import datetime
+import os
+import zipfile
+from xml.etree import ElementTree
+
+import pandas as pd
+
+PROGRESS_EVERY = 2000  # rows between progress reports
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+
+
+class ReaderError(Exception):
+    pass
+
+
+class _AllColumns:
+    def __contains__(self, name):
+        return True
+
+
+ALL_COLUMNS = _AllColumns()
+
+
+_MIDNIGHT = datetime.time()
+
+
+def _frame(header, rows, wanted, dates=False):
+    """Build a raw frame from a header row and value rows, keeping ``wanted`` columns.
+
+    With ``dates``, datetimes at midnight become dates: openpyxl returns date
+    cells as datetimes, calamine as dates, and both must read the same.
+    """
+    positions = {}
+    for i, name in enumerate(header):
+        if name is None:
+            continue
+        name = str(name)
+        if name in wanted and name not in positions:
+            positions[name] = i
+    names = list(positions)
+    indexes = list(positions.values())
+    data = []
+    for row in rows:
+        values = [row[i] if i < len(row) else None for i in indexes]
+        values = [None if value == '' else value for value in values]
+        if dates:
+            values = [value.date() if type(value) is datetime.datetime and value.time() == _MIDNIGHT else value
+                      for value in values]
+        if any(value is not None for value in values):
+            data.append(values)
+    return pd.DataFrame(data, columns=names, dtype=object)
+
+
+def _counted(rows, total, progress):
+    for count, row in enumerate(rows, 1):
+        if count % PROGRESS_EVERY == 0:
+            progress('parse', count, total)
+        yield row
+
+
+class OpenpyxlReader:
+    name = 'openpyxl'
+
+    @staticmethod
+    def available():
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def read(self, source, sheet_name, wanted, progress):
+        import openpyxl
+
+        # read_only streams the sheet XML instead of building the workbook
+        # object model; keep_vba=False skips the macros in the .xlsm.
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True, keep_links=False, keep_vba=False)
+        try:
+            sheet = workbook[sheet_name]
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, ())
+            total = max((sheet.max_row or 1) - 1, 0)
+            return _frame(header, _counted(rows, total, progress), wanted, dates=True)
+        finally:
+            workbook.close()
+
+
+class CalamineReader:
+    name = 'calamine'
+
+    @staticmethod
+    def available():
+        try:
+            import python_calamine  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def read(self, source, sheet_name, wanted, progress):
+        from python_calamine import CalamineWorkbook
+
+        if isinstance(source, (str, os.PathLike)):
+            workbook = CalamineWorkbook.from_path(os.fspath(source))
+        else:
+            workbook = CalamineWorkbook.from_filelike(source)
+        sheet = workbook.get_sheet_by_name(sheet_name)
+        rows = iter(sheet.to_python(skip_empty_area=False))
+        header = next(rows, ())
+        return _frame(header, _counted(rows, max(sheet.height - 1, 0), progress), wanted)
+
+
+class CsvReader:
+    name = 'csv'
+
+    @staticmethod
+    def available():
+        return True
+
+    def read(self, source, sheet_name, wanted, progress):
+        # Everything as text; apply_schema does the typing, as for the Excel engines.
+        df = pd.read_csv(source, dtype=str, usecols=lambda name: name in wanted, keep_default_na=False)
+        return _frame(list(df.columns), df.itertuples(index=False, name=None), wanted)
+
+
+class ParquetReader:
+    name = 'parquet'
+
+    @staticmethod
+    def available():
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def read(self, source, sheet_name, wanted, progress):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(source)
+        columns = [name for name in parquet_file.schema_arrow.names if name in wanted]
+        df = parquet_file.read(columns=columns).to_pandas()
+        for name in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[name]):
+                values = df[name]
+                # Dates as the Excel engines give them; times of day kept
+                df[name] = values.astype(object).mask(values == values.dt.normalize(), values.dt.date)
+        df = df.astype(object).where(df.notna(), None)
+        return _frame(list(df.columns), df.itertuples(index=False, name=None), wanted)
+
+
+ENGINES = {engine.name: engine for engine in (OpenpyxlReader(), CalamineReader(), CsvReader(), ParquetReader())}
+
+
+def engines_for(path):
+    """Names of the installed engines that can read ``path``, fastest first."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in EXCEL_EXTENSIONS:
+        names = ['calamine', 'openpyxl']
+    elif extension == '.csv':
+        names = ['csv']
+    elif extension in ('.parquet', '.pq'):
+        names = ['parquet']
+    else:
+        names = []
+    return [name for name in names if ENGINES[name].available()]
+
+
+def sheet_names(path):
+    """Visible sheet names of a workbook, read from its xl/workbook.xml without parsing any sheet.
+
+    CSV and Parquet exports hold a single unnamed sheet: [None].
+    """
+    if os.path.splitext(path)[1].lower() not in EXCEL_EXTENSIONS:
+        return [None]
+    namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+    try:
+        with zipfile.ZipFile(path) as archive:
+            root = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise ReaderError(f'{os.path.basename(path)} is not a readable workbook: {e}') from e
+    return [sheet.get('name') for sheet in root.iter(f'{namespace}sheet')
+            if sheet.get('state', 'visible') == 'visible']
+
+
+def choose_engine(path, reader=None):
+    """The engine to use for ``path``: ``reader``, $CLINIC_TOOL_READER, or auto-detected."""
+    name = (reader or os.environ.get('CLINIC_TOOL_READER') or 'auto').lower()
+    if name == 'auto':
+        candidates = engines_for(path)
+        if not candidates:
+            raise ReaderError(f'No installed reader can open {os.path.basename(path)}')
+        return ENGINES[candidates[0]]
+    if name not in ENGINES:
+        raise ReaderError(f"Unknown reader '{name}' (choose from {', '.join(ENGINES)} or auto)")
+    engine = ENGINES[name]
+    if not engine.available():
+        raise ReaderError(f"Reader '{name}' is not installed")
+    return engine
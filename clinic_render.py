@@ -0,0 +1,80 @@
+"""HTML for the clinic detail pane.
+
+The page layout is compiled once from clinic_data.DETAIL_FIELDS into a
+str.format template, so rendering a clinic is one row fetch and one format
+call.  Rendered pages are kept in a small LRU keyed by (Fac#, store version).
+"""
+
+import html
+from collections import OrderedDict
+
+from clinic_data import DETAIL_FIELDS
+from clinic_perf import latency
+
+PAGE_CACHE_SIZE = 256
+
+_ROW = '<tr><td style="text-align: right; padding-right: 10px;">{label}</td><td>{value}</td></tr>'
+
+
+def _literal(text):
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+def compile_page(fields=DETAIL_FIELDS):
+    """(template, columns): ``template.format(*values)`` takes one value per column, in order."""
+    rows, columns = [], []
+    for field in fields:
+        label, names = field[0], field[1]
+        value_format = field[2] if len(field) > 2 else '{}' * len(names)
+        label = f'<b>{_literal(html.escape(label))}:</b>' if label else ''
+        rows.append(_ROW.format(label=label, value=value_format))
+        columns.extend(names)
+    return '<table>\n' + '\n'.join(rows) + '\n</table>\n', tuple(columns)
+
+
+def value_fields(fields=DETAIL_FIELDS):
+    """(label, columns, value format) for each field that shows a value, headings left out."""
+    return [(field[0], field[1], field[2] if len(field) > 2 else '{}') for field in fields if field[1]]
+
+
+class PageCache:
+    """A bounded least-recently-used map of rendered pages."""
+
+    def __init__(self, capacity=PAGE_CACHE_SIZE):
+        self.capacity = capacity
+        self._pages = OrderedDict()
+
+    def __len__(self):
+        return len(self._pages)
+
+    def get(self, key):
+        page = self._pages.get(key)
+        if page is not None:
+            self._pages.move_to_end(key)
+        return page
+
+    def put(self, key, page):
+        self._pages[key] = page
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.capacity:
+            self._pages.popitem(last=False)
+
+    def clear(self):
+        self._pages.clear()
+
+
+class DetailRenderer:
+    def __init__(self, fields=DETAIL_FIELDS, capacity=PAGE_CACHE_SIZE):
+        self.template, self.columns = compile_page(fields)
+        self.pages = PageCache(capacity)
+
+    @latency.timed('render')
+    def render(self, store, position):
+        """Detail page HTML for the clinic at row ``position`` of ``store``."""
+        key = (store.fac_at(position), store.version)
+        page = self.pages.get(key)
+        if page is None:
+            values = store.row_values(position, self.columns)
+            page = self.template.format(*(html.escape(str(value)) for value in values))
+            self.pages.put(key, page)
+        return page
@@ -0,0 +1,226 @@
+"""Local replicas of the files the tool reads from the share.
+
+Reading the workbook, splash image and icon over SMB on every launch makes
+startup as slow as the share, and impossible while it is down.  Each share
+file gets a local copy and a manifest:
+
+    <root>/<source id>/<file name>      the last good copy
+    <root>/<source id>/manifest.json    origin, size, mtime_ns, sha256, fetched, checked, error
+
+The tool starts from the local copy straight away and pulls a newer one in
+the background (stale-while-revalidate).  A pull copies the file in chunks
+to a temporary file, hashing as it goes, then checks that the source's
+size and mtime did not change during the copy and reads the source a
+second time to check that it still hashes the same, which catches a file
+rewritten in place and a garbled read, before it replaces the copy.
+Copies keep the source's mtime, so the parse cache and snapshot keys are
+the ones the share file itself would give.
+
+CLINIC_TOOL_SHARE points the tool at another directory in place of the
+share (a local directory will do), CLINIC_TOOL_REPLICA_DIR moves the
+replicas, and CLINIC_TOOL_REPLICA=off reads the share directly.
+
+Nothing here imports pandas or Qt, so the splash can use it before either.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+SHARE_DIR = os.environ.get('CLINIC_TOOL_SHARE') or r'\\corpfs01\fmcna-shared\OPEX\chrome\data'
+CHUNK_SIZE = 1 << 20
+
+
+class ReplicaError(OSError):
+    pass
+
+
+def share_path(name):
+    return os.path.join(SHARE_DIR, name)
+
+
+def enabled():
+    return os.environ.get('CLINIC_TOOL_REPLICA', '').lower() not in ('off', '0', 'no')
+
+
+def replica_dir():
+    base = os.environ.get('CLINIC_TOOL_REPLICA_DIR')
+    if not base:
+        root = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+        base = os.path.join(root, 'ClinicInfoTool', 'replica')
+    return base
+
+
+def _stat(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _ago(seconds):
+    if seconds < 60:
+        return 'just now'
+    if seconds < 3600:
+        return f'{int(seconds // 60)} min ago'
+    if seconds < 86400:
+        return f'{int(seconds // 3600)} h ago'
+    return f'{int(seconds // 86400)} days ago'
+
+
+class Replica:
+    """The local copy of one share file.
+
+    ``sync`` may run on a background thread while the UI thread reads
+    ``manifest``; it only ever swaps the manifest for a new dict.
+    """
+
+    def __init__(self, source, root=None):
+        self.source = source
+        key = os.path.normcase(os.path.abspath(source))
+        self.directory = os.path.join(root or replica_dir(), hashlib.sha1(key.encode('utf-8')).hexdigest()[:16])
+        # Split on both separators so UNC paths name the file on every platform.
+        self.path = os.path.join(self.directory, re.split(r'[\\/]', source)[-1])
+        self._manifest_path = os.path.join(self.directory, 'manifest.json')
+        self._lock = threading.Lock()
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            return manifest if _stat(self.path) == (manifest['size'], manifest['mtime_ns']) else None
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_manifest(self, manifest):
+        self.manifest = manifest
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self._manifest_path)
+        except OSError:
+            pass  # The copy is still good; only the check times are lost
+
+    def available(self):
+        """True when there is a verified local copy to start from."""
+        return self.manifest is not None
+
+    def _fail(self, message):
+        if self.manifest is not None:
+            self._write_manifest(dict(self.manifest, error=message))
+        raise ReplicaError(message)
+
+    def sync(self, progress=None):
+        """Pull the source if it differs from the copy; True if the copy was replaced.
+
+        ``progress(bytes_copied, total)`` is called per chunk.  Raises
+        ReplicaError when the share cannot be read or a second read of the
+        source does not hash the same as the copy; the previous copy is
+        left as it was.
+        """
+        with self._lock:
+            try:
+                stat = _stat(self.source)
+            except OSError as e:
+                self._fail(f'Cannot reach {self.source}: {e}')
+            manifest = self.manifest
+            if manifest is not None and stat == (manifest['size'], manifest['mtime_ns']):
+                self._write_manifest(dict(manifest, checked=time.time(), error=None))
+                return False
+
+            tmp = None
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.part')
+                digest = hashlib.sha256()
+                copied = 0
+                with os.fdopen(fd, 'wb') as out, open(self.source, 'rb') as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        digest.update(chunk)
+                        out.write(chunk)
+                        copied += len(chunk)
+                        if progress:
+                            progress(copied, stat[0])
+                    out.flush()
+                    os.fsync(out.fileno())
+                if _stat(self.source) != stat or copied != stat[0]:
+                    raise ReplicaError(f'{self.source} changed while it was being copied')
+                if _digest(self.source) != digest.hexdigest():
+                    raise ReplicaError(f'{self.source} read differently twice; the copy was not kept')
+                os.utime(tmp, ns=(stat[1], stat[1]))
+                os.replace(tmp, self.path)
+                tmp = None
+            except OSError as e:
+                self._fail(str(e) if isinstance(e, ReplicaError) else f'Cannot copy {self.source}: {e}')
+            finally:
+                if tmp is not None:
+                    try:
+                        os.remove(tmp)
+                    except OSError:
+                        pass
+
+            now = time.time()
+            self._write_manifest({
+                'origin': os.path.abspath(self.source), 'size': stat[0], 'mtime_ns': stat[1],
+                'sha256': digest.hexdigest(), 'fetched': now, 'checked': now, 'error': None,
+            })
+            return True
+
+    def describe(self, now=None):
+        """How current the copy is, e.g. 'Data saved 10/18 09:12, checked 3 min ago'; '' with no copy."""
+        manifest = self.manifest
+        if manifest is None:
+            return ''
+        now = time.time() if now is None else now
+        saved = time.strftime('%m/%d %H:%M', time.localtime(manifest['mtime_ns'] / 1e9))
+        checked = _ago(now - manifest['checked'])
+        if manifest.get('error'):
+            return f'Data saved {saved}; share unreachable, last reached {checked}'
+        return f'Data saved {saved}, checked {checked}'
+
+
+def local_source(source, progress=None, refresh=True):
+    """The path to read ``source`` from.
+
+    That is ``source`` itself with replicas off.  Otherwise the replica is
+    pulled first when ``refresh`` is set or there is no copy yet, and an
+    existing copy is used as it is when the share cannot be read.
+    """
+    if not enabled():
+        return source
+    replica = Replica(source)
+    if refresh or not replica.available():
+        try:
+            replica.sync(progress)
+        except ReplicaError:
+            if not replica.available():
+                raise
+    return replica.path
+
+
+def asset(source):
+    """The local copy of a share file when there is one, else ``source``; a newer copy is pulled in the background."""
+    if not enabled():
+        return source
+    replica = Replica(source)
+
+    def pull():
+        try:
+            replica.sync()
+        except ReplicaError:
+            pass
+
+    threading.Thread(target=pull, daemon=True).start()
+    return replica.path if replica.available() else source
@@ -0,0 +1,213 @@
+"""In-memory full-text search over clinic text fields.
+
+Cells are split into word tokens.  Each distinct token has a postings list
+of (row, field weight), and a trigram index over the distinct tokens finds
+partial and misspelt words without scanning the rows.  A query is scored
+per row: every query word contributes its best match (exact > prefix >
+fuzzy) times the weight of the field it matched in.
+
+The index is nothing but NumPy arrays (the trigram index is stored CSR
+style), so it can be saved with state() and memory-mapped back with
+from_state().
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+_TOKEN = re.compile(r'[^\W_]+')
+
+MIN_SIMILARITY = 0.4  # Trigram Jaccard similarity for a fuzzy match
+EXACT, PREFIX, ONE_EDIT = 1.0, 0.8, 0.7
+MAX_PREFIX_TOKENS = 200
+MAX_FUZZY_TOKENS = 100
+MAX_EDIT_CHECKS = 2000
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text).lower())
+
+
+def trigrams(token):
+    padded = f'${token}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def within_one_edit(a, b):
+    """True if ``a`` and ``b`` differ by at most one insertion, deletion, substitution or adjacent swap."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return (len(diff) == 2 and diff[1] == diff[0] + 1
+                and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def concat_ranges(starts, lengths):
+    """``arange(start, start + length)`` for each pair, concatenated."""
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.intp)
+    shifts = starts - np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.repeat(shifts, lengths) + np.arange(total)
+
+
+class SearchIndex:
+    """Token postings plus a trigram index over the token vocabulary.
+
+    ``fields`` maps column name -> weight.  Tokenizing works on the distinct
+    values of each column, so repeated names and categoricals cost one pass
+    per value rather than per row.
+    """
+
+    def __init__(self, df, fields):
+        self.row_count = len(df)
+        vocab = {}
+        token_parts, row_parts, weight_parts = [], [], []
+        for column, weight in fields.items():
+            if column not in df:
+                continue
+            codes, uniques = pd.factorize(df[column])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            pair_values, pair_tokens = [], []
+            for u, value in enumerate(uniques):
+                for token in set(tokenize(value)):
+                    pair_values.append(u)
+                    pair_tokens.append(vocab.setdefault(token, len(vocab)))
+            if not pair_values:
+                continue
+            pair_values = np.array(pair_values, dtype=np.intp)
+            lengths = bounds[pair_values + 1] - bounds[pair_values]
+            rows = order[concat_ranges(bounds[pair_values], lengths)]
+            token_parts.append(np.repeat(np.array(pair_tokens, dtype=np.int64), lengths))
+            row_parts.append(rows)
+            weight_parts.append(np.full(len(rows), weight))
+
+        # Token ids follow sorted order, so prefixes are a contiguous id range.
+        words = sorted(vocab)
+        self.words = np.array(words, dtype=str) if words else np.empty(0, dtype='U1')
+        remap = np.empty(len(vocab), dtype=np.int64)
+        for new_id, word in enumerate(words):
+            remap[vocab[word]] = new_id
+
+        # One posting per (token, row), keeping the heaviest field it appeared in.
+        stride = max(self.row_count, 1)
+        if token_parts:
+            keys = remap[np.concatenate(token_parts)] * stride + np.concatenate(row_parts)
+            weights = np.concatenate(weight_parts)
+        else:
+            keys, weights = np.empty(0, dtype=np.int64), np.empty(0)
+        order = np.argsort(keys)
+        keys, weights = keys[order], weights[order]
+        if len(keys):
+            starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+            keys, weights = keys[starts], np.maximum.reduceat(weights, starts)
+        self.weights = weights.astype(np.float32)
+        self.rows = (keys % stride).astype(np.int32)
+        self.offsets = np.searchsorted(keys // stride, np.arange(len(self.words) + 1))
+
+        grams = {}
+        self.gram_counts = np.empty(len(words), dtype=np.int64)
+        for word_id, word in enumerate(words):
+            word_grams = trigrams(word)
+            self.gram_counts[word_id] = len(word_grams)
+            for gram in word_grams:
+                grams.setdefault(gram, []).append(word_id)
+        # Trigram -> word ids as one array plus offsets, in gram_names order.
+        self.gram_names = list(grams)
+        self.gram_ids = {gram: i for i, gram in enumerate(self.gram_names)}
+        self.gram_offsets = np.cumsum([0] + [len(ids) for ids in grams.values()]).astype(np.int64)
+        self.gram_words = np.fromiter((i for ids in grams.values() for i in ids), dtype=np.int64,
+                                      count=int(self.gram_offsets[-1]))
+        self.word_lengths = np.array([len(word) for word in words], dtype=np.int64)
+
+    ARRAYS = ('rows', 'weights', 'offsets', 'words', 'gram_counts', 'gram_offsets', 'gram_words', 'word_lengths')
+
+    def state(self):
+        """(arrays, meta): the index as named NumPy arrays plus a small JSON-able dict."""
+        return {name: getattr(self, name) for name in self.ARRAYS}, {
+            'row_count': self.row_count, 'gram_names': self.gram_names,
+        }
+
+    @classmethod
+    def from_state(cls, arrays, meta):
+        index = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(index, name, arrays[name])
+        index.row_count = meta['row_count']
+        index.gram_names = meta['gram_names']
+        index.gram_ids = {gram: i for i, gram in enumerate(index.gram_names)}
+        return index
+
+    def _gram_words(self, gram):
+        i = self.gram_ids.get(gram)
+        if i is None:
+            return None
+        return self.gram_words[self.gram_offsets[i]:self.gram_offsets[i + 1]]
+
+    def matches(self, token):
+        """{word id: similarity} for vocabulary words matching one query token."""
+        found = {}
+        lo, hi = np.searchsorted(self.words, [token, token + '\uffff'])
+        for word_id in range(lo, min(hi, lo + MAX_PREFIX_TOKENS)):
+            found[word_id] = EXACT if self.words[word_id] == token else PREFIX
+        if len(token) < 3:
+            return found
+
+        query = trigrams(token)
+        postings = [ids for ids in map(self._gram_words, query) if ids is not None]
+        if not postings:
+            return found
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.words))
+        candidates = np.flatnonzero(shared)
+        similarity = shared[candidates] / (len(query) + self.gram_counts[candidates] - shared[candidates])
+        close = similarity >= MIN_SIMILARITY
+        best = np.argsort(-similarity[close], kind='stable')[:MAX_FUZZY_TOKENS]
+        for word_id, score in zip(candidates[close][best].tolist(), similarity[close][best].tolist()):
+            found[word_id] = max(found.get(word_id, 0.0), min(score, PREFIX))
+        # One typo in a short word leaves few shared trigrams; check those directly.
+        near = candidates[~close & (np.abs(self.word_lengths[candidates] - len(token)) <= 1)]
+        for word_id in near[:MAX_EDIT_CHECKS].tolist():
+            if word_id not in found and within_one_edit(token, self.words[word_id]):
+                found[word_id] = ONE_EDIT
+        return found
+
+    def search(self, query, limit=50):
+        """Best matching rows for ``query`` as (rows, scores), best first.
+
+        Rows matching every query word rank first; when none do, rows
+        matching the most words are returned.
+        """
+        total = np.zeros(self.row_count)
+        matched = np.zeros(self.row_count, dtype=np.int64)
+        for token in tokenize(query):
+            found = self.matches(token)
+            if not found:
+                continue
+            word_ids = np.fromiter(found.keys(), dtype=np.intp, count=len(found))
+            similarity = np.fromiter(found.values(), dtype=float, count=len(found))
+            starts = self.offsets[word_ids]
+            lengths = self.offsets[word_ids + 1] - starts
+            postings = concat_ranges(starts, lengths)
+            best = np.zeros(self.row_count)
+            np.maximum.at(best, self.rows[postings], self.weights[postings] * np.repeat(similarity, lengths))
+            total += best
+            matched += best > 0
+        top = matched.max() if self.row_count else 0
+        if top == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        candidates = np.flatnonzero(matched == top)
+        rows = candidates[np.argsort(-total[candidates], kind='stable')[:limit]]
+        return rows, total[rows]
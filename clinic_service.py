@@ -0,0 +1,523 @@
+"""Shared clinic query service.
+
+One process loads the Fac List and answers the queries of every GUI and CLI
+on the machine over a localhost HTTP JSON API, so a terminal server holds
+one copy of the data instead of one per session.
+
+    python clinic_service.py [--workbook PATH] [--port 8765]
+
+Clients call connect(path).  It returns a RemoteStore, which has the same
+query methods as clinic_data.ClinicStore, when a service with that workbook
+loaded answers, and None otherwise, in which case the client loads the data
+in process as before.  CLINIC_TOOL_SERVICE=host:port points clients at
+another address, and CLINIC_TOOL_SERVICE=off stops them looking.
+
+The service and its clients share a secret token, kept in service.token in
+the user's cache directory (CLINIC_TOOL_SERVICE_TOKEN names another file,
+e.g. one a group of users may read).  Every request carries a fresh nonce
+and an HMAC of itself under the token, and every reply an HMAC of the nonce
+and the reply, so another user's process holding the port can neither
+query the service nor pass itself off as it.  Without the token file a
+client does not use the service.
+
+API:
+    GET  /status   -> {version, rows, source, source_stat}
+    POST /query    {method, args, version} -> {result}
+    POST /refresh  {version} -> /status after reloading a changed workbook,
+                   plus the diff from ``version`` when the service has it
+"""
+
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+
+import numpy as np
+
+from clinic_cache import cache_dir
+from clinic_data import DEFAULT_WORKBOOK, StoreDiff, diff_stores, load_clinic_store, source_stat
+from clinic_history import record
+from clinic_replica import local_source
+
+DEFAULT_PORT = 8765
+WORKERS = 8
+POLL_INTERVAL = 30  # seconds between checks of the workbook
+KEEP_PREVIOUS = 600  # seconds a replaced version still answers, for clients that have not reloaded yet
+CONNECT_TIMEOUT = 0.5
+QUERY_TIMEOUT = 10
+REFRESH_TIMEOUT = 600
+NONCE_HEADER = 'X-Clinic-Nonce'
+SIGNATURE_HEADER = 'X-Clinic-Signature'
+
+# ClinicStore methods clients may call; everything else is refused.
+QUERY_METHODS = frozenset({
+    'row', 'fac_at', 'row_values', 'column_values', 'node_path', 'node_rows', 'clinics_at', 'clinic_table',
+    'area_clinics', 'browse_tree', 'fac_prefix', 'search', 'nearest', 'people', 'person_roles', 'person_clinics',
+})
+
+
+class ServiceError(Exception):
+    pass
+
+
+class StaleVersion(ServiceError):
+    pass
+
+
+def token_path():
+    return os.environ.get('CLINIC_TOOL_SERVICE_TOKEN') or os.path.join(cache_dir(), 'service.token')
+
+
+def read_token(path=None):
+    """The shared token as bytes, or None when there is no token file."""
+    try:
+        with open(path or token_path(), 'rb') as f:
+            token = f.read().strip()
+    except OSError:
+        return None
+    return token or None
+
+
+def create_token(path=None):
+    """The service's token, written readable by this user only when there is none yet."""
+    path = path or token_path()
+    token = read_token(path)
+    if token is not None:
+        return token
+    token = secrets.token_hex(32).encode('ascii')
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return read_token(path)  # Another service started at the same moment
+    with os.fdopen(fd, 'wb') as f:
+        f.write(token)
+    return token
+
+
+def _sign(token, nonce, *parts):
+    message = b'\n'.join([nonce.encode('ascii'), *parts])
+    return hmac.new(token, message, hashlib.sha256).hexdigest()
+
+
+def _plain(value):
+    """``value`` with arrays, numpy scalars and NaN turned into JSON types."""
+    if isinstance(value, np.ndarray):
+        return [_plain(item) for item in value.tolist()] if value.dtype == object else value.tolist()
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _load_local(path, reader=None):
+    """Load ``path`` in this process, through its local replica when replicas are on."""
+    store = load_clinic_store(local_source(path), reader=reader, origin=path)
+    store.geo_index  # Built now rather than by the first nearest-clinic query
+    try:
+        record(store, path)  # Clients of the service have no table to record the version from
+    except Exception as e:
+        print(f'clinic_service: could not record this version in the change history: {type(e).__name__}: {e}',
+              file=sys.stderr)
+    return store
+
+
+def _same_file(a, b):
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+class ClinicService:
+    """The loaded store plus reloading; safe to query from many threads.
+
+    A reload builds the new store beside the old one and swaps the reference,
+    so readers never see a half-built store.  The replaced store keeps
+    answering for KEEP_PREVIOUS seconds, because clients address rows by
+    position and need the version they loaded until they reload themselves.
+    """
+
+    def __init__(self, path, reader=None):
+        self.path = path
+        self.reader = reader
+        self.store = _load_local(path, reader)
+        self._previous = None  # (store, time replaced)
+        self._diff = None  # (old version, StoreDiff) for the last reload
+        self._lock = threading.Lock()
+
+    def status(self):
+        store = self.store
+        return {
+            'version': store.version,
+            'rows': len(store),
+            'source': os.path.abspath(self.path),
+            'source_stat': store.source_stat,
+        }
+
+    def refresh(self):
+        """Reload if the workbook has changed since the current store was loaded."""
+        with self._lock:
+            try:
+                stat = source_stat(local_source(self.path))
+            except OSError:
+                return
+            old = self.store
+            if stat == old.source_stat:
+                return
+            try:
+                new = _load_local(self.path, self.reader)
+            except Exception as e:
+                print(f'clinic_service: reload failed, keeping version {old.version}: {type(e).__name__}: {e}',
+                      file=sys.stderr)
+                return
+            self._diff = (old.version, diff_stores(old, new))
+            self._previous = (old, time.monotonic())
+            self.store = new
+
+    def diff_since(self, version):
+        diff = self._diff
+        return diff[1].as_dict() if diff is not None and diff[0] == version else None
+
+    def store_for(self, version):
+        store = self.store
+        if version is None or version == store.version:
+            return store
+        previous = self._previous
+        if previous is not None and previous[0].version == version:
+            if time.monotonic() - previous[1] < KEEP_PREVIOUS:
+                return previous[0]
+            self._previous = None
+        raise StaleVersion(f'Version {version} is no longer loaded')
+
+    def query(self, method, args, version=None):
+        if method not in QUERY_METHODS:
+            raise ValueError(f'Unknown method {method!r}')
+        return getattr(self.store_for(version), method)(*args)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'ClinicService/1'
+
+    def _authentic(self, body):
+        """Whether the request is signed with the service token; replies 403 when not."""
+        self.nonce = self.headers.get(NONCE_HEADER) or ''
+        signature = self.headers.get(SIGNATURE_HEADER) or ''
+        try:
+            expected = _sign(self.server.token, self.nonce, self.command.encode('ascii'),
+                             self.path.encode('utf-8'), body)
+        except UnicodeError:
+            expected = None
+        if expected is not None and self.nonce and hmac.compare_digest(signature, expected):
+            return True
+        self.nonce = None
+        self._reply(403, {'error': 'Request not signed with the clinic service token'})
+        return False
+
+    def do_GET(self):
+        if not self._authentic(b''):
+            return
+        if self.path == '/status':
+            self._reply(200, self.server.service.status())
+        else:
+            self._reply(404, {'error': f'No such endpoint {self.path}'})
+
+    def do_POST(self):
+        service = self.server.service
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        except ValueError:
+            body = b''
+        if not self._authentic(body):
+            return
+        try:
+            request = json.loads(body or b'{}')
+            if self.path == '/query':
+                result = service.query(request['method'], request.get('args', []), request.get('version'))
+                self._reply(200, {'result': _plain(result)})
+            elif self.path == '/refresh':
+                service.refresh()
+                status = service.status()
+                status['diff'] = service.diff_since(request.get('version'))
+                self._reply(200, status)
+            else:
+                self._reply(404, {'error': f'No such endpoint {self.path}'})
+        except StaleVersion as e:
+            self._reply(409, {'error': str(e)})
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            self._reply(400, {'error': f'{type(e).__name__}: {e}'})
+
+    def _reply(self, code, body):
+        data = json.dumps(body, default=str).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if self.nonce:
+            self.send_header(SIGNATURE_HEADER, _sign(self.server.token, self.nonce, str(code).encode('ascii'), data))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # One line per lookup would drown out anything useful
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands each connection to a fixed pool of worker threads."""
+
+    def __init__(self, address, handler, workers=WORKERS):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='clinic-service')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+
+def make_server(service, port=DEFAULT_PORT, workers=WORKERS, token=None):
+    """An HTTP server answering for ``service``; port 0 picks a free one."""
+    server = PooledHTTPServer(('127.0.0.1', port), _Handler, workers)
+    server.service = service
+    server.token = token or create_token()
+    return server
+
+
+def serve(path, port=DEFAULT_PORT, reader=None, workers=WORKERS):
+    service = ClinicService(path, reader)
+    server = make_server(service, port, workers)
+
+    def poll():
+        while True:
+            time.sleep(POLL_INTERVAL)
+            service.refresh()
+
+    threading.Thread(target=poll, daemon=True).start()
+    print(f'Serving {len(service.store):,} clinics from {path} on 127.0.0.1:{port} to holders of {token_path()}',
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def service_address():
+    """(host, port) of the clinic service, or None when clients should not use one."""
+    value = os.environ.get('CLINIC_TOOL_SERVICE', '').strip()
+    if value.lower() in ('off', '0', 'no'):
+        return None
+    if not value:
+        return ('127.0.0.1', DEFAULT_PORT)
+    host, _, port = value.rpartition(':')
+    try:
+        return (host or '127.0.0.1', int(port))
+    except ValueError:
+        print(f'clinic_service: ignoring CLINIC_TOOL_SERVICE={value!r}, expected host:port or off', file=sys.stderr)
+        return None
+
+
+def _request(address, token, path, body=None, timeout=QUERY_TIMEOUT):
+    """The JSON reply to a signed request, after checking the reply's signature."""
+    method, data = ('GET', b'') if body is None else ('POST', json.dumps(body).encode('utf-8'))
+    nonce = secrets.token_hex(16)
+    signature = _sign(token, nonce, method.encode('ascii'), path.encode('utf-8'), data)
+    headers = {NONCE_HEADER: nonce, SIGNATURE_HEADER: signature}
+    if body is not None:
+        headers['Content-Type'] = 'application/json'
+    connection = http.client.HTTPConnection(*address, timeout=timeout)
+    try:
+        connection.request(method, path, data or None, headers)
+        response = connection.getresponse()
+        raw = response.read()
+        signature = response.getheader(SIGNATURE_HEADER) or ''
+    except (OSError, http.client.HTTPException) as e:
+        raise ServiceError(f'Clinic service unavailable: {e}') from e
+    finally:
+        connection.close()
+    if response.status == 403:
+        raise ServiceError('The clinic service does not accept this token')
+    if not hmac.compare_digest(signature, _sign(token, nonce, str(response.status).encode('ascii'), raw)):
+        raise ServiceError(f'The server at {address[0]}:{address[1]} is not the clinic service')
+    try:
+        data = json.loads(raw or b'{}')
+    except ValueError as e:
+        raise ServiceError(f'Clinic service sent a bad reply: {e}') from e
+    if response.status == 409:
+        raise StaleVersion(data.get('error'))
+    if response.status != 200:
+        raise ServiceError(data.get('error') or f'HTTP {response.status}')
+    return data
+
+
+def connect(path, timeout=CONNECT_TIMEOUT):
+    """A RemoteStore for ``path`` when a clinic service has it loaded, else None."""
+    address = service_address()
+    token = read_token()
+    if address is None or token is None:
+        return None
+    try:
+        status = _request(address, token, '/status', timeout=timeout)
+        if not _same_file(status['source'], path):
+            return None
+        return RemoteStore(address, path, status, token)
+    except (ServiceError, KeyError, TypeError, ValueError):
+        return None
+
+
+class RemoteStore:
+    """A ClinicStore held by the clinic service, behind the same query methods.
+
+    Queries never load the workbook themselves, since they run on the UI
+    thread.  Once the service stops answering they raise ServiceError, and
+    refresh() loads the workbook in process instead; the window calls it from
+    its loader thread.  When the service has dropped the version this store
+    was made for, queries move on to the service's current version, and the
+    next refresh() starts the window over on it.
+    """
+
+    def __init__(self, address, path, status, token):
+        self.address = address
+        self.path = path
+        self.token = token
+        self.lost = False  # The service stopped answering
+        self._adopted = False  # Queries moved on to a newer version than the window loaded
+        self._adopt(status)
+
+    def __len__(self):
+        return self._rows
+
+    def _adopt(self, status):
+        self.version = status['version']
+        self.source_stat = tuple(status['source_stat']) if status['source_stat'] else None
+        self._rows = status['rows']
+        self._hierarchy = None
+
+    def _post_query(self, method, args):
+        return _request(self.address, self.token, '/query',
+                        {'method': method, 'args': _plain(list(args)), 'version': self.version})['result']
+
+    def _query(self, method, *args):
+        if self.lost:
+            raise ServiceError('The clinic service stopped answering')
+        try:
+            try:
+                return self._post_query(method, args)
+            except StaleVersion:
+                # Replaced more than KEEP_PREVIOUS ago: the window has not reloaded, ask the current version.
+                self._adopt(_request(self.address, self.token, '/status'))
+                self._adopted = True
+                return self._post_query(method, args)
+        except ServiceError:
+            self.lost = True
+            raise
+
+    @staticmethod
+    def _table(result):
+        facs, names, managers = result
+        return np.asarray(facs, dtype=np.int64), np.asarray(names, dtype=object), np.asarray(managers, dtype=object)
+
+    @property
+    def hierarchy(self):
+        if self._hierarchy is None:
+            self._hierarchy = SimpleNamespace(**self._query('browse_tree'))
+        return self._hierarchy
+
+    def row(self, fac):
+        return self._query('row', fac)
+
+    def fac_at(self, position):
+        return self._query('fac_at', position)
+
+    def row_values(self, position, columns):
+        return self._query('row_values', position, list(columns))
+
+    def column_values(self, positions, columns):
+        return self._query('column_values', positions, list(columns))
+
+    def node_path(self, position):
+        return tuple(self._query('node_path', position))
+
+    def node_rows(self, level, key=None):
+        return np.asarray(self._query('node_rows', level, key), dtype=np.intp)
+
+    def clinics_at(self, positions):
+        return self._table(self._query('clinics_at', positions))
+
+    def clinic_table(self, rows):
+        return self._table(self._query('clinic_table', rows))
+
+    def area_clinics(self, area=None):
+        return self._table(self._query('area_clinics', area))
+
+    def fac_prefix(self, text, limit=50):
+        return np.asarray(self._query('fac_prefix', text, limit), dtype=np.intp)
+
+    def search(self, query, limit=50):
+        return np.asarray(self._query('search', query, limit), dtype=np.intp)
+
+    def nearest(self, zip_code, count=None, radius=None):
+        result = self._query('nearest', zip_code, count, radius)
+        return None if result is None else (np.asarray(result[0], dtype=np.intp), np.asarray(result[1]))
+
+    def people(self, query, limit=50):
+        people, names, counts = self._query('people', query, limit)
+        return np.asarray(people, dtype=np.intp), np.asarray(names, dtype=object), np.asarray(counts, dtype=np.int64)
+
+    def person_roles(self, person):
+        return [tuple(pair) for pair in self._query('person_roles', person)]
+
+    def person_clinics(self, person, roles=None):
+        rows, roles = self._query('person_clinics', person, None if roles is None else list(roles))
+        return np.asarray(rows, dtype=np.intp), roles
+
+    def refresh(self):
+        """Have the service pick up workbook changes; returns (store, StoreDiff or None).
+
+        The diff is None when the service cannot say what changed, and the
+        store is an in-process ClinicStore when the service is gone.
+        """
+        if self.lost:
+            return _load_local(self.path), None
+        try:
+            status = _request(self.address, self.token, '/refresh', {'version': self.version},
+                              timeout=REFRESH_TIMEOUT)
+        except ServiceError:
+            return _load_local(self.path), None
+        diff = status.pop('diff')
+        if status['version'] == self.version and not self._adopted:
+            return self, StoreDiff(set(), set(), set(), set(), set(), set())
+        store = RemoteStore(self.address, self.path, status, self.token)
+        if self._adopted:
+            return store, None  # Nothing knows the diff from the window's version
+        return store, StoreDiff.from_dict(diff) if diff else None
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve clinic lookups to every Clinic Info Tool on this machine')
+    parser.add_argument('--workbook', default=DEFAULT_WORKBOOK,
+                        help='Fac List workbook, or a CSV/Parquet export of it (default: $CLINIC_TOOL_WORKBOOK or the shared workbook)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--reader', help='reader engine (default: $CLINIC_TOOL_READER or auto)')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='request worker threads')
+    args = parser.parse_args()
+    serve(args.workbook, args.port, args.reader, args.workers)
@@ -0,0 +1,208 @@
+"""Shared, memory-mapped snapshots of the loaded clinic data.
+
+The first instance to load a workbook publishes the normalized table and
+its indexes to a machine-wide snapshot directory:
+
+    <root>/<source id>/<size>-<mtime_ns>-s<schema>-f<format>/
+        table.arrow             the Fac List as an uncompressed Arrow IPC file
+        <index>.<array>.npy     one file per index array
+        meta.json               the small index tables; written last
+
+Every instance, the publisher included, then maps those files read-only
+instead of keeping a private frame, so the operating system holds one copy
+of the pages however many sessions are open.
+
+The root is CLINIC_TOOL_SNAPSHOT_DIR, or ClinicInfoTool\\snapshots under
+%ProgramData% on Windows and the temp directory elsewhere; it is not per
+user, because sharing across the sessions of a terminal server is the
+point.  CLINIC_TOOL_SNAPSHOT=off turns snapshots off.  Without pyarrow the
+tool loads in process as before.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from clinic_data import INDEXES, SCHEMA_VERSION, ClinicStore, display_value
+
+SNAPSHOT_FORMAT = 2
+STALE_PUBLISH_SECONDS = 3600  # unfinished publishes older than this are left over from a crash
+
+
+def available():
+    if os.environ.get('CLINIC_TOOL_SNAPSHOT', '').lower() in ('off', '0', 'no'):
+        return False
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def snapshot_root():
+    base = os.environ.get('CLINIC_TOOL_SNAPSHOT_DIR')
+    if not base:
+        root = (os.environ.get('PROGRAMDATA') if sys.platform == 'win32' else None) or tempfile.gettempdir()
+        base = os.path.join(root, 'ClinicInfoTool', 'snapshots')
+    return base
+
+
+def _source_dir(source):
+    key = os.path.normcase(os.path.abspath(source))
+    return os.path.join(snapshot_root(), hashlib.sha1(key.encode('utf-8')).hexdigest()[:16])
+
+
+def _version_name(stat):
+    return f'{stat[0]}-{stat[1]}-s{SCHEMA_VERSION}-f{SNAPSHOT_FORMAT}'
+
+
+def _load_array(path):
+    try:
+        return np.load(path, mmap_mode='r', allow_pickle=False)
+    except ValueError:
+        return np.load(path, allow_pickle=False)  # Empty arrays cannot be mapped
+
+
+class SnapshotStore(ClinicStore):
+    """A ClinicStore over a mapped snapshot.
+
+    ``df`` is the mapped pyarrow Table rather than a DataFrame; the query
+    methods copy out only the rows and columns they return.
+    """
+
+    def __init__(self, table, indexes, source_stat, directory):
+        super().__init__(table, source_stat=source_stat, indexes=indexes)
+        self.directory = directory
+        self._columns = frozenset(table.column_names)
+
+    def __len__(self):
+        return self.df.num_rows
+
+    def has_column(self, name):
+        return name in self._columns
+
+    def _gather(self, name, positions):
+        import pyarrow as pa
+
+        if not self.has_column(name):
+            return np.full(len(positions), '', dtype=object)
+        taken = self.df.column(name).take(pa.array(np.asarray(positions, dtype=np.int64)))
+        if taken.null_count and pa.types.is_integer(taken.type):
+            return np.array(taken.to_pylist(), dtype=object)  # to_numpy would make these floats
+        # Much faster than to_pylist for text; nulls come back as None either way.
+        return taken.to_numpy(zero_copy_only=False).astype(object)
+
+    def row_values(self, position, columns):
+        present = [column for column in dict.fromkeys(columns) if self.has_column(column)]
+        row = self.df.select(present).slice(position, 1).to_pylist()[0]
+        return [display_value(row.get(column)) for column in columns]
+
+
+def _write(store, source, directory):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(store.df, preserve_index=False)
+    with pa.OSFile(os.path.join(directory, 'table.arrow'), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    meta = {
+        'source': os.path.abspath(source),
+        'source_stat': list(store.source_stat),
+        'rows': len(store),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'indexes': {},
+    }
+    for name in INDEXES:
+        arrays, index_meta = getattr(store, name).state()
+        for array_name, array in arrays.items():
+            np.save(os.path.join(directory, f'{name}.{array_name}.npy'), np.ascontiguousarray(array), allow_pickle=False)
+        meta['indexes'][name] = {'arrays': list(arrays), 'meta': index_meta}
+    with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def _open(directory):
+    import pyarrow as pa
+
+    with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    table = pa.ipc.open_file(pa.memory_map(os.path.join(directory, 'table.arrow'), 'r')).read_all()
+    indexes = []
+    for name, cls in INDEXES.items():
+        info = meta['indexes'][name]
+        arrays = {array_name: _load_array(os.path.join(directory, f'{name}.{array_name}.npy'))
+                  for array_name in info['arrays']}
+        indexes.append(cls.from_state(arrays, info['meta']))
+    return SnapshotStore(table, tuple(indexes), tuple(meta['source_stat']), directory)
+
+
+def _remove_old(parent, keep):
+    """Delete other versions; ones still mapped by a running instance fail quietly and go next time."""
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        if path == keep:
+            continue
+        if name.startswith('.publish-'):
+            try:
+                if time.time() - os.path.getmtime(path) < STALE_PUBLISH_SECONDS:
+                    continue  # Another instance is writing it now
+            except OSError:
+                continue
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def open_snapshot(source, stat):
+    """The published snapshot of ``source`` as of ``stat`` (size, mtime_ns), mapped read-only, or None."""
+    if not available():
+        return None
+    directory = os.path.join(_source_dir(source), _version_name(stat))
+    if not os.path.exists(os.path.join(directory, 'meta.json')):
+        return None
+    import pyarrow as pa
+
+    try:
+        return _open(directory)
+    except OSError:
+        return None  # Locked, interrupted or being replaced; other sessions may have it mapped, so it stays
+    except (ValueError, KeyError, TypeError, EOFError, pa.ArrowException):
+        shutil.rmtree(directory, ignore_errors=True)  # Damaged; the next load publishes it again
+        return None
+    except Exception:
+        return None
+
+
+def publish(store, source):
+    """Publish an in-process ``store`` as the snapshot of ``source`` and return it mapped.
+
+    Returns None when snapshots are off or the directory cannot be written,
+    in which case the caller keeps using ``store``.
+    """
+    if not available() or store.source_stat is None:
+        return None
+    parent = _source_dir(source)
+    final = os.path.join(parent, _version_name(store.source_stat))
+    if not os.path.exists(os.path.join(final, 'meta.json')):
+        try:
+            os.makedirs(parent, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix='.publish-', dir=parent)
+        except OSError:
+            return None
+        try:
+            _write(store, source, staging)
+            os.replace(staging, final)
+        except Exception:
+            # Unwritable, another instance published first, or pyarrow could not write the table
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.exists(os.path.join(final, 'meta.json')):
+                return None
+    _remove_old(parent, final)
+    try:
+        return _open(final)
+    except Exception:
+        return None
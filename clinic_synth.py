@@ -0,0 +1,172 @@
+"""Synthetic Fac List workbooks for benchmarks and load testing.
+
+Generates a sheet with exactly the columns the tool reads (clinic_data.COLUMNS),
+with a configurable Group -> Region -> Area fan-out and values shaped like the
+real ones: one GVP per group, RVP per region and DO per area, unique Fac#s,
+real City/State/ZIP triples, phone numbers, and people columns that sometimes
+hold several names.  The same arguments always give the same workbook.
+
+    python clinic_synth.py fac_10k.xlsx --rows 10000
+    python clinic_synth.py fac_100k.csv --rows 100000 --groups 8 --regions 10 --areas 12
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from clinic_data import CATEGORY_COLUMNS, COLUMNS, PEOPLE_COLUMNS, SHEET_NAME, ZIP_COLUMN
+
+FIRST_NAMES = (
+    'Ana', 'Ben', 'Carla', 'David', 'Elena', 'Frank', 'Grace', 'Hector', 'Irene', 'James', 'Karen', 'Luis',
+    'Maria', 'Nathan', 'Olivia', 'Paul', 'Quinn', 'Rosa', 'Samuel', 'Tanya', 'Victor', 'Wendy', 'Yusuf', 'Zoe',
+)
+LAST_NAMES = (
+    'Adams', 'Baker', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Ibrahim', 'Johnson', 'Kim',
+    'Lopez', 'Murphy', 'Nguyen', "O'Brien", 'Patel', 'Quintero', 'Rossi', 'Smith', 'Thompson', 'Ueda',
+    'Varga', 'Williams', 'Young',
+)
+PLACES = (
+    ('Boston', 'MA', '02118'), ('Waltham', 'MA', '02451'), ('Springfield', 'MA', '01103'),
+    ('Providence', 'RI', '02903'), ('Hartford', 'CT', '06103'), ('New York', 'NY', '10016'),
+    ('Buffalo', 'NY', '14203'), ('Newark', 'NJ', '07102'), ('Philadelphia', 'PA', '19104'),
+    ('Pittsburgh', 'PA', '15213'), ('Baltimore', 'MD', '21201'), ('Richmond', 'VA', '23219'),
+    ('Charlotte', 'NC', '28202'), ('Atlanta', 'GA', '30303'), ('Orlando', 'FL', '32801'),
+    ('Miami', 'FL', '33136'), ('Nashville', 'TN', '37203'), ('Cleveland', 'OH', '44106'),
+    ('Detroit', 'MI', '48201'), ('Chicago', 'IL', '60611'), ('Milwaukee', 'WI', '53202'),
+    ('Minneapolis', 'MN', '55415'), ('St. Louis', 'MO', '63110'), ('New Orleans', 'LA', '70112'),
+    ('Dallas', 'TX', '75201'), ('Houston', 'TX', '77030'), ('San Antonio', 'TX', '78229'),
+    ('Denver', 'CO', '80204'), ('Phoenix', 'AZ', '85006'), ('Las Vegas', 'NV', '89102'),
+    ('Los Angeles', 'CA', '90033'), ('San Diego', 'CA', '92103'), ('Sacramento', 'CA', '95817'),
+    ('Portland', 'OR', '97239'), ('Seattle', 'WA', '98104'),
+)
+STREETS = ('Main St', 'Oak Ave', 'Elm St', 'Washington Blvd', 'Park Rd', 'Lake Dr', 'Medical Pkwy', 'Center St')
+MODALITIES = ('In-Center HD', 'In-Center HD, PD', 'In-Center HD, HHD', 'In-Center HD, PD, HHD', 'PD, HHD')
+DIVISIONS = ('East', 'Central', 'West')
+NOTES = (
+    'Call the clinic manager first', 'Escalate to the DO after hours', 'Use the fax for referrals',
+    'Transient patients need 48 h notice', 'See the PAS supervisor for insurance questions',
+)
+PHONE_COLUMNS = tuple(column for column in COLUMNS
+                      if 'Phone' in column or 'PH' in column or 'Cell' in column or 'Direct #' in column)
+MULTI_PERSON_COLUMNS = ('Medical Director', 'Educators', 'Financial Coordinators', 'PAS PICS', 'Social Worker')
+PEOPLE_PER_CLINIC = 4  # distinct people per clinic across the staff pools, roughly
+
+
+def _people(rng, count):
+    first = rng.choice(FIRST_NAMES, count)
+    initial = rng.choice(list('ABCDEFGHJKLMNPRSTW'), count)
+    last = rng.choice(LAST_NAMES, count)
+    return np.array([f'{f} {i}. {l}' for f, i, l in zip(first, initial, last)], dtype=object)
+
+
+def _phones(rng, count):
+    area = rng.integers(201, 990, count)
+    line = rng.integers(0, 10000, count)
+    return np.array([f'({a}) 555-{n:04d}' for a, n in zip(area.tolist(), line.tolist())], dtype=object)
+
+
+def generate(rows, groups=12, regions=6, areas=8, seed=0):
+    """A raw Fac List frame of ``rows`` clinics.
+
+    ``regions`` is the number of regions per group and ``areas`` the number
+    of areas per region; clinics are spread over the areas at random.
+    """
+    rng = np.random.default_rng(seed)
+    area_count = groups * regions * areas
+    area = np.sort(rng.integers(0, area_count, rows))
+    region = area // areas
+    group = region // regions
+    data = {}
+
+    data['Fac#'] = np.sort(rng.choice(np.arange(1000, 1000 + rows * 5), rows, replace=False))
+    # With ten or more groups some names contain others ('Group 1', 'Group 10').
+    data['GRP'] = np.array([f'Group {g + 1}' for g in range(groups)], dtype=object)[group]
+    data['REG'] = np.array([f'Region {g + 1}-{r + 1}' for g in range(groups) for r in range(regions)],
+                           dtype=object)[region]
+    data['Area'] = np.array([f'Area {a + 1}' for a in range(area_count)], dtype=object)[area]
+    data['DIV'] = np.array(DIVISIONS, dtype=object)[group % len(DIVISIONS)]
+
+    # Leadership is one person per node, so node labels are stable.
+    leaders = _people(rng, groups + groups * regions + area_count)
+    data['GVP Name'] = leaders[group]
+    data['RVP'] = leaders[groups + region]
+    data['In-Center DO'] = leaders[groups + groups * regions + area]
+    data['Area Team Lead (ATL)'] = leaders[groups + groups * regions + (area + 1) % area_count]
+
+    place = rng.integers(0, len(PLACES), rows)
+    data['City'] = np.array([p[0] for p in PLACES], dtype=object)[place]
+    data['State'] = np.array([p[1] for p in PLACES], dtype=object)[place]
+    data[ZIP_COLUMN] = np.array([p[2] for p in PLACES], dtype=object)[place]
+    numbers = rng.integers(1, 9999, rows)
+    streets = rng.choice(STREETS, rows)
+    data['Address'] = np.array([f'{n} {s}' for n, s in zip(numbers.tolist(), streets)], dtype=object)
+    data['Clinic Name'] = np.array([f'{c} {s.split()[0]} Dialysis' if i % 3 else f'{c} Kidney Center {i}'
+                                    for i, (c, s) in enumerate(zip(data['City'], streets))], dtype=object)
+
+    staff = _people(rng, max(rows * PEOPLE_PER_CLINIC // 10, 50))
+    data['Clinic Manager'] = _people(rng, rows)
+    for column in PEOPLE_COLUMNS:
+        if column in data:
+            continue
+        if column in CATEGORY_COLUMNS:
+            pool = _people(rng, max(area_count // 4, 3))
+            values = pool[area % len(pool)]
+        else:
+            values = staff[rng.integers(0, len(staff), rows)]
+        if column in MULTI_PERSON_COLUMNS:
+            second = staff[rng.integers(0, len(staff), rows)]
+            several = rng.random(rows) < 0.3
+            values = np.where(several, [f'{a}; {b}' for a, b in zip(values, second)], values)
+        if column == 'Medical Director':
+            values = np.array([f'Dr. {v}'.replace('; ', '; Dr. ') for v in values], dtype=object)
+        data[column] = values
+
+    for column in PHONE_COLUMNS:
+        data.setdefault(column, _phones(rng, rows))
+    data['Modalities Offered'] = rng.choice(MODALITIES, rows).astype(object)
+    data['Isolation?'] = rng.choice(['Yes', 'No'], rows).astype(object)
+    data['Clinic Details'] = rng.choice(NOTES, rows).astype(object)
+    data['Escalation List (DO, RVP, HPSM, PAS TL, PAS Supervisor, etc)'] = np.array(
+        [f'{do}, {rvp}' for do, rvp in zip(data['In-Center DO'], data['RVP'])], dtype=object)
+    data['Revenue Center'] = np.array([str(n) for n in (data['Fac#'] * 7 % 90000 + 10000).tolist()], dtype=object)
+    data['TCU Days/Week'] = rng.choice(['3', '4', '5', '6'], rows).astype(object)
+
+    for column in COLUMNS:
+        if column in data:
+            continue
+        if column in CATEGORY_COLUMNS:
+            data[column] = np.array([f'{column} {i + 1}' for i in range(8)], dtype=object)[area % 8]
+        else:
+            # Free-text columns: mostly filled, some blank, as on the real sheet.
+            values = np.array([f'{column} {n}' for n in rng.integers(1, 500, rows).tolist()], dtype=object)
+            data[column] = np.where(rng.random(rows) < 0.1, None, values)
+
+    return pd.DataFrame({column: data[column] for column in COLUMNS})
+
+
+def write(df, path):
+    """Write ``df`` as the Fac List sheet of a workbook, or as a CSV/Parquet export, by extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        df.to_csv(path, index=False)
+    elif ext == '.parquet':
+        df.to_parquet(path, index=False)
+    elif ext in ('.xlsx', '.xlsm'):
+        df.to_excel(path, sheet_name=SHEET_NAME, index=False, engine='openpyxl')
+    else:
+        raise ValueError(f'Cannot write {ext or "files without an extension"}; use .xlsx, .xlsm, .csv or .parquet')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Write a synthetic Fac List workbook')
+    parser.add_argument('output', help='.xlsx/.xlsm workbook, or a .csv/.parquet export')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--groups', type=int, default=12)
+    parser.add_argument('--regions', type=int, default=6, help='regions per group')
+    parser.add_argument('--areas', type=int, default=8, help='areas per region')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write(generate(args.rows, args.groups, args.regions, args.areas, args.seed), args.output)
@@ -1,22 +1,837 @@
 # pyinstaller   pyinstaller --onefile --noconsole --icon=swise.ico clinic_tool2.py
 
+import functools
+import os
+import re
 import sys
-import pandas as pd
+import threading
+import time
+
+from clinic_perf import PhaseTimer, latency, latency_log_path
+
+# Created before the Qt imports so they are timed too.  pandas and the data
+# layer are only imported once the splash is on screen.
+startup = PhaseTimer.from_environment()
+
 from PyQt5 import QtCore
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPlainTextEdit, QTabWidget,
-    QVBoxLayout, QListWidget, QLabel, QStackedWidget, QSizePolicy, QTextEdit, QSplashScreen, QPushButton
+    QVBoxLayout, QListView, QLabel, QStackedWidget, QSizePolicy, QTextEdit, QSplashScreen, QPushButton,
+    QListWidget, QListWidgetItem, QTableView, QDialog, QDialogButtonBox, QFileDialog, QMenu, QProgressBar, QComboBox,
+    QCheckBox, QFrame, QShortcut
 )
-from PyQt5.QtCore import Qt, QRect
-from PyQt5.QtGui import QIcon, QPixmap
+from PyQt5.QtCore import Qt, QFileSystemWatcher, QObject, QRect, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QFontDatabase, QIcon, QKeySequence, QPixmap
+
+from clinic_models import ChangeTableModel, ClinicListModel, DatasetTableModel, NodeListModel, KEY_ROLE
+from clinic_replica import Replica, ReplicaError, asset, share_path
+from clinic_replica import enabled as replicas_enabled
+
+startup.mark('import Qt')
+
+
+def service_slot(slot):
+    """Wrap a slot that queries the store.
+
+    A clinic service that stopped answering makes the query raise
+    ServiceError; the window reports it and loads the workbook itself, instead
+    of the exception escaping the slot, which aborts PyQt.
+    """
+    @functools.wraps(slot)
+    def wrapper(self, *args):
+        try:
+            return slot(self, *args)
+        except Exception as e:
+            from clinic_service import ServiceError
+
+            if not isinstance(e, ServiceError):
+                raise
+            self.window().service_lost(e)
+    return wrapper
+
+
+class DataLoader(QThread):
+    """Reads and parses the workbook off the UI thread.
+
+    A running clinic service is used instead of loading the workbook in this
+    process.  Otherwise the data is read from ``replica``, the local copy of
+    the workbook, which is only pulled from the share here when there is no
+    copy yet; ``path`` is then the file the store was read from.  When
+    ``previous`` holds the currently loaded store, the new load is diffed
+    against it and the diff is emitted with the store.  The store is then
+    recorded in the change history and ``recorded`` emitted.
+    """
+    progress = pyqtSignal(str, object, object)  # stage, done, total
+    loaded = pyqtSignal(object, object)  # store, StoreDiff or None
+    failed = pyqtSignal(str)
+    recorded = pyqtSignal(object, str)  # store, '' or why the change history missed it
+
+    def __init__(self, excel_file, replica=None, parent=None):
+        super().__init__(parent)
+        self.excel_file = excel_file
+        self.replica = replica
+        self.previous = None
+        self.path = None  # File the last store was read from; None when it came from the service
+
+    def _local_path(self):
+        if self.replica is None:
+            return self.excel_file
+        if not self.replica.available():
+            self.replica.sync(lambda done, total: self.progress.emit('read', done, total))
+        return self.replica.path
+
+    @latency.timed('load')
+    def _load(self):
+        from clinic_data import load_clinic_store
+
+        self.path = self._local_path()
+        store = load_clinic_store(self.path, progress=self.progress.emit, origin=self.excel_file)
+        store.geo_index  # Built here rather than by the first nearest-clinic query
+        return store
+
+    def run(self):
+        from clinic_data import ClinicStore, diff_stores
+        from clinic_service import connect
+
+        try:
+            if self.previous is None:
+                store, diff = connect(self.excel_file), None
+                if store is not None:
+                    self.path = None
+                    self.progress.emit('service', len(store), len(store))
+                else:
+                    store = self._load()
+            elif isinstance(self.previous, ClinicStore):
+                store = self._load()
+                diff = diff_stores(self.previous, store)
+            else:
+                store, diff = self.previous.refresh()
+        except Exception as e:
+            self.failed.emit(f'{type(e).__name__}: {e}')
+            return
+        self.loaded.emit(store, diff)
+        try:
+            from clinic_history import record
+
+            record(store, self.excel_file)  # After the window has the data; a store from the service has no table here
+        except Exception as e:
+            # The load itself succeeded; only the change history misses this version.
+            self.recorded.emit(store, f'{type(e).__name__}: {e}')
+            return
+        self.recorded.emit(store, '')
+
+
+class SourceWatcher(QObject):
+    """Emits ``changed`` once the source file has been modified and has settled.
+
+    QFileSystemWatcher does not see every change on an SMB share, so the file
+    is also polled.  The poll's stat runs on a background thread so a slow
+    or unreachable share never blocks the UI.
+    """
+    changed = pyqtSignal()
+    _polled = pyqtSignal(object)
+
+    POLL_INTERVAL_MS = 30000
+    SETTLE_MS = 2000  # Saves arrive as several events; wait for the last one
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.stat = None
+        self._polling = False
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(self.POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self._poll)
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(self.SETTLE_MS)
+        self._settle_timer.timeout.connect(self.changed)
+        self._polled.connect(self._on_polled)
+
+    def start(self, path, stat):
+        """Watch ``path`` for changes relative to ``stat``, the (size, mtime_ns) just loaded."""
+        if path != self.path:
+            if self.path in self._watcher.files():
+                self._watcher.removePath(self.path)
+            self.path = path
+        self.stat = stat
+        if self.path not in self._watcher.files():
+            self._watcher.addPath(self.path)
+        self._poll_timer.start()
+
+    def retry(self):
+        self._settle_timer.start()
+
+    def _on_file_changed(self, path):
+        # Saving usually replaces the file, which drops it from the watcher.
+        if path not in self._watcher.files() and os.path.exists(path):
+            self._watcher.addPath(path)
+        self._settle_timer.start()
+
+    def _poll(self):
+        if self._polling:
+            return
+        self._polling = True
+        threading.Thread(target=self._stat_in_background, daemon=True).start()
+
+    def _stat_in_background(self):
+        from clinic_data import source_stat
+
+        try:
+            stat = source_stat(self.path)
+        except OSError:
+            stat = None
+        self._polled.emit(stat)
+
+    def _on_polled(self, stat):
+        self._polling = False
+        if stat is not None and stat != self.stat:
+            self._settle_timer.start()
+
+
+class ReplicaSyncer(QObject):
+    """Pulls newer copies of the workbook from the share into its replica in the background.
+
+    ``updated`` is emitted when the local copy has been replaced, and
+    ``checked`` after every attempt, whether or not the share answered.
+    """
+    updated = pyqtSignal()
+    checked = pyqtSignal()
+
+    SYNC_INTERVAL_MS = 30000
+
+    def __init__(self, replica, parent=None):
+        super().__init__(parent)
+        self.replica = replica
+        self._syncing = False
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.SYNC_INTERVAL_MS)
+        self._timer.timeout.connect(self.sync)
+        self.checked.connect(self._on_checked)
+
+    def start(self):
+        if not self._timer.isActive():
+            self._timer.start()
+            self.sync()
+
+    def sync(self):
+        if self._syncing:
+            return
+        self._syncing = True
+        threading.Thread(target=self._sync_in_background, daemon=True).start()
+
+    def _sync_in_background(self):
+        try:
+            if self.replica.sync():
+                self.updated.emit()
+        except ReplicaError:
+            pass  # Keep working from the copy; describe() reports the share as unreachable
+        self.checked.emit()
+
+    def _on_checked(self):
+        self._syncing = False
+
+
+class QueryScheduler(QObject):
+    """Debounces as-you-type queries.
+
+    Every keystroke restarts both timers, so a query still waiting when the
+    next keystroke arrives is dropped rather than run.  ``ready`` fires once
+    typing pauses, which runs one lookup no matter how fast the keys came,
+    and ``settled`` fires for the query left in the box once typing stops.
+    """
+    ready = pyqtSignal(str)
+    settled = pyqtSignal(str)
+
+    READY_MS = 120
+    SETTLE_MS = 600
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.query = ''
+        self._ready_timer = QTimer(self)
+        self._ready_timer.setSingleShot(True)
+        self._ready_timer.setInterval(self.READY_MS)
+        self._ready_timer.timeout.connect(lambda: self.ready.emit(self.query))
+        self._settle_timer = QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(self.SETTLE_MS)
+        self._settle_timer.timeout.connect(lambda: self.settled.emit(self.query))
+
+    def schedule(self, query):
+        self.query = query
+        self._ready_timer.start()
+        self._settle_timer.start()
+
+    def cancel(self):
+        self._ready_timer.stop()
+        self._settle_timer.stop()
+
+
+class ExportWorker(QThread):
+    """Writes an export off the UI thread, a chunk of rows at a time, until done or cancelled."""
+    progress = pyqtSignal(int, int)  # rows written, total
+    done = pyqtSignal(str, int)  # path, rows written
+    failed = pyqtSignal(str)
+
+    def __init__(self, store, rows, columns, path, parent=None):
+        super().__init__(parent)
+        self.store = store  # Kept across a reload, so the export is of one consistent version
+        self.rows = rows
+        self.columns = columns
+        self.path = path
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        from clinic_export import ExportCancelled, export_rows
+
+        try:
+            count = export_rows(self.store, self.rows, self.columns, self.path,
+                                lambda stage, done, total: self.progress.emit(done, total), self._cancel.is_set)
+        except ExportCancelled:
+            self.failed.emit('Export cancelled')
+            return
+        except Exception as e:
+            self.failed.emit(f'Could not export to {self.path}: {type(e).__name__}: {e}')
+            return
+        self.done.emit(self.path, count)
+
+
+class ColumnPicker(QDialog):
+    """Asks which Fac List columns to export, with the last choice preselected."""
+
+    def __init__(self, columns, selected, title, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel('Columns to export:'))
+        self.column_list = QListWidget()
+        for column in columns:
+            item = QListWidgetItem(column.strip())
+            item.setData(Qt.UserRole, column)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if column in selected else Qt.Unchecked)
+            self.column_list.addItem(item)
+        layout.addWidget(self.column_list)
+        toggles = QHBoxLayout()
+        for text, state in (('All', Qt.Checked), ('None', Qt.Unchecked)):
+            button = QPushButton(text)
+            button.clicked.connect(lambda checked, state=state: self._check_all(state))
+            toggles.addWidget(button)
+        toggles.addStretch()
+        layout.addLayout(toggles)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.resize(360, 480)
+
+    def _check_all(self, state):
+        for i in range(self.column_list.count()):
+            self.column_list.item(i).setCheckState(state)
+
+    def columns(self):
+        items = (self.column_list.item(i) for i in range(self.column_list.count()))
+        return [item.data(Qt.UserRole) for item in items if item.checkState() == Qt.Checked]
+
+
+def _format_progress(stage, done, total):
+    if stage == 'read':
+        return f'Reading workbook... {done / 1048576:.1f} of {total / 1048576:.1f} MB'
+    if stage == 'parse':
+        return f'Parsed {done:,} rows' if done else 'Parsing Fac List...'
+    if stage == 'cache':
+        return f'Loaded {done:,} rows from local cache'
+    if stage == 'index':
+        return f'Building indexes... {done} of {total}'
+    if stage == 'snapshot':
+        return f'Mapped {done:,} clinics from the shared snapshot'
+    if stage == 'service':
+        return f'Using {done:,} clinics from the clinic service'
+    return stage
+
+
+class ReferencePane(QWidget):
+    """The other reference sheets and workbooks beside the Fac List.
+
+    Nothing is read until the tab is first shown.  Then the catalog is
+    listed in the background, and each dataset is loaded in the registry's
+    process pool the first time it is picked.
+    """
+    _cataloged = pyqtSignal(object)
+    _loaded = pyqtSignal(str, object, str)  # key, Dataset or None, error
+
+    FILTER_LIMIT = 500
+
+    def __init__(self, workbook, parent=None):
+        super().__init__(parent)
+        self.workbook = workbook
+        self.registry = None
+        self.dataset = None
+        self.current_key = None
+        self._listing = False
+
+        layout = QHBoxLayout(self)
+        self.dataset_list = QListWidget()
+        self.dataset_list.setMaximumWidth(260)
+        self.dataset_list.currentItemChanged.connect(self.on_dataset_selected)
+        layout.addWidget(self.dataset_list)
+
+        table_layout = QVBoxLayout()
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText('Filter rows by Fac# or any text')
+        table_layout.addWidget(self.filter_input)
+        self.table_model = DatasetTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        table_layout.addWidget(self.table)
+        self.status_label = QLabel()
+        table_layout.addWidget(self.status_label)
+        layout.addLayout(table_layout, 1)
+
+        self.scheduler = QueryScheduler(self)
+        self.scheduler.ready.connect(self.apply_filter)
+        self.filter_input.textEdited.connect(self.scheduler.schedule)
+        self._cataloged.connect(self._on_cataloged)
+        self._loaded.connect(self._on_loaded)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.registry is None and not self._listing:
+            self._listing = True
+            self.status_label.setText('Listing reference sheets...')
+            threading.Thread(target=self._catalog_in_background, daemon=True).start()
+
+    def _catalog_in_background(self):
+        from clinic_datasets import DatasetRegistry
+
+        registry = DatasetRegistry(self.workbook)
+        registry.catalog()
+        self._cataloged.emit(registry)
+
+    def _on_cataloged(self, registry):
+        self.registry = registry
+        for info in registry.catalog():
+            item = QListWidgetItem(info.title)
+            item.setData(Qt.UserRole, info.key)
+            self.dataset_list.addItem(item)
+        count = self.dataset_list.count()
+        self.status_label.setText(f'{count} reference sheets' if count else 'No other sheets found beside the workbook')
+
+    def on_dataset_selected(self, item, previous=None):
+        if item is None:
+            return
+        key = item.data(Qt.UserRole)
+        self.current_key = key
+        self.dataset = None
+        self.table_model.clear()
+        self.status_label.setText(f'Loading {item.text()}...')
+        self.registry.request(key).add_done_callback(lambda future: self._emit_loaded(key, future))
+
+    def _emit_loaded(self, key, future):
+        # Runs on the pool's thread, or here when the load had already finished.
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self._loaded.emit(key, None, f'{type(error).__name__}: {error}')
+        else:
+            self._loaded.emit(key, future.result(), '')
+
+    def _on_loaded(self, key, dataset, error):
+        if key != self.current_key:
+            return  # Another sheet was picked meanwhile; this one stays loaded in the registry
+        if dataset is None:
+            self.status_label.setText(f'Could not load {key}: {error}')
+            return
+        self.dataset = dataset
+        self.apply_filter(self.filter_input.text())
+
+    @latency.timed('reference.apply_filter')
+    def apply_filter(self, query):
+        if self.dataset is None:
+            return
+        rows = self.dataset.filter(query, self.FILTER_LIMIT if query.strip() else None)
+        self.table_model.set_rows(self.dataset, rows)
+        self.status_label.setText(f'{len(rows):,} of {len(self.dataset):,} rows')
+
+    def shutdown(self):
+        if self.registry is not None:
+            self.registry.close()
+
+
+class PeoplePane(QWidget):
+    """Everyone named in the staff and leadership columns, and the clinics they are named in.
+
+    Typing finds people by name, tolerating partial names and typos.
+    Picking a person lists their roles, each with its clinic count, and
+    their clinics; unchecking roles narrows the clinics.  Clicking a clinic
+    emits ``clinic_opened`` with its Fac#.
+    """
+    clinic_opened = pyqtSignal(int)
+
+    FIND_LIMIT = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = None
+        self.person = None  # Person id in the current store's people index
+
+        layout = QHBoxLayout(self)
+        people_layout = QVBoxLayout()
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText('Find a person by name')
+        people_layout.addWidget(self.filter_input)
+        self.people_list = QListWidget()
+        self.people_list.currentItemChanged.connect(self.on_person_selected)
+        people_layout.addWidget(self.people_list)
+        layout.addLayout(people_layout)
+
+        clinics_layout = QVBoxLayout()
+        clinics_layout.addWidget(QLabel('Roles'))
+        self.role_list = QListWidget()
+        self.role_list.setMaximumHeight(160)
+        self.role_list.itemChanged.connect(lambda item: self.update_clinics())
+        clinics_layout.addWidget(self.role_list)
+        clinics_layout.addWidget(QLabel('Clinics'))
+        self.clinic_model = ClinicListModel(self)
+        self.clinics_list = QListView()
+        self.clinics_list.setUniformItemSizes(True)
+        self.clinics_list.setModel(self.clinic_model)
+        self.clinics_list.clicked.connect(lambda index: self.clinic_opened.emit(index.data(KEY_ROLE)))
+        clinics_layout.addWidget(self.clinics_list)
+        self.status_label = QLabel('Type a name to find a person')
+        clinics_layout.addWidget(self.status_label)
+        layout.addLayout(clinics_layout, 1)
+
+        self.scheduler = QueryScheduler(self)
+        self.scheduler.ready.connect(self.apply_filter)
+        self.filter_input.textEdited.connect(self.scheduler.schedule)
+
+    def set_store(self, store):
+        """Show ``store``'s people; after a reload, the person shown is picked again by name."""
+        current = self.people_list.currentItem()
+        name = current.data(Qt.UserRole + 1) if current is not None else None
+        self.store = store
+        self.apply_filter(self.filter_input.text(), name)
+
+    @latency.timed('people.apply_filter')
+    @service_slot
+    def apply_filter(self, query, select=None):
+        if self.store is None:
+            return
+        people, names, counts = self.store.people(query, self.FIND_LIMIT)
+        self.people_list.blockSignals(True)
+        self.people_list.clear()
+        for person, name, count in zip(people.tolist(), names, counts.tolist()):
+            item = QListWidgetItem(f'{name} ({count} clinic{"s" if count != 1 else ""})')
+            item.setData(Qt.UserRole, person)
+            item.setData(Qt.UserRole + 1, name)
+            self.people_list.addItem(item)
+            if name == select:
+                self.people_list.setCurrentItem(item)
+        self.people_list.blockSignals(False)
+        self.on_person_selected(self.people_list.currentItem())
+        if not query.strip():
+            self.status_label.setText('Type a name to find a person')
+        elif self.person is None:
+            self.status_label.setText(f'{len(people)} people match "{query}"' if len(people) != 1
+                                      else f'1 person matches "{query}"')
+
+    @latency.timed('people.on_person_selected')
+    @service_slot
+    def on_person_selected(self, item, previous=None):
+        self.person = None if item is None else item.data(Qt.UserRole)
+        self.role_list.blockSignals(True)
+        self.role_list.clear()
+        if self.person is not None:
+            for role, count in self.store.person_roles(self.person):
+                role_item = QListWidgetItem(f'{role} ({count})')
+                role_item.setData(Qt.UserRole, role)
+                role_item.setFlags(role_item.flags() | Qt.ItemIsUserCheckable)
+                role_item.setCheckState(Qt.Checked)
+                self.role_list.addItem(role_item)
+        self.role_list.blockSignals(False)
+        self.update_clinics()
+
+    @latency.timed('people.update_clinics')
+    @service_slot
+    def update_clinics(self):
+        if self.person is None:
+            self.clinic_model.clear()
+            return
+        items = [self.role_list.item(i) for i in range(self.role_list.count())]
+        roles = [item.data(Qt.UserRole) for item in items if item.checkState() == Qt.Checked]
+        # Every role checked needs no filter, which keeps the common lookup to one slice.
+        rows, notes = self.store.person_clinics(self.person, None if len(roles) == len(items) else roles)
+        self.clinic_model.set_clinics(*self.store.clinics_at(rows), notes=notes)
+        name = self.people_list.currentItem().data(Qt.UserRole + 1)
+        self.status_label.setText(f'{name}: {len(rows)} clinic{"s" if len(rows) != 1 else ""}')
+
+
+class ChangesPane(QWidget):
+    """What changed in the Fac List between two recorded versions.
+
+    It opens on the changes since this user's last session (see
+    clinic_history), worked out in the background the first time the tab
+    is shown once the loader has recorded the version.  Any two recorded
+    versions can then be picked.
+    Clicking an entry emits ``clinic_opened`` with its Fac#.
+    """
+    clinic_opened = pyqtSignal(int)
+    _computed = pyqtSignal(object, int, int, object, str)  # versions, from, to, Changes or None, message
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.store = None
+        self.seen = None  # Version this user had seen before this session, as (size, mtime_ns)
+        self.versions = []
+        self.changes = None
+        self._stale = False
+        self._recorded = False  # The loader has tried to record the store's version
+        self._computing = False
+
+        layout = QVBoxLayout(self)
+        choice_layout = QHBoxLayout()
+        choice_layout.addWidget(QLabel('From'))
+        self.from_choice = QComboBox()
+        choice_layout.addWidget(self.from_choice)
+        choice_layout.addWidget(QLabel('to'))
+        self.to_choice = QComboBox()
+        choice_layout.addWidget(self.to_choice)
+        self.key_only = QCheckBox('Only people, phones, names and addresses')
+        self.key_only.setChecked(True)
+        self.key_only.toggled.connect(self.show_changes)
+        choice_layout.addWidget(self.key_only)
+        choice_layout.addStretch(1)
+        layout.addLayout(choice_layout)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        self.change_model = ChangeTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.change_model)
+        self.table.clicked.connect(lambda index: self.clinic_opened.emit(index.data(KEY_ROLE)))
+        layout.addWidget(self.table)
+
+        for combo in (self.from_choice, self.to_choice):
+            combo.activated.connect(lambda _: self.compare(self.from_choice.currentIndex(), self.to_choice.currentIndex()))
+        self._computed.connect(self._on_computed)
+
+    def set_store(self, store):
+        from clinic_history import last_seen, mark_seen
+
+        if self.store is None and store.source_stat is not None:
+            self.seen = last_seen(self.source)
+            mark_seen(self.source, store.source_stat)
+        self.store = store
+        self._stale = True
+        self._recorded = False
+
+    def history_recorded(self, store):
+        """The loader has recorded ``store``'s version, or failed to; the changes can be worked out now."""
+        if store is not self.store:
+            return
+        self._recorded = True
+        if self.isVisible():
+            self.compare()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._stale:
+            self.compare()
+
+    def compare(self, start=None, end=None):
+        """Compare two versions by their numbers in the version lists; by default, since the last session."""
+        if self.store is None or self._computing:
+            return
+        if not self._recorded:
+            self.summary_label.setText('Recording this version...')
+            return
+        self._stale = False
+        self._computing = True
+        self.summary_label.setText('Comparing versions...')
+        threading.Thread(target=self._compare_in_background, args=(self.store, start, end), daemon=True).start()
+
+    @latency.timed('changes.compare')
+    def _compare_in_background(self, store, start, end):
+        import clinic_history
+
+        try:
+            if start is None:
+                versions, start, end, changes = clinic_history.changes_since_seen(
+                    self.source, store.source_stat, self.seen)
+            else:
+                versions = clinic_history.versions(self.source)
+                changes = clinic_history.diff_versions(versions[start], versions[end]) if 0 <= start else None
+            if changes is None:
+                self._computed.emit(versions, start, end, None, 'The change history starts with this version')
+                return
+        except Exception as e:
+            self._computed.emit([], -1, -1, None, f'Could not compare versions: {type(e).__name__}: {e}')
+            return
+        self._computed.emit(versions, start, end, changes, '')
+
+    def _on_computed(self, versions, start, end, changes, message):
+        from clinic_history import version_label
+
+        self._computing = False
+        if self._stale and self.isVisible():
+            self.compare()  # Reloaded while comparing
+            return
+        self.versions = versions
+        labels = [version_label(version) for version in versions]
+        for combo, index in ((self.from_choice, start), (self.to_choice, end)):
+            combo.clear()
+            combo.addItems(labels)
+            combo.setCurrentIndex(index)
+        self.changes = changes
+        if changes is None:
+            self.change_model.clear()
+            self.summary_label.setText(message)
+            return
+        self.show_changes()
+
+    def show_changes(self):
+        from clinic_history import KEY_FIELDS
+
+        if self.changes is None:
+            return
+        changes = self.changes.only(KEY_FIELDS) if self.key_only.isChecked() else self.changes
+        self.change_model.set_changes(changes)
+        self.table.resizeColumnsToContents()
+        since = ' (since your last session)' if self.versions[self.from_choice.currentIndex()].stat == self.seen else ''
+        self.summary_label.setText(f'{self.from_choice.currentText()} to {self.to_choice.currentText()}{since}: {changes}')
+
+
+class LatencyOverlay(QFrame):
+    """Call counts and latencies of the handlers and data operations, floating over the window.
+
+    Toggled with Ctrl+Shift+L; showing it turns recording on if --latency or
+    CLINIC_TOOL_LATENCY did not.  Export appends the histograms to the
+    latency log, which clinic_perf.py combines across users.  Below them are
+    the browse cache's hit and miss counts.
+    """
+
+    REFRESH_MS = 1000
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setObjectName('latencyOverlay')
+        self.setStyleSheet('#latencyOverlay { background-color: rgba(0, 0, 0, 200); border-radius: 5px; }'
+                           '#latencyOverlay QLabel { color: white; }')
+        layout = QVBoxLayout(self)
+        self.report_label = QLabel()
+        self.report_label.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.report_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.report_label)
+        self.cache_label = QLabel()
+        layout.addWidget(self.cache_label)
+        self.message_label = QLabel()
+        layout.addWidget(self.message_label)
+        buttons = QHBoxLayout()
+        for text, slot in (('Export', self.export), ('Reset', self.reset), ('Close', self.toggle)):
+            button = QPushButton(text)
+            button.clicked.connect(lambda checked, slot=slot: slot())
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        if self.isVisible():
+            self.timer.stop()
+            self.hide()
+            return
+        latency.enabled = True
+        self.message_label.setText(f'Ctrl+Shift+L hides this; Export appends to {latency_log_path()}')
+        self.refresh()
+        self.show()
+        self.raise_()
+        self.timer.start()
+
+    def refresh(self):
+        operations = latency.operations()
+        self.report_label.setText(latency.report(operations) if operations else 'Nothing recorded yet')
+        cache = self.parent().browse_cache
+        self.cache_label.setText(cache.describe() if cache is not None else 'Browse cache: no data loaded yet')
+        self.adjustSize()
+        self.move(max(self.parent().width() - self.width() - 10, 0), 10)  # Top right, also after a resize
+
+    def reset(self):
+        latency.reset()
+        self.refresh()
+
+    def export(self):
+        try:
+            path = latency.write_log()
+        except OSError as e:
+            self.message_label.setText(f'Could not write the latency log: {e}')
+        else:
+            self.message_label.setText(f'Appended to {path}')
+
 
 class ClinicInfoTool(QWidget):
+    status_changed = pyqtSignal(str)
+    data_ready = pyqtSignal()
+    load_failed = pyqtSignal(str)
+
+    # (label, count, radius in miles) for the nearest-clinic search
+    NEAR_CHOICES = (
+        ('Nearest 10', 10, None), ('Nearest 25', 25, None),
+        ('Within 10 mi', None, 10), ('Within 25 mi', None, 25), ('Within 50 mi', None, 50), ('Within 100 mi', None, 100),
+    )
+
     def __init__(self, excel_file, parent=None):
         super().__init__()
-        self.df = pd.read_excel(excel_file, sheet_name='Fac List', engine='openpyxl')
+        self.excel_file = excel_file
+        self.store = None  # A ClinicStore, or a RemoteStore when the clinic service is running
+        self.hierarchy = None
+        self.shown = {}  # pane -> parent key it was filled for (None = all)
+        self.current_fac = None  # Fac# shown in the detail pane
+        self.renderer = None  # Built with the first load, once the data layer is imported
+        self.browse_cache = None  # Likewise; the clinics listed per area and data version
+        self.exporter = None  # The ExportWorker while an export is being written
+        self.export_columns = None  # Columns picked for the last export
+        self.export_dir = os.path.expanduser('~')
         self.init_ui()
         self.resize(800, 600)
         self.setWindowTitle('Clinic Info Tool')
+        self.set_data_enabled(False)
+
+        # Work from a local copy of the workbook, refreshed from the share in the background
+        self.replica = Replica(excel_file) if replicas_enabled() else None
+        self.loader = DataLoader(excel_file, self.replica, self)
+        self.loader.progress.connect(self.on_load_progress)
+        self.loader.loaded.connect(self.on_data_loaded)
+        self.loader.failed.connect(self.on_load_failed)
+        self.loader.recorded.connect(self.on_version_recorded)
+        # Started from the event loop so callers can connect to status_changed first.
+        QTimer.singleShot(0, self.loader.start)
+
+        # Live results while typing; details only once the query settles
+        self.scheduler = QueryScheduler(self)
+        self.scheduler.ready.connect(self.on_query_ready)
+        self.scheduler.settled.connect(self.on_query_settled)
+        self.clinic_number_input.textEdited.connect(self.scheduler.schedule)
+
+        # Pick up edits to the shared workbook without a restart
+        self.watcher = SourceWatcher(excel_file, self)
+        self.watcher.changed.connect(self.reload_data)
+        if self.replica is not None:
+            self.syncer = ReplicaSyncer(self.replica, self)
+            self.syncer.updated.connect(self.watcher.retry)
+            self.syncer.checked.connect(self.update_data_age)
+            self.age_timer = QTimer(self)
+            self.age_timer.setInterval(60000)
+            self.age_timer.timeout.connect(self.update_data_age)
 
     def run(self):
         splash = self.show_splash()  # Show the splash screen
@@ -44,23 +859,42 @@ class ClinicInfoTool(QWidget):
         input_buttons_layout = QHBoxLayout()
 
         self.clinic_number_input = QLineEdit()
-        self.clinic_number_input.setPlaceholderText('Type Clinic # and press Enter')
+        self.clinic_number_input.setPlaceholderText('Type a Clinic #, or a name, city or person')
         self.clinic_number_input.returnPressed.connect(self.get_clinic_info)
         input_buttons_layout.addWidget(self.clinic_number_input)
 
         # Add the search button
-        search_button = QPushButton('Search')
-        search_button.clicked.connect(self.get_clinic_info)
-        input_buttons_layout.addWidget(search_button)
+        self.search_button = QPushButton('Search')
+        self.search_button.clicked.connect(lambda: self.get_clinic_info())  # Slots wrapped in *args get every signal argument
+        input_buttons_layout.addWidget(self.search_button)
 
         # Add the reset button
-        reset_button = QPushButton('Reset')
-        reset_button.clicked.connect(self.reset_to_defaults)
-        input_buttons_layout.addWidget(reset_button)
+        self.reset_button = QPushButton('Reset')
+        self.reset_button.clicked.connect(self.reset_to_defaults)
+        input_buttons_layout.addWidget(self.reset_button)
+
+        # Export what the clinics pane lists; the browse panes have it on their context menus
+        self.export_button = QPushButton('Export')
+        self.export_button.clicked.connect(lambda: self.export_listed())
+        input_buttons_layout.addWidget(self.export_button)
 
         # Add the QHBoxLayout to the search_layout
         search_layout.addLayout(input_buttons_layout)
 
+        # Nearest clinics to a patient's ZIP, listed in the clinics pane
+        near_layout = QHBoxLayout()
+        self.zip_input = QLineEdit()
+        self.zip_input.setPlaceholderText('Clinics near ZIP')
+        self.zip_input.returnPressed.connect(self.show_nearby)
+        near_layout.addWidget(self.zip_input)
+        self.near_choice = QComboBox()
+        self.near_choice.addItems([label for label, _, _ in self.NEAR_CHOICES])
+        near_layout.addWidget(self.near_choice)
+        self.near_button = QPushButton('Find nearby')
+        self.near_button.clicked.connect(lambda: self.show_nearby())
+        near_layout.addWidget(self.near_button)
+        search_layout.addLayout(near_layout)
+
         self.result_text_edit = QTextEdit()
         self.result_text_edit.setReadOnly(True)
         search_layout.addWidget(self.result_text_edit)
@@ -70,20 +904,28 @@ class ClinicInfoTool(QWidget):
         # Browse layout
         browse_layout = QVBoxLayout()
 
-        self.groups_list = QListWidget()
-        self.regions_list = QListWidget()
-        self.areas_list = QListWidget()
-        self.clinics_list = QListWidget()
-        self.clinics_list.setSortingEnabled(True)
+        # Model/view lists: rows are rendered on demand from the precomputed indexes
+        self.group_model = NodeListModel("All Groups", self)
+        self.region_model = NodeListModel("All Regions", self)
+        self.area_model = NodeListModel("All Areas", self)
+        self.clinic_model = ClinicListModel(self)
+
+        self.groups_list = self._list_view(self.group_model)
+        self.regions_list = self._list_view(self.region_model)
+        self.areas_list = self._list_view(self.area_model)
+        self.clinics_list = self._list_view(self.clinic_model)
         self.clinics_list.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)  # Set the size policy
         self.clinics_list.setMinimumHeight(200)
 
-        self.groups_list.itemClicked.connect(self.on_group_clicked)
-        self.regions_list.itemClicked.connect(self.on_region_clicked)
-        self.areas_list.itemClicked.connect(self.on_area_clicked)
-        self.clinics_list.itemClicked.connect(self.on_clinic_clicked)  # Add this line
-
-        self.update_groups()
+        self.groups_list.clicked.connect(self.on_group_clicked)
+        self.regions_list.clicked.connect(self.on_region_clicked)
+        self.areas_list.clicked.connect(self.on_area_clicked)
+        self.clinics_list.clicked.connect(self.on_clinic_clicked)  # Add this line
+        for view, level in ((self.groups_list, 'group'), (self.regions_list, 'region'),
+                            (self.areas_list, 'area'), (self.clinics_list, None)):
+            view.setContextMenuPolicy(Qt.CustomContextMenu)
+            view.customContextMenuRequested.connect(
+                lambda pos, view=view, level=level: self.show_export_menu(view, level, pos))
 
         browse_layout.addWidget(QLabel('Groups'))
         browse_layout.addWidget(self.groups_list)
@@ -96,258 +938,552 @@ class ClinicInfoTool(QWidget):
 
         combined_layout.addLayout(browse_layout)
 
-        main_layout.addLayout(combined_layout)
+        clinics_tab = QWidget()
+        clinics_tab.setLayout(combined_layout)
+        self.tabs = QTabWidget()
+        self.tabs.addTab(clinics_tab, 'Clinics')
+        self.clinics_tab = clinics_tab
+        self.people = PeoplePane()
+        self.people.clinic_opened.connect(self.open_clinic)
+        self.tabs.addTab(self.people, 'People')
+        self.changes = ChangesPane(self.excel_file)
+        self.changes.clinic_opened.connect(self.open_clinic)
+        self.tabs.addTab(self.changes, 'Recent changes')
+        self.reference = ReferencePane(self.excel_file)
+        self.tabs.addTab(self.reference, 'Reference sheets')
+        main_layout.addWidget(self.tabs)
+
+        status_layout = QHBoxLayout()
+        self.status_label = QLabel('Loading clinic data...')
+        status_layout.addWidget(self.status_label, 1)
+        self.export_bar = QProgressBar()
+        self.export_bar.setMaximumWidth(200)
+        self.cancel_export_button = QPushButton('Cancel export')
+        for widget in (self.export_bar, self.cancel_export_button):
+            widget.hide()
+            status_layout.addWidget(widget)
+        self.age_label = QLabel()
+        status_layout.addWidget(self.age_label)
+        main_layout.addLayout(status_layout)
         self.setLayout(main_layout)
 
+        # Handler latencies, for finding what makes the window feel slow
+        self.latency_overlay = LatencyOverlay(self)
+        QShortcut(QKeySequence('Ctrl+Shift+L'), self, self.latency_overlay.toggle)
+
+    def closeEvent(self, event):
+        self.reference.shutdown()
+        if self.exporter is not None:
+            self.exporter.cancel()
+            self.exporter.wait()  # Lets it remove its partial file
+        if latency.enabled and latency.operations():
+            try:
+                latency.write_log()
+            except OSError:
+                pass
+        super().closeEvent(event)
+
+    def _list_view(self, model):
+        view = QListView()
+        view.setUniformItemSizes(True)  # Lets the view skip measuring every row
+        view.setModel(model)
+        return view
+
+    def set_data_enabled(self, enabled):
+        for widget in (self.clinic_number_input, self.search_button, self.reset_button, self.export_button,
+                       self.zip_input, self.near_choice, self.near_button,
+                       self.groups_list, self.regions_list, self.areas_list, self.clinics_list, self.people,
+                       self.changes):
+            widget.setEnabled(enabled)
+
+    def on_load_progress(self, stage, done, total):
+        if stage == 'index' and done == 0 and self.store is None:
+            startup.mark('read workbook')
+        message = _format_progress(stage, done, total)
+        self.status_label.setText(message)
+        self.status_changed.emit(message)
+
+    @latency.timed()
+    @service_slot
+    def on_data_loaded(self, store, diff):
+        path = self.loader.path
+        self.watcher.start(path or self.excel_file, store.source_stat)
+        if self.replica is not None and path == self.replica.path:
+            self.syncer.start()
+            self.age_timer.start()
+        self.update_data_age()
+        if self.store is not None:
+            self.apply_reload(store, diff)
+            return
+        from clinic_browse import BrowseCache
+        from clinic_render import DetailRenderer
+
+        startup.mark('build indexes')
+        hierarchy = store.hierarchy  # A round trip with the clinic service, so before anything is set
+        self.store = store
+        self.hierarchy = hierarchy
+        self.renderer = DetailRenderer()
+        self.browse_cache = BrowseCache()
+        self.update_groups()
+        self.people.set_store(store)
+        self.changes.set_store(store)
+        startup.mark('update groups')
+        self.set_data_enabled(True)
+        self.status_label.setText(f'{len(self.store):,} clinics loaded')
+        self.clinic_number_input.setFocus()
+        self.data_ready.emit()
+
+    def on_version_recorded(self, store, error):
+        self.changes.history_recorded(store)
+        if error:
+            message = f'Could not record this version in the change history: {error}'
+            self.status_label.setText(message)
+            self.status_changed.emit(message)
+
+    def update_data_age(self):
+        local = self.replica is not None and self.loader.path == self.replica.path
+        self.age_label.setText(self.replica.describe() if local else '')
+
+    def on_load_failed(self, error):
+        if self.store is not None:
+            # A failed reload keeps the data already on screen.
+            self.status_label.setText(f'Could not reload clinic data: {error}')
+            return
+        message = f'Could not load clinic data: {error}'
+        self.status_label.setText(message)
+        self.result_text_edit.setPlainText(message)
+        self.load_failed.emit(message)
+
+    def service_lost(self, error):
+        """The clinic service stopped answering: load the workbook in process, off the UI thread."""
+        self.status_label.setText(f'{error}; loading the workbook here...')
+        if self.loader.isRunning():
+            return
+        self.loader.previous = self.store  # Its refresh() loads in process; None connects or loads afresh
+        self.loader.start()
+
+    def reload_data(self):
+        if self.store is None or self.loader.isRunning():
+            self.watcher.retry()  # Still loading; check again shortly
+            return
+        self.status_label.setText('Workbook changed, reloading...')
+        self.loader.previous = self.store
+        self.loader.start()
+
+    @latency.timed()
+    def apply_reload(self, store, diff):
+        """Swap in a reloaded store, touching only the panes whose contents changed.
+
+        The selection in each pane and the clinic in the detail pane are kept.
+        """
+        self.loader.previous = None
+        stamp = time.strftime('%H:%M')
+        # The panes hold keys and Fac#s rather than row positions, so the new
+        # store can always be swapped in.
+        self.store = store
+        self.hierarchy = store.hierarchy
+        self.renderer.pages.clear()  # Pages and lists of the old version can never be hit again
+        self.browse_cache.clear()
+        self.people.set_store(store)  # Person ids are per version
+        self.changes.set_store(store)
+        if diff is None:
+            # No diff (the clinic service went away mid-reload): start over.
+            self.reset_to_defaults()
+            self.status_label.setText(f'Workbook reloaded at {stamp}')
+            return
+        if diff.empty:
+            self.status_label.setText(f'Workbook re-read at {stamp}; no clinic changes')
+            return
+
+        self._patch_nodes(self.groups_list, self.group_model, self.hierarchy.groups, self.hierarchy.group_labels)
+        if 'regions' in self.shown:
+            self._patch_nodes(self.regions_list, self.region_model,
+                              self._region_keys(self.shown['regions']), self.hierarchy.region_labels)
+        if 'areas' in self.shown:
+            self._patch_nodes(self.areas_list, self.area_model,
+                              self._area_keys(self.shown['areas']), self.hierarchy.area_labels)
+        if 'search' in self.shown:
+            current = self.clinics_list.currentIndex()
+            selected = current.data(KEY_ROLE) if current.isValid() else None
+            self.clinic_model.set_clinics(*self.store.clinics_at(self._query_rows(self.shown['search'])))
+            if selected is not None:
+                self._select(self.clinics_list, self.clinic_model.row_of(selected))
+        elif 'nearby' in self.shown:
+            current = self.clinics_list.currentIndex()
+            selected = current.data(KEY_ROLE) if current.isValid() else None
+            self.show_nearby(*self.shown['nearby'])
+            if selected is not None:
+                self._select(self.clinics_list, self.clinic_model.row_of(selected))
+        elif 'clinics' in self.shown:
+            area_key = self.shown['clinics']
+            if area_key is None or area_key in diff.areas:
+                current = self.clinics_list.currentIndex()
+                selected = current.data(KEY_ROLE) if current.isValid() else None
+                self.update_clinics(area_key)
+                if selected is not None:
+                    self._select(self.clinics_list, self.clinic_model.row_of(selected))
+
+        if self.current_fac is not None and diff.touches(self.current_fac):
+            position = self.store.row(self.current_fac)
+            if position is None:
+                self.result_text_edit.setPlainText(f'Clinic {self.current_fac} is no longer in the workbook.')
+                self.current_fac = None
+            else:
+                self.result_text_edit.setHtml(self.renderer.render(self.store, position))
+        self.status_label.setText(f'Workbook updated at {stamp}: {diff}')
+
+    def _patch_nodes(self, view, model, keys, labels):
+        if model.keys == keys and all(model.labels.get(key) == labels[key] for key in keys):
+            return  # Unchanged by the reload
+        current = view.currentIndex()
+        selected = current.isValid(), current.data(KEY_ROLE)
+        model.set_nodes(keys, labels)
+        if selected[0]:
+            self._select(view, model.row_of(selected[1]))
+
+    def _select(self, view, row):
+        if row is not None:
+            index = view.model().index(row)
+            view.setCurrentIndex(index)
+            view.scrollTo(index)
+
     def reset_to_defaults(self):
+        self.scheduler.cancel()
         self.clinic_number_input.clear()
+        self.zip_input.clear()
         self.result_text_edit.clear()
-        self.groups_list.clear()
-        self.regions_list.clear()
-        self.areas_list.clear()
-        self.clinics_list.clear()
+        self.current_fac = None
+        self.group_model.clear()
+        self.clear_panes('regions', 'areas', 'clinics')
         self.update_groups()
 
-    def _handle_nan(self, value):
-        if pd.isna(value):
-            return ""
-        return value
-
+    @latency.timed()
+    @service_slot
     def get_clinic_info(self):
         clinic_number = self.clinic_number_input.text()
+        self.scheduler.cancel()  # Enter settles the query now
 
-        if clinic_number == '':
+        if clinic_number.strip() == '':
             return  # Exit the method if the input is empty
 
-        clinic_data = self.df.loc[self.df['Fac#'] == int(clinic_number)]
-
-        if not clinic_data.empty:
-            clinic_info = f"""
-            <table>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Clinic Name:</b></td><td>{self._handle_nan(clinic_data['Clinic Name'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Street:</b></td><td>{self._handle_nan(clinic_data['Address'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>City, State, Zip:</b></td><td>{self._handle_nan(clinic_data['City'].values[0])}, {self._handle_nan(clinic_data['State'].values[0])} {self._handle_nan(clinic_data['Zip '].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Phone:</b></td><td>{self._handle_nan(clinic_data['Clinic PH / FX'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Clinic Manager:</b></td><td>{self._handle_nan(clinic_data['Clinic Manager'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Area:</b></td><td>{self._handle_nan(clinic_data['Area'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Area Manager:</b></td><td>{self._handle_nan(clinic_data['Area Team Lead (ATL)'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>DO:</b></td><td>{self._handle_nan(clinic_data['In-Center DO'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Region:</b></td><td>{self._handle_nan(clinic_data['REG'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>RVP:</b></td><td>{self._handle_nan(clinic_data['RVP'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Group:</b></td><td>{self._handle_nan(clinic_data['GRP'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Division:</b></td><td>{self._handle_nan(clinic_data['DIV'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>GVPO:</b></td><td>{self._handle_nan(clinic_data['GVP Name'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"></td><td></td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Additional Info:</b></td><td></td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>PAS Office Location:</b></td><td>{self._handle_nan(clinic_data['PAS Office Location'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>GVP/GM Assistant / Phone:</b></td><td>{self._handle_nan(clinic_data['GVP/GM Assistant / Phone'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>RVP Admin Assist / Phone:</b></td><td>{self._handle_nan(clinic_data['RVP Admin Assist / Phone'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Modalities Offered:</b></td><td>{self._handle_nan(clinic_data['Modalities Offered'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Clinic Details:</b></td><td>{self._handle_nan(clinic_data['Clinic Details'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Clip / Ph / Fx:</b></td><td>{self._handle_nan(clinic_data['Clip / Ph / Fx'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>PAS Supervisor:</b></td><td>{self._handle_nan(clinic_data['PAS Supervisor'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>PAS Supervisor Direct #:</b></td><td>{self._handle_nan(clinic_data['PAS Supervisor Direct #'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>PAS Team Lead:</b></td><td>{self._handle_nan(clinic_data['PAS Team Lead'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>PAS PICS:</b></td><td>{self._handle_nan(clinic_data['PAS PICS'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Medical Director:</b></td><td>{self._handle_nan(clinic_data['Medical Director'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Isolation?:</b></td><td>{self._handle_nan(clinic_data['Isolation?'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Escalation List (DO, RVP, HPSM, PAS TL, PAS Supervisor, etc):</b></td><td>{self._handle_nan(clinic_data['Escalation List (DO, RVP, HPSM, PAS TL, PAS Supervisor, etc)'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Clinical Quality Manager:</b></td><td>{self._handle_nan(clinic_data['Clinical Quality Manager'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Educators:</b></td><td>{self._handle_nan(clinic_data['Educators'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Revenue Center:</b></td><td>{self._handle_nan(clinic_data['Revenue Center'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>FC Supervisor:</b></td><td>{self._handle_nan(clinic_data['FC Supervisor'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Financial Coordinators:</b></td><td>{self._handle_nan(clinic_data['Financial Coordinators'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>VP of Marketing Development:</b></td><td>{self._handle_nan(clinic_data['VP of Marketing Development'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Dir of Marketing Development:</b></td><td>{self._handle_nan(clinic_data['Dir of Marketing Development'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Dir of HPS:</b></td><td>{self._handle_nan(clinic_data['Dir of HPS'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Dir. of Commercial Integrations:</b></td><td>{self._handle_nan(clinic_data['Dir. of Commercial Integrations'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>HPSM:</b></td><td>{self._handle_nan(clinic_data['HPSM'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>TOPS Coordinator:</b></td><td>{self._handle_nan(clinic_data['TOPS Coordinator'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Social Worker:</b></td><td>{self._handle_nan(clinic_data['Social Worker'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>In-Center DO Phone:</b></td><td>{self._handle_nan(clinic_data['In-Center DO Phone'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Home Therapy DO:</b></td><td>{self._handle_nan(clinic_data['Home Therapy DO'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Home Therapy DO Phone:</b></td><td>{self._handle_nan(clinic_data['Home Therapy DO Phone'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>GM Name:</b></td><td>{self._handle_nan(clinic_data['GM Name'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>GM Cell:</b></td><td>{self._handle_nan(clinic_data['GM Cell'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Commercial Extras:</b></td><td>{self._handle_nan(clinic_data['Commercial Extras'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>CIT Phone:</b></td><td>{self._handle_nan(clinic_data['CIT Phone'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>HPSM Phone:</b></td><td>{self._handle_nan(clinic_data['HPSM Phone'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>RFA Extras:</b></td><td>{self._handle_nan(clinic_data['RFA Extras'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>CVO Email for Blast:</b></td><td>{self._handle_nan(clinic_data['CVO Email for Blast'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>HT Group:</b></td><td>{self._handle_nan(clinic_data['HT Group'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Schedule Letter Extras:</b></td><td>{self._handle_nan(clinic_data['Schedule Letter Extras'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Sr. Manager SW Svcs:</b></td><td>{self._handle_nan(clinic_data['Sr. Manager SW Svcs'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>New Perm/NonFKC EIFs:</b></td><td>{self._handle_nan(clinic_data['New Perm/NonFKC EIFs'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Traveler EIFs:</b></td><td>{self._handle_nan(clinic_data['Traveler EIFs'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>CVO Group:</b></td><td>{self._handle_nan(clinic_data['CVO Group'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>OnBase Queue:</b></td><td>{self._handle_nan(clinic_data['OnBase Queue'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>TCU:</b></td><td>{self._handle_nan(clinic_data['TCU'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Transport Program:</b></td><td>{self._handle_nan(clinic_data['Transport Program'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>BC Case Manager:</b></td><td>{self._handle_nan(clinic_data['BC Case Manager'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>TCU Days/Week:</b></td><td>{self._handle_nan(clinic_data['TCU Days/Week'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>KCA:</b></td><td>{self._handle_nan(clinic_data['KCA'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Dietitian:</b></td><td>{self._handle_nan(clinic_data['Dietitian'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Sr. Manager Clinical Quality:</b></td><td>{self._handle_nan(clinic_data['Sr. Manager Clinical Quality'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Sr. Manager Nutrition Svcs:</b></td><td>{self._handle_nan(clinic_data['Sr. Manager Nutrition Svcs'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Manager Nutrition Svcs:</b></td><td>{self._handle_nan(clinic_data['Manager Nutrition Svcs'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Manager SW Svcs:</b></td><td>{self._handle_nan(clinic_data['Manager SW Svcs'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Sr. Manager Clinical Education:</b></td><td>{self._handle_nan(clinic_data['Sr. Manager Clinical Education'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Clinical Educator:</b></td><td>{self._handle_nan(clinic_data['Clinical Educator'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Clinic County:</b></td><td>{self._handle_nan(clinic_data['Clinic County'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>eCC Instance:</b></td><td>{self._handle_nan(clinic_data['eCC Instance'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>CVO Special Note:</b></td><td>{self._handle_nan(clinic_data['CVO Special Note'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>PAS Manager:</b></td><td>{self._handle_nan(clinic_data['PAS Manager'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>FAS Leadership:</b></td><td>{self._handle_nan(clinic_data['FAS Leadership'].values[0])}</td></tr>
-                <tr><td style="text-align: right; padding-right: 10px;"><b>Senior HPSM:</b></td><td>{self._handle_nan(clinic_data['Senior HPSM'].values[0])}</td></tr>
-            </table>
-
-            """
-            self.result_text_edit.setHtml(clinic_info)
-
-            # Find and select the corresponding Group, Region, and Area
-            group_name = clinic_data['GRP'].values[0].lower().strip()
-            for i in range(self.groups_list.count()):
-                item_text = self.groups_list.item(i).text().lower()
-                if group_name in item_text:
-                    self.groups_list.setCurrentRow(i)
-                    self.on_group_clicked(self.groups_list.item(i))
-                    break
-
-            region_name = clinic_data['REG'].values[0].lower().strip()
-            for i in range(self.regions_list.count()):
-                item_text = self.regions_list.item(i).text().lower()
-                if region_name in item_text:
-                    self.regions_list.setCurrentRow(i)
-                    self.on_region_clicked(self.regions_list.item(i))
-                    break
-
-            area_name = clinic_data['Area'].values[0].lower().strip()
-            for i in range(self.areas_list.count()):
-                item_text = self.areas_list.item(i).text().lower()
-                if area_name in item_text:
-                    self.areas_list.setCurrentRow(i)
-                    self.on_area_clicked(self.areas_list.item(i))
-                    break
+        position = self.store.row(clinic_number)
 
+        if position is not None:
+            self.show_clinic(position)
         else:
-            self.result_text_edit.setPlainText('Clinic not found.')
+            # Not a Fac#: search names, addresses, cities, ZIPs and staff instead
+            self.show_search_results(clinic_number)
+
+    def _query_rows(self, query):
+        """Fac# prefix matches for digits, full-text matches for anything else."""
+        if query.strip().isdigit():
+            return self.store.fac_prefix(query)
+        return self.store.search(query)
+
+    @latency.timed()
+    @service_slot
+    def on_query_ready(self, query):
+        if self.store is None:
+            return
+        if query.strip() == '':
+            if 'search' in self.shown:
+                self.clear_panes('clinics')
+                self.status_label.clear()
+            return
+        self.show_search_results(query, open_single=False)
 
+    @latency.timed()
+    @service_slot
+    def on_query_settled(self, query):
+        if self.store is None:
+            return
+        position = self.store.row(query)
+        if position is not None and self.store.fac_at(position) != self.current_fac:
+            self.show_clinic(position)
+
+    @latency.timed()
+    def show_search_results(self, query, open_single=True):
+        rows = self._query_rows(query)
+        if not len(rows):
+            if open_single:
+                self.result_text_edit.setPlainText('Clinic not found.')
+            self.status_label.setText(f'No clinics match "{query}"')
+            return
+        current = self.clinics_list.currentIndex()
+        selected = current.data(KEY_ROLE) if current.isValid() else None
+        self.clear_panes('clinics')
+        self.clinic_model.set_clinics(*self.store.clinics_at(rows))
+        self.shown['search'] = query
+        if selected is not None:
+            self._select(self.clinics_list, self.clinic_model.row_of(selected))
+        self.status_label.setText(f'{len(rows)} clinics match "{query}"' if len(rows) > 1 else f'1 clinic matches "{query}"')
+        if open_single and len(rows) == 1:
+            self.show_clinic(rows[0])
+
+    @latency.timed()
+    def show_clinic(self, position):
+        self.result_text_edit.setHtml(self.renderer.render(self.store, position))
+        self.current_fac = self.store.fac_at(position)
+
+        results = next((pane for pane in ('search', 'nearby') if pane in self.shown), None)
+        if results is not None and self.clinic_model.row_of(self.current_fac) is None:
+            self.shown.pop(results)  # A clinic outside the results: back to browsing
+            results = None
+        if results is None:  # Keep search and nearby results in the clinics pane
+            self.sync_browse(*self.store.node_path(position))
+
+    @latency.timed()
+    @service_slot
+    def open_clinic(self, fac):
+        """Show a clinic picked outside the Clinics tab, e.g. from the People tab."""
+        position = self.store.row(fac)
+        if position is not None:
+            self.tabs.setCurrentWidget(self.clinics_tab)
+            self.show_clinic(position)
+
+    def sync_browse(self, group_key, region_key, area_key):
+        """Select the shown clinic's group, region and area in the browse panes.
+
+        Keys come straight from the hierarchy index, so selection is exact.  A
+        pane is refilled only if it is not already listing the right parent's
+        children, and the views' signals are blocked so no click handler runs.
+        """
+        views = (self.groups_list, self.regions_list, self.areas_list, self.clinics_list)
+        for view in views:
+            view.blockSignals(True)
+        try:
+            if self.group_model.keys is None:
+                self.update_groups()
+            self._select(self.groups_list, self.group_model.row_of(group_key) if group_key else None)
+            if not group_key:
+                return
+            if self.shown.get('regions', '') != group_key:
+                self.clear_panes('areas', 'clinics')
+                self.update_regions(group_key)
+            self._select(self.regions_list, self.region_model.row_of(region_key) if region_key else None)
+            if not region_key:
+                return
+            if self.shown.get('areas', '') != region_key:
+                self.clear_panes('clinics')
+                self.update_areas(region_key)
+            self._select(self.areas_list, self.area_model.row_of(area_key) if area_key else None)
+            if not area_key:
+                return
+            if self.shown.get('clinics', '') != area_key:
+                self.update_clinics(area_key)
+            self._select(self.clinics_list, self.clinic_model.row_of(self.current_fac))
+        finally:
+            for view in views:
+                view.blockSignals(False)
+
+    def clear_panes(self, *panes):
+        models = {'regions': self.region_model, 'areas': self.area_model, 'clinics': self.clinic_model}
+        for pane in panes:
+            models[pane].clear()
+            self.shown.pop(pane, None)
+            if pane == 'clinics':
+                self.shown.pop('search', None)
+                self.shown.pop('nearby', None)
+
+    def _region_keys(self, group_key):
+        if group_key is None:
+            return self.hierarchy.regions
+        return self.hierarchy.regions_by_group.get(group_key, [])
+
+    def _area_keys(self, region_key):
+        if region_key is None:
+            return self.hierarchy.areas
+        return self.hierarchy.areas_by_region.get(region_key, [])
+
+    @latency.timed()
     def update_groups(self):
-        self.groups_list.clear()
-        group_names = self.df['GRP'].str.lower().str.strip().unique()
-        group_names = [g for g in group_names if g and isinstance(g, str)]  # Filter out empty strings and non-string values
-        group_names.sort()
-        self.groups_list.addItem("All Groups")
-        for group_name in group_names:
-            gvp_name = self._handle_nan(self.df[self.df['GRP'].str.lower().str.strip() == group_name]['GVP Name'].values[0])
-            display_text = f"{group_name.title()} (GVP: {gvp_name})"
-            self.groups_list.addItem(display_text)
-
-
-    def update_regions(self):
-        self.regions_list.clear()
-        region_names = self.df['REG'].apply(lambda x: str(x).lower().strip() if isinstance(x, str) else '')
-        region_names = region_names[region_names != ''].unique()
-        region_names.sort()
-        self.regions_list.addItem("All Regions")
-        for region_name in region_names:
-            rvp = self._handle_nan(self.df[self.df['REG'].str.lower().str.strip() == region_name]['RVP'].iloc[0])
-            display_text = f"{region_name.title()} (RVP: {rvp})"
-            self.regions_list.addItem(display_text)
-
-    def update_areas(self):
-        self.areas_list.clear()
-        area_names = self.df['Area'].str.lower().str.strip().unique()
-        area_names = [a for a in area_names if a]  # Filter out empty strings
-        area_names.sort()
-        self.areas_list.addItem("All Areas")
-        for area_name in area_names:
-            do = self._handle_nan(self.df[self.df['Area'].str.lower().str.strip() == area_name]['In-Center DO'].iloc[0])
-            display_text = f"{area_name.title()} (DO: {do})"
-            self.areas_list.addItem(display_text)
-
-
-    def on_group_clicked(self, item):
-        group_name = item.text().lower().split(' (gvp:', 1)[0]
-        self.regions_list.clear()
-        self.areas_list.clear()
-        self.clinics_list.clear()
-        if group_name.lower() == "all groups":
-            self.update_regions()
-            self.update_areas()
-            self.update_clinics()
-        else:
-            regions = (
-                self.df[self.df['GRP'].str.lower().str.strip() == group_name]
-            )
-            region_names = regions['REG'].str.lower().str.strip().unique()
-            region_names = [r for r in region_names if r]  # Filter out empty strings
-            region_names.sort()
-            self.regions_list.addItem("All Regions")
-            for region_name in region_names:
-                rvp = regions[regions['REG'].str.lower().str.strip() == region_name]['RVP'].iloc[0]
-                display_text = f"{region_name.title()} (RVP: {rvp})"
-                self.regions_list.addItem(display_text)
-
-    def on_region_clicked(self, item):
-        region_name = item.text().lower().split(' (rvp:', 1)[0]  # Remove the RVP part from the text
-        self.areas_list.clear()
-        self.clinics_list.clear()
-        if region_name.lower() == "all regions":
+        self.group_model.set_nodes(self.hierarchy.groups, self.hierarchy.group_labels)
+
+    @latency.timed()
+    def update_regions(self, group_key=None):
+        """Show one group's regions, or every region when ``group_key`` is None."""
+        self.region_model.set_nodes(self._region_keys(group_key), self.hierarchy.region_labels)
+        self.shown['regions'] = group_key
+
+    @latency.timed()
+    def update_areas(self, region_key=None):
+        """Show one region's areas, or every area when ``region_key`` is None."""
+        self.area_model.set_nodes(self._area_keys(region_key), self.hierarchy.area_labels)
+        self.shown['areas'] = region_key
+
+    @latency.timed()
+    @service_slot
+    def on_group_clicked(self, index):
+        group_key = index.data(KEY_ROLE)
+        self.clear_panes('regions', 'areas', 'clinics')
+        self.update_regions(group_key)
+        if group_key is None:  # All Groups
             self.update_areas()
-        else:
-            areas = (
-                self.df[self.df['REG'].str.lower().str.strip() == region_name]
-            )
-            area_names = areas['Area'].str.lower().str.strip().unique()
-            area_names = [a for a in area_names if a]  # Filter out empty strings
-            area_names.sort()
-            self.areas_list.addItem("All Areas")
-            for area_name in area_names:
-                do = areas[areas['Area'].str.lower().str.strip() == area_name]['In-Center DO'].iloc[0]
-                do = self._handle_nan(do)
-                display_text = f"{area_name.title()} (DO: {do})"
-                self.areas_list.addItem(display_text)
-
-    def on_area_clicked(self, item):
-        area_name = item.text().split(' (do:', 1)[0]  # Remove the DO part from the text
-        self.update_clinics(area_name)
-
-    def on_clinic_clicked(self, item):
-        clinic_number = item.text().split(' -', 1)[0]  # Extract the clinic number from the text
-        self.clinic_number_input.setText(clinic_number)  # Set the clinic number in the input field
+            self.update_clinics(None)
+
+    @latency.timed()
+    @service_slot
+    def on_region_clicked(self, index):
+        self.clear_panes('areas', 'clinics')
+        self.update_areas(index.data(KEY_ROLE))
+
+    @latency.timed()
+    @service_slot
+    def on_area_clicked(self, index):
+        self.update_clinics(index.data(KEY_ROLE))
+
+    @latency.timed()
+    @service_slot
+    def on_clinic_clicked(self, index):
+        clinic_number = index.data(KEY_ROLE)  # The clinic number behind the row
+        self.clinic_number_input.setText(str(clinic_number))  # Set the clinic number in the input field
         self.get_clinic_info()  # Call the method to display the clinic details
 
-    def update_clinics(self, area_name: str):
-        self.clinics_list.clear()
-        area_name = area_name.lower().split(' (do:', 1)[0]
-        if area_name == "all areas":
-            clinics = self.df['Fac#'].unique()
+    @latency.timed()
+    def update_clinics(self, area_key=None):
+        """Show the clinics for one area key, or every area when ``area_key`` is None."""
+        clinics = self.browse_cache.get((self.store.version, area_key),
+                                        lambda: self.store.area_clinics(area_key))
+        self.clinic_model.set_clinics(*clinics)
+        self.shown['clinics'] = area_key
+
+    @latency.timed()
+    @service_slot
+    def show_nearby(self, zip_code=None, choice=None):
+        """List the clinics nearest a ZIP, with their distances, in the clinics pane."""
+        if self.store is None:
+            return
+        zip_code = (zip_code or self.zip_input.text()).strip()
+        choice = self.near_choice.currentIndex() if choice is None else choice
+        if not zip_code:
+            return
+        _, count, radius = self.NEAR_CHOICES[choice]
+        found = self.store.nearest(zip_code, count, radius)
+        if found is None:
+            from clinic_geo import load_centroids
+
+            if load_centroids() is None:
+                self.status_label.setText('No ZIP centroid table; build it with: python clinic_geo.py --download')
+            else:
+                self.status_label.setText(f'ZIP {zip_code} is not in the ZIP table')
+            return
+        rows, miles = found
+        self.clear_panes('clinics')
+        self.clinic_model.set_clinics(*self.store.clinics_at(rows), notes=[f'{mile:.1f} mi' for mile in miles])
+        self.shown['nearby'] = (zip_code, choice)
+        if count is not None:
+            self.status_label.setText(f'The {len(rows)} clinics nearest ZIP {zip_code}')
+        else:
+            self.status_label.setText(f'{len(rows):,} clinics within {radius} mi of ZIP {zip_code}')
+
+    def _listed_rows(self):
+        """(row positions, name) of the clinics the clinics pane lists; (None, None) when it is empty."""
+        if 'search' in self.shown:
+            return self._query_rows(self.shown['search']), self.shown['search']
+        if 'nearby' in self.shown:
+            zip_code, choice = self.shown['nearby']
+            _, count, radius = self.NEAR_CHOICES[choice]
+            found = self.store.nearest(zip_code, count, radius)
+            return (None, None) if found is None else (found[0], f'Near {zip_code}')
+        if 'clinics' in self.shown:
+            area_key = self.shown['clinics']
+            return self.store.node_rows('area', area_key), area_key.title() if area_key else 'All'
+        return None, None
+
+    @service_slot
+    def show_export_menu(self, view, level, pos):
+        """Context menu of a browse pane: export the clicked node's clinics, or the listed ones."""
+        if self.store is None:
+            return
+        if level is None:
+            rows, name = self._listed_rows()
+            if rows is None:
+                return
         else:
-            clinics = self.df[self.df['Area'].str.lower().str.strip() == area_name]['Fac#'].unique()
+            index = view.indexAt(pos)
+            if not index.isValid():
+                return
+            key = index.data(KEY_ROLE)
+            rows, name = self.store.node_rows(level, key), key.title() if key else 'All'
+        menu = QMenu(self)
+        action = menu.addAction(f'Export {len(rows):,} clinics...')
+        action.setEnabled(len(rows) > 0 and self.exporter is None)
+        if menu.exec_(view.viewport().mapToGlobal(pos)) is action:
+            self.export_clinics(rows, name)
 
-        clinics = list(map(str, clinics))  # Convert all elements to strings
-        clinics = [c for c in clinics if c]  # Filter out empty strings
-        clinics.sort()
+    @service_slot
+    def export_listed(self):
+        rows, name = self._listed_rows()
+        if rows is None or not len(rows):
+            self.status_label.setText('Pick an area or search for clinics to export')
+            return
+        self.export_clinics(rows, name)
 
-        for clinic in clinics:
-            if clinic.isdigit():  # Ignore non-numeric clinic numbers
-                clinic_data = self.df[self.df['Fac#'] == int(clinic)].iloc[0]
-                clinic_name = clinic_data['Clinic Name']
-                cm = self._handle_nan(clinic_data['Clinic Manager'])
-                display_text = f"{clinic} - {clinic_name} (CM: {cm})"
-                self.clinics_list.addItem(display_text)
+    def export_clinics(self, rows, name):
+        """Ask for the columns and file, then write the export in the background."""
+        from clinic_data import COLUMNS
+        from clinic_export import DEFAULT_COLUMNS
+
+        if self.exporter is not None:
+            return
+        picker = ColumnPicker(COLUMNS, self.export_columns or DEFAULT_COLUMNS, f'Export {len(rows):,} clinics', self)
+        if not picker.exec_() or not picker.columns():
+            return
+        self.export_columns = picker.columns()
+        suggested = os.path.join(self.export_dir, re.sub(r'[\\/:*?"<>|]+', ' ', f'{name} clinics').strip() + '.xlsx')
+        path, chosen = QFileDialog.getSaveFileName(self, 'Export clinics', suggested,
+                                                   'Excel workbook (*.xlsx);;CSV file (*.csv)')
+        if not path:
+            return
+        if os.path.splitext(path)[1].lower() not in ('.xlsx', '.csv'):
+            path += '.csv' if 'csv' in chosen else '.xlsx'
+        self.export_dir = os.path.dirname(path)
+
+        self.exporter = ExportWorker(self.store, rows, self.export_columns, path, self)
+        self.exporter.progress.connect(self.on_export_progress)
+        self.exporter.done.connect(self.on_export_done)
+        self.exporter.failed.connect(self.on_export_failed)
+        self.cancel_export_button.clicked.connect(self.exporter.cancel)
+        self.export_bar.setRange(0, max(len(rows), 1))
+        self.export_bar.setValue(0)
+        self.export_bar.show()
+        self.cancel_export_button.show()
+        self.status_label.setText(f'Exporting {len(rows):,} clinics to {os.path.basename(path)}...')
+        self.exporter.start()
+
+    def on_export_progress(self, done, total):
+        self.export_bar.setValue(done)
+
+    def _end_export(self, message):
+        self.cancel_export_button.clicked.disconnect(self.exporter.cancel)
+        self.exporter.wait()
+        self.exporter.deleteLater()
+        self.exporter = None
+        self.export_bar.hide()
+        self.cancel_export_button.hide()
+        self.status_label.setText(message)
+
+    def on_export_done(self, path, count):
+        self._end_export(f'Exported {count:,} clinics to {path}')
+
+    def on_export_failed(self, message):
+        self._end_export(message)
 
 
 if __name__ == '__main__':
+    import multiprocessing
+
+    multiprocessing.freeze_support()  # Reference sheets load in spawned processes, also from the frozen .exe
     app = QApplication(sys.argv)
+    startup.mark('QApplication')
 
     # Create and show the splash screen
     splash = QSplashScreen()
     splash.setWindowFlags(Qt.WindowStaysOnTopHint)
 
-    splash_image = QPixmap("\\\\corpfs01\\fmcna-shared\\OPEX\\chrome\\data\\SWICO.png")  # Replace with the path to your image
+    splash_image = QPixmap(asset(share_path('SWICO.png')))  # The local copy when there is one
     splash = QSplashScreen(splash_image)
+    startup.mark('splash image')
     label = QLabel("Loading, please wait...", splash)
     label.setStyleSheet("""
         color: white;
@@ -369,14 +1505,43 @@ if __name__ == '__main__':
 
     splash.show()
     app.processEvents()
+    startup.mark('first paint')
+
+    def show_splash_message(message):
+        label.setText(message)
+        label.adjustSize()
+        label.move((image_width - label.width()) // 2, (image_height - label.height()) // 2)
+
+    # pandas and the rest of the data layer, now that the splash is showing
+    from clinic_data import DEFAULT_WORKBOOK
 
-    excel_file = r'\\corpfs01\fmcna-shared\OPEX\chrome\data\FMC Clinic Info Tool2-SW.xlsm'
-    app.setWindowIcon(QIcon('\\corpfs01\fmcna-shared\OPEX\chrome\data\swise.ico'))  # Set the application icon
+    startup.mark('import data layer')
+    excel_file = DEFAULT_WORKBOOK
+    app.setWindowIcon(QIcon(asset(share_path('swise.ico'))))  # Set the application icon
 
+    # The window comes up straight away; the workbook loads in the background
+    # while the splash reports progress, and closes once it is ready or has failed.
     clinic_info_tool = ClinicInfoTool(excel_file)
     clinic_info_tool.app = app
+    clinic_info_tool.status_changed.connect(show_splash_message)
+
+    def finish_startup(failed=False):
+        splash.finish(clinic_info_tool)
+        if not startup.enabled:
+            return
+        try:
+            startup.write_log()
+        except OSError:
+            pass
+        print(startup.report(), file=sys.stderr)
+        # With a budget this is a check run: exit 3 when startup failed or was too slow.
+        if startup.budget is not None:
+            QTimer.singleShot(0, lambda: app.exit(3 if failed or startup.over_budget else 0))
+
+    clinic_info_tool.data_ready.connect(finish_startup)
+    clinic_info_tool.load_failed.connect(lambda message: finish_startup(failed=True))
     clinic_info_tool.show()  # Show the main application window
-    splash.finish(clinic_info_tool)  # Hide the splash screen
     clinic_info_tool.setWindowIcon(QIcon('swise.ico'))  # Set the window icon
+    startup.mark('main window')
 
     sys.exit(app.exec_())
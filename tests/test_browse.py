@@ -0,0 +1,79 @@
+import sys
+
+import numpy as np
+import pytest
+
+import clinic_browse
+from clinic_browse import BrowseCache, ceiling_bytes, size_of
+
+
+def _block(kilobytes):
+    return np.zeros(kilobytes * 128, dtype=np.int64)  # 1024 bytes per kilobyte
+
+
+def test_eviction_by_bytes():
+    cache = BrowseCache(ceiling=3 * 1024)
+    for key in 'abc':
+        cache.get(key, lambda: _block(1))
+    assert len(cache) == 3 and cache.size == 3 * 1024
+    cache.get('a', pytest.fail)  # A hit makes 'a' the most recently used
+    cache.get('d', lambda: _block(2))  # Needs two entries' room: 'b' and 'c' go
+    assert cache.stats() == {
+        'entries': 2, 'bytes': 3 * 1024, 'ceiling': 3 * 1024, 'hits': 1, 'misses': 4, 'evictions': 2,
+    }
+    assert cache.get('a', pytest.fail) is not None
+    built = []
+    cache.get('b', lambda: built.append(1) or _block(1))
+    assert built == [1]
+
+
+def test_value_bigger_than_the_ceiling_is_not_kept():
+    cache = BrowseCache(ceiling=1024)
+    assert len(cache.get('big', lambda: _block(2))) == 256
+    assert len(cache) == 0 and cache.size == 0 and cache.evictions == 0
+
+
+def test_off():
+    cache = BrowseCache(ceiling=0)
+    for _ in range(2):
+        cache.get('a', lambda: _block(1))
+    assert (cache.hits, cache.misses, len(cache)) == (0, 2, 0)
+
+
+def test_new_version_misses_and_clear_empties():
+    cache = BrowseCache(ceiling=1 << 20)
+    calls = []
+
+    def clinics(version):
+        calls.append(version)
+        return np.array([101, 102]), np.array(['North', 'South'], dtype=object), np.array(['Ann', None], dtype=object)
+
+    cache.get((1, 'boston'), lambda: clinics(1))
+    cache.get((1, 'boston'), lambda: clinics(1))
+    cache.get((2, 'boston'), lambda: clinics(2))  # Reloaded: the old version's entry is never hit
+    assert calls == [1, 2]
+    cache.clear()
+    assert len(cache) == 0 and cache.size == 0
+    cache.get((2, 'boston'), lambda: clinics(2))
+    assert calls == [1, 2, 2]
+    assert cache.describe().startswith('Browse cache: 1 hits, 3 misses, 0 evictions; ')
+
+
+def test_size_estimate(monkeypatch):
+    names = np.array([f'Clinic {n}' for n in range(10000)], dtype=object)
+    exact = names.nbytes + sum(map(sys.getsizeof, names.tolist()))
+    assert abs(size_of(names) - exact) / exact < 0.05
+    measured = []
+    monkeypatch.setattr(clinic_browse.sys, 'getsizeof', lambda value: measured.append(value) or 60)
+    size_of(names)
+    assert len(measured) <= clinic_browse.SIZE_SAMPLE
+    monkeypatch.undo()
+    assert size_of(np.empty(0, dtype=object)) == 0
+    ints = np.arange(10, dtype=np.int64)
+    assert size_of((ints, ints)) == sys.getsizeof((ints, ints)) + 160
+
+
+@pytest.mark.parametrize('value, expected', [('', 64 << 20), ('0', 0), ('0.5', 1 << 19), ('lots', 64 << 20)])
+def test_ceiling_from_environment(monkeypatch, value, expected):
+    monkeypatch.setenv('CLINIC_TOOL_BROWSE_CACHE_MB', value)
+    assert ceiling_bytes() == expected
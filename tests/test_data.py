@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+import clinic_data
+from clinic_data import ClinicStore, apply_schema, load_clinic_store, normalize_keys
+
+
+def test_normalize_keys_without_categories():
+    column = pd.Series([None, None], dtype=object).astype('category')
+    assert normalize_keys(column).tolist() == ['', '']
+
+
+def test_missing_and_blank_hierarchy_columns():
+    # GRP is blank and REG and Area are missing: the sheet still loads, with no browse nodes.
+    raw = pd.DataFrame({
+        'Fac#': [101, 102], 'Clinic Name': ['North', 'South'], 'GRP': [np.nan, np.nan],
+        'Traveler EIFs': ['', ''], 'TCU': ['', ''], 'Zip': ['10001', '10002'],
+    })
+    store = ClinicStore(apply_schema(raw))
+    assert len(store) == 2
+    assert store.row(102) == 1
+    assert store.hierarchy.groups == []
+
+
+def _workbook(tmp_path, monkeypatch):
+    monkeypatch.setenv('CLINIC_TOOL_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setenv('CLINIC_TOOL_SNAPSHOT', 'off')
+    path = tmp_path / 'fac.csv'
+    pd.DataFrame({
+        'Fac#': [101, 102, 103], 'Clinic Name': ['North Dialysis', 'South Dialysis', 'West'],
+        'GRP': ['East', 'East', 'West'], 'REG': ['East 1', 'East 1', 'West 2'], 'Area': ['Boston', 'Boston', 'Reno'],
+        'Clinic Manager': ['Ann Lee', 'Bo Diaz', 'Ann Lee'],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def _no_building(monkeypatch):
+    def fail(self, *args):
+        raise AssertionError('indexes were built')
+
+    for cls in clinic_data.INDEXES.values():
+        monkeypatch.setattr(cls, '__init__', fail)
+
+
+def test_parse_cache_hit_reuses_indexes(tmp_path, monkeypatch):
+    path = _workbook(tmp_path, monkeypatch)
+    first = load_clinic_store(path)
+    with monkeypatch.context() as patch:
+        _no_building(patch)
+        second = load_clinic_store(path)
+        assert second.row(102) == 1
+        assert second.search('south').tolist() == first.search('south').tolist() == [1]
+        assert second.hierarchy.areas == first.hierarchy.areas
+        assert second.people('ann lee')[2].tolist() == [2]
+
+
+def test_stale_or_damaged_indexes_are_rebuilt(tmp_path, monkeypatch):
+    path = _workbook(tmp_path, monkeypatch)
+    store = load_clinic_store(path)
+    assert clinic_data.read_indexes(path, (1, 2), len(store)) is None  # Another version of the workbook
+    assert clinic_data.read_indexes(path, store.source_stat, len(store) + 1) is None
+    with open(clinic_data._index_cache_path(path), 'wb') as f:
+        f.write(b'not an npz')
+    assert clinic_data.read_indexes(path, store.source_stat, len(store)) is None
+    assert load_clinic_store(path).row(103) == 2
+    assert clinic_data.read_indexes(path, store.source_stat, len(store)) is not None  # Saved again
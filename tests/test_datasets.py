@@ -0,0 +1,19 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import clinic_datasets
+from clinic_datasets import DatasetInfo, DatasetRegistry
+
+
+def test_cancelled_load_is_resubmitted(monkeypatch):
+    registry = DatasetRegistry('workbook.xlsx')
+    info = DatasetInfo('rates', 'rates.csv', None, 'Rates')
+    registry._infos = {info.key: info}
+    pool = ThreadPoolExecutor(1)
+    monkeypatch.setattr(registry, '_executor', lambda: pool)
+    monkeypatch.setattr(clinic_datasets, 'load_dataset', lambda info, reader: f'loaded {info.key}')
+
+    cancelled = Future()
+    cancelled.cancel()  # As close() leaves a queued load
+    registry._futures[info.key] = cancelled
+    assert registry.get(info.key, timeout=5) == 'loaded rates'
+    pool.shutdown()
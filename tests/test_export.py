@@ -0,0 +1,97 @@
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import clinic_export
+from clinic_data import ClinicStore, apply_schema
+from clinic_export import ExportCancelled, export_rows
+
+COLUMNS = ['Fac#', 'Clinic Name', 'Clinic Manager', 'Zip ']
+
+
+@pytest.fixture
+def store():
+    raw = pd.DataFrame({
+        'Fac#': [101, 102, 103],
+        'Clinic Name': ['Señora Clinic', 'A & B <Dialysis>', 'Tab\there\x0bvertical'],
+        'Clinic Manager': ['Zoë Ann', None, 'Bell\x07Ringer'],
+        'Zip ': ['02134', '10001', None],
+    })
+    return ClinicStore(apply_schema(raw))
+
+
+def _csv(path):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_csv_round_trip(store, tmp_path):
+    path = str(tmp_path / 'clinics.csv')
+    calls = []
+    assert export_rows(store, np.array([2, 0]), COLUMNS, path, lambda *args: calls.append(args)) == 2
+    assert _csv(path) == [
+        COLUMNS,
+        ['103', 'Tab\there\x0bvertical', 'Bell\x07Ringer', ''],
+        ['101', 'Señora Clinic', 'Zoë Ann', '02134'],
+    ]
+    assert calls == [('export', 0, 2), ('export', 2, 2)]
+    assert os.listdir(tmp_path) == ['clinics.csv']
+
+
+def test_xlsx_round_trip(store, tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    path = str(tmp_path / 'clinics.xlsx')
+    export_rows(store, np.arange(3), COLUMNS, path)
+    sheet = openpyxl.load_workbook(path).active
+    assert sheet.title == 'Clinics'
+    assert [list(row) for row in sheet.iter_rows(values_only=True)] == [
+        COLUMNS,
+        [101, 'Señora Clinic', 'Zoë Ann', '02134'],  # Fac# a number, the ZIP text with its zero
+        [102, 'A & B <Dialysis>', None, '10001'],
+        [103, 'Tab\therevertical', 'BellRinger', None],  # Control characters stripped; tabs are allowed
+    ]
+
+
+def test_cancel_keeps_the_existing_file(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(clinic_export, 'CHUNK_ROWS', 1)
+    for ext in ('.csv', '.xlsx'):
+        path = tmp_path / f'clinics{ext}'
+        path.write_bytes(b'the previous export')
+        checks = []
+
+        def cancelled():
+            checks.append(1)
+            return len(checks) > 2  # After two of the three chunks
+
+        with pytest.raises(ExportCancelled):
+            export_rows(store, np.arange(3), COLUMNS, str(path), cancelled=cancelled)
+        assert path.read_bytes() == b'the previous export'
+    assert sorted(os.listdir(tmp_path)) == ['clinics.csv', 'clinics.xlsx']
+
+
+def test_failed_write_leaves_no_temp_file(store, tmp_path, monkeypatch):
+    def broken(positions, columns):
+        raise KeyError('Clinic Name')
+
+    monkeypatch.setattr(store, 'column_values', broken)
+    with pytest.raises(KeyError):
+        export_rows(store, np.arange(3), COLUMNS, str(tmp_path / 'clinics.xlsx'))
+    assert os.listdir(tmp_path) == []
+
+
+def test_unsupported_format(store, tmp_path):
+    with pytest.raises(ValueError, match='.json'):
+        export_rows(store, np.arange(3), COLUMNS, str(tmp_path / 'clinics.json'))
+    assert os.listdir(tmp_path) == []
+
+
+def test_many_columns_get_two_letter_references(store, tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    path = str(tmp_path / 'wide.xlsx')
+    export_rows(store, np.arange(1), ['Fac#'] * 28, path)
+    sheet = openpyxl.load_workbook(path).active
+    assert sheet.max_column == 28
+    assert sheet['AB2'].value == 101
@@ -0,0 +1,48 @@
+import io
+
+import numpy as np
+
+from clinic_geo import GeoIndex, ZipCentroids, centroids_from_gazetteer, parse_zip
+
+GAZETTEER = (
+    'GEOID\tALAND\tAWATER\tALAND_SQMI\tAWATER_SQMI\tINTPTLAT\tINTPTLONG          \n'
+    '02118\t1\t0\t1\t0\t42.336200\t-71.070400\n'
+    '02134\t1\t0\t1\t0\t42.357500\t-71.126200\n'
+    '10001\t1\t0\t1\t0\t40.750600\t-73.997200\n'
+    '601\t1\t0\t1\t0\t18.180555\t-66.749961\n'
+)
+
+
+def _centroids():
+    table = centroids_from_gazetteer(io.StringIO(GAZETTEER))
+    return ZipCentroids(table['zip'].astype(int), table['lat'], table['lon']), table
+
+
+def test_gazetteer_conversion():
+    _, table = _centroids()
+    assert table['zip'].tolist() == ['00601', '02118', '02134', '10001']
+    assert list(table.columns) == ['zip', 'lat', 'lon']
+
+
+def test_parse_zip():
+    assert parse_zip('02118-1234') == 2118
+    assert parse_zip('2118') == 2118
+    assert parse_zip('n/a') is None
+
+
+def test_nearest_by_count_and_radius():
+    centroids, _ = _centroids()
+    # Rows 0 and 3 share a ZIP; row 4 has none and row 5 is not in the table.
+    zips = np.array(['02118', '02134', '10001', '02118', None, '99999'], dtype=object)
+    geo = GeoIndex(zips, np.arange(len(zips)), centroids)
+    assert geo.unplaced == 2
+
+    lat, lon = centroids.get('02118')
+    rows, miles = geo.nearest(lat, lon, count=3)
+    assert rows.tolist() == [0, 3, 1]  # Same ZIP in sheet order, then the next nearest
+    assert miles[0] == 0 and 2 < miles[2] < 4
+
+    rows, miles = geo.nearest(lat, lon, radius=10)
+    assert rows.tolist() == [0, 3, 1]
+    rows, _ = geo.nearest(lat, lon, radius=250)
+    assert rows.tolist() == [0, 3, 1, 2]
@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import clinic_history
+from clinic_data import ClinicStore, apply_schema, diff_stores
+
+
+@pytest.fixture(autouse=True)
+def history_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('CLINIC_TOOL_HISTORY_DIR', str(tmp_path / 'history'))
+    monkeypatch.delenv('CLINIC_TOOL_HISTORY', raising=False)
+    return tmp_path / 'history'
+
+
+def _store(rows, stat=None):
+    raw = pd.DataFrame(rows, columns=['Fac#', 'Clinic Name', 'Address', 'GRP', 'REG', 'Area'])
+    return ClinicStore(apply_schema(raw), source_stat=stat)
+
+
+OLD = [
+    (101, 'North', '1 Main St', 'East', 'East 1', 'Boston'),
+    (102, 'South', None, 'East', 'East 1', 'Boston'),
+    (103, 'West', '3 Elm St', 'West', 'West 2', 'Reno'),
+]
+NEW = [
+    (101, 'North', '9 Main St', 'East', 'East 1', 'Boston'),  # Address changed
+    (102, 'South', '', 'East', 'East 1', 'Boston'),  # Missing -> blank is no change
+    (104, 'Lakeside', '4 Lake Rd', 'West', 'West 2', 'Reno'),  # Added; 103 removed
+]
+
+
+def test_diff_stores():
+    diff = diff_stores(_store(OLD), _store(NEW))
+    assert (diff.added, diff.removed, diff.changed) == ({104}, {103}, {101})
+    assert diff.areas == {'boston', 'reno'}
+
+
+def test_diff_tables_agrees_with_diff_stores():
+    old, new = _store(OLD), _store(NEW)
+    changes = clinic_history.diff_tables(clinic_history._table(old), clinic_history._table(new))
+    assert list(changes.records()) == [
+        {'Fac#': 101, 'Clinic': 'North', 'Change': 'changed', 'Field': 'Address', 'Old': '1 Main St', 'New': '9 Main St'},
+        {'Fac#': 103, 'Clinic': 'West', 'Change': 'removed', 'Field': '', 'Old': '', 'New': ''},
+        {'Fac#': 104, 'Clinic': 'Lakeside', 'Change': 'added', 'Field': '', 'Old': '', 'New': ''},
+    ]
+    diff = diff_stores(old, new)
+    for kind, facs in (('added', diff.added), ('removed', diff.removed), ('changed', diff.changed)):
+        assert set(changes.facs[changes.kinds == kind].tolist()) == facs
+
+
+def test_moved_rows_and_several_fields():
+    old = _store(OLD)
+    new = _store([(103, 'West Side', '3 Elm St', 'West', 'West 3', 'Reno')] + OLD[:2])
+    changes = clinic_history.diff_tables(clinic_history._table(old), clinic_history._table(new))
+    assert changes.facs.tolist() == [103, 103]
+    assert changes.fields.tolist() == ['Clinic Name', 'REG']  # Sheet order
+    assert str(changes) == '0 added, 0 removed, 2 field changes in 1 clinics'
+    assert len(changes.only({'Clinic Name'})) == 1
+
+
+def test_identical_versions():
+    changes = clinic_history.diff_tables(clinic_history._table(_store(OLD)), clinic_history._table(_store(OLD)))
+    assert len(changes) == 0
+    assert diff_stores(_store(OLD), _store(OLD)).empty
+
+
+def _record_versions(source, count):
+    stores = [_store(OLD if n % 2 == 0 else NEW, stat=(1000 + n, (n + 1) * 10 ** 9)) for n in range(count)]
+    for store in stores:
+        assert clinic_history.record(store, source) is not None
+    return [store.source_stat for store in stores]
+
+
+def test_changes_since_seen(tmp_path):
+    source = str(tmp_path / 'fac.xlsx')
+    stats = _record_versions(source, 3)
+    versions, start, end, changes = clinic_history.changes_since_seen(source, stats[2], stats[0])
+    assert [version.stat for version in versions] == stats
+    assert (start, end) == (0, 2)
+    assert len(changes) == 0  # OLD, NEW, OLD
+
+    # Nothing new since the version seen, or none seen: that version over the one before.
+    assert clinic_history.changes_since_seen(source, stats[2], stats[2])[1:3] == (1, 2)
+    assert clinic_history.changes_since_seen(source, stats[2], None)[1:3] == (1, 2)
+    # The current version was not recorded: up to the latest.
+    _, start, end, changes = clinic_history.changes_since_seen(source, (1, 2), stats[1])
+    assert (start, end) == (1, 2) and len(changes) == 3
+
+
+def test_one_version_has_no_changes(tmp_path):
+    source = str(tmp_path / 'fac.xlsx')
+    stats = _record_versions(source, 1)
+    assert clinic_history.changes_since_seen(source, stats[0], None)[1:] == (-1, 0, None)
+
+
+def test_failed_record_leaves_no_temp_file(tmp_path, history_dir, monkeypatch):
+    import pyarrow.feather
+
+    def broken(table, path, **kwargs):
+        with open(path, 'wb') as f:
+            f.write(b'partial')
+        raise ValueError('cannot convert')
+
+    monkeypatch.setattr(pyarrow.feather, 'write_feather', broken)
+    source = str(tmp_path / 'fac.xlsx')
+    with pytest.raises(ValueError):
+        clinic_history.record(_store(OLD, stat=(1, 2)), source)
+    assert [name for _, _, names in os.walk(history_dir) for name in names] == []
+    assert clinic_history.versions(source) == []
+
+
+def test_record_once(tmp_path):
+    source = str(tmp_path / 'fac.xlsx')
+    store = _store(OLD, stat=(1, 2))
+    first = clinic_history.record(store, source)
+    assert clinic_history.record(store, source) == first
+    assert len(clinic_history.versions(source)) == 1
+    assert np.array_equal(clinic_history.read_version(first).column('Fac#').to_numpy(), [101, 102, 103])
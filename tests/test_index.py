@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from clinic_data import ClinicStore, FacIndex, HierarchyIndex, apply_schema
+
+
+COLUMNS = ['Fac#', 'Clinic Name', 'GRP', 'REG', 'Area', 'GVP Name', 'RVP', 'In-Center DO']
+
+
+def _store(rows):
+    return ClinicStore(apply_schema(pd.DataFrame(rows, columns=COLUMNS)))
+
+
+ROWS = [
+    (2, 'North', ' East ', 'East 1', 'Boston', 'Gia', 'Rae', 'Dot'),
+    (10, 'South', 'east', 'East 1', 'BOSTON', 'Gus', 'Ray', 'Don'),
+    (101, 'Lakeside', 'East', 'East 2', 'Quincy', 'Gia', 'Rex', None),
+    (2, 'North Annex', 'West', 'West 1', 'Reno', 'Gwen', 'Roy', 'Dee'),  # Fac# 2 again
+    (None, 'Unnumbered', 'West', 'West 1', 'Reno', 'Gwen', 'Roy', 'Dee'),
+    (1000, 'Orphan', None, None, None, None, None, None),
+]
+
+
+def test_duplicate_fac_first_row_wins():
+    index = FacIndex(pd.DataFrame({'Fac#': [7, 3, 7, 'x', 3.5, -1]}))
+    assert index.get(7) == 0 and index.get(3) == 1
+    assert index.numbers.tolist() == [7, 3, 7, -1, -1, -1]
+    assert len(index) == 2 and 7 in index and 4 not in index
+    assert index.get(-1) is None and index.get(2 ** 64) is None
+    store = _store(ROWS)
+    assert store.row(2) == 0 and store.fac_at(3) == 2 and store.fac_at(4) is None
+
+
+def test_prefix_rows_in_fac_text_order():
+    index = FacIndex(pd.DataFrame({'Fac#': [2, 10, 101, 1000, 3, 10]}))
+    assert index.prefix_rows('1').tolist() == [1, 3, 2]  # '10', '1000', '101'; the second 10 is not listed
+    assert index.prefix_rows('10', limit=2).tolist() == [1, 3]
+    assert index.prefix_rows('2').tolist() == [0]
+    assert index.prefix_rows('4').tolist() == []
+    assert index.prefix_rows('').tolist() == [1, 3, 2, 0, 4]
+    assert _store(ROWS).fac_prefix(' 1x').tolist() == []
+
+
+def test_hierarchy_nodes_and_labels():
+    hierarchy = _store(ROWS).hierarchy
+    assert hierarchy.groups == ['east', 'west']  # Case and spaces folded; blanks left out
+    assert hierarchy.regions_by_group == {'east': ['east 1', 'east 2'], 'west': ['west 1']}
+    assert hierarchy.areas_by_region == {'east 1': ['boston'], 'east 2': ['quincy'], 'west 1': ['reno']}
+    # Each label names the GVP, RVP or DO of the node's first row.
+    assert hierarchy.group_labels == {'east': 'East (GVP: Gia)', 'west': 'West (GVP: Gwen)'}
+    assert hierarchy.region_labels['east 1'] == 'East 1 (RVP: Rae)'
+    assert hierarchy.area_labels['quincy'] == 'Quincy (DO: )'
+    assert hierarchy.path(1) == ('east', 'east 1', 'boston')
+    assert hierarchy.path(5) == ('', '', '')
+
+
+def test_hierarchy_rows():
+    store = _store(ROWS)
+    hierarchy = store.hierarchy
+    assert hierarchy.clinic_rows('boston').tolist() == [0, 1]
+    assert hierarchy.clinic_rows('nowhere').tolist() == []
+    assert len(hierarchy.clinic_rows()) == len(ROWS)
+    assert hierarchy.node_rows('group', 'east').tolist() == [0, 1, 2]
+    assert hierarchy.node_rows('region', 'west 1').tolist() == [3, 4]
+    # The clinics list shows one row per Fac#, by Fac# text: row 3 repeats Fac# 2, row 4 has none.
+    assert store.node_rows('group', 'west').tolist() == [0]
+    assert store.node_rows('area', None).tolist() == [1, 5, 2, 0]  # 10, 1000, 101, 2
+
+
+def test_hierarchy_state_round_trip():
+    hierarchy = _store(ROWS).hierarchy
+    arrays, meta = hierarchy.state()
+    restored = HierarchyIndex.from_state({name: np.array(value) for name, value in arrays.items()}, meta)
+    for name in HierarchyIndex.NODES:
+        assert getattr(restored, name) == getattr(hierarchy, name)
+    for area in hierarchy.areas:
+        assert restored.clinic_rows(area).tolist() == hierarchy.clinic_rows(area).tolist()
+    assert restored.node_rows('region', 'east 1').tolist() == [0, 1]
+    assert restored.path(2) == hierarchy.path(2)
+
+
+@pytest.mark.parametrize('column', ['GRP', 'REG', 'Area'])
+def test_hierarchy_without_a_column(column):
+    hierarchy = HierarchyIndex(pd.DataFrame(ROWS, columns=COLUMNS).drop(columns=column))
+    level = {'GRP': 'groups', 'REG': 'regions', 'Area': 'areas'}[column]
+    assert getattr(hierarchy, level) == []
+    assert len(hierarchy.clinic_rows()) == len(ROWS)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from clinic_people import PeopleIndex, split_people
+
+
+@pytest.mark.parametrize('cell, keys', [
+    ('Dr. Ana B. Smith, MD', ['ana b smith']),
+    ('Smith, Ana, MD', ['ana smith']),
+    ('Smith, Ana', ['ana smith']),
+    ('Ana Smith MD RN', ['ana smith']),
+    ('Ana Smith, R.N.', ['ana smith']),
+    ('Ana Smith, Ben Lee', ['ana smith', 'ben lee']),
+    ('Ana Smith; Ben Lee (interim) / cara diaz', ['ana smith', 'ben lee', 'cara diaz']),
+    ('Ana Smith 555-123-4567 ana@example.org', ['ana smith']),
+    # Credentials that are also given names
+    ('Do Nguyen', ['do nguyen']),
+    ('Pa Vang', ['pa vang']),
+    ('Ana Do', ['ana do']),
+    ('Nguyen, DO', ['nguyen']),
+    ('Ana Smith, PA-C', ['ana smith']),
+    ('TBD', []),
+    (None, []),
+    (float('nan'), []),
+])
+def test_split_people(cell, keys):
+    assert [key for key, _ in split_people(cell)] == keys
+
+
+def test_names_keep_their_first_spelling():
+    assert split_people('Dr. Ana B. Smith, MD') == [('ana b smith', 'Ana B. Smith')]
+
+
+@pytest.fixture
+def index():
+    df = pd.DataFrame({
+        'Clinic Manager': ['Ana Smith', 'Ben Lee', 'Smith, Ana, MD', None],
+        'Medical Director': ['Do Nguyen', 'Ana Smith MD', 'Nguyen, DO', 'Pa Vang'],
+        'Ignored': ['Ana Smith'] * 4,
+    })
+    return PeopleIndex(df, ['Clinic Manager', 'Medical Director', 'Not On The Sheet'])
+
+
+def _person(index, name):
+    return int(index.find(name, 1)[0])
+
+
+def test_postings(index):
+    assert index.role_names == ['Clinic Manager', 'Medical Director']
+    ana = _person(index, 'ana smith')
+    assert index.names[ana] == 'Ana Smith'
+    rows, roles = index.postings(ana)
+    assert rows.tolist() == [0, 1, 2]
+    assert [index.role_names[role] for role in roles] == ['Clinic Manager', 'Medical Director', 'Clinic Manager']
+    assert index.clinic_counts[ana] == 3
+
+    rows, roles = index.postings(ana, roles=[1])
+    assert rows.tolist() == [1] and roles.tolist() == [1]
+    assert index.postings(ana, roles=[])[0].tolist() == []
+
+
+def test_given_names_stay_distinct(index):
+    names = set(index.names.tolist())
+    assert {'Do Nguyen', 'Nguyen', 'Pa Vang'} <= names
+    assert index.postings(_person(index, 'pa vang'))[0].tolist() == [3]
+
+
+def test_state_round_trip(index):
+    arrays, meta = index.state()
+    restored = PeopleIndex.from_state(arrays, meta)
+    assert restored.role_names == index.role_names
+    for name in PeopleIndex.ARRAYS:
+        np.testing.assert_array_equal(getattr(restored, name), getattr(index, name))
+    ana = _person(restored, 'ana smth')  # A typo finds her too
+    assert restored.names[ana] == 'Ana Smith'
+    assert restored.postings(ana)[0].tolist() == [0, 1, 2]
+
+
+def test_empty():
+    index = PeopleIndex(pd.DataFrame({'Clinic Manager': [None, 'TBD']}), ['Clinic Manager'])
+    assert len(index) == 0
+    assert len(index.find('ana')) == 0
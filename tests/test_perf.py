@@ -0,0 +1,16 @@
+from clinic_perf import PhaseTimer
+
+
+def test_startup_budget(monkeypatch):
+    monkeypatch.delenv('CLINIC_TOOL_TIMING', raising=False)
+    monkeypatch.setenv('CLINIC_TOOL_STARTUP_BUDGET', '2.5')
+    assert PhaseTimer.from_environment([]).budget == 2.5
+    assert PhaseTimer.from_environment(['tool', '--startup-budget', '4']).budget == 4.0
+
+
+def test_malformed_startup_budget_is_ignored(monkeypatch, capsys):
+    monkeypatch.delenv('CLINIC_TOOL_TIMING', raising=False)
+    monkeypatch.setenv('CLINIC_TOOL_STARTUP_BUDGET', '2,5')
+    timer = PhaseTimer.from_environment([])
+    assert timer.budget is None and not timer.enabled
+    assert '2,5' in capsys.readouterr().err
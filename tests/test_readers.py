@@ -0,0 +1,64 @@
+import datetime
+
+import pytest
+
+from clinic_data import SHEET_NAME, ClinicStore, apply_schema, check_parity, diff_stores, parse_fac_list
+from clinic_readers import ENGINES, engines_for
+
+openpyxl = pytest.importorskip('openpyxl')
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """A small Fac List with date-only and date-time cells."""
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.title = SHEET_NAME
+    sheet.append(['Fac#', 'Clinic Name', 'GRP', 'REG', 'Area', 'Traveler EIFs', 'TCU', 'Zip '])
+    sheet.append([101, 'North', 'East', 'East 1', 'Boston', datetime.date(2024, 3, 1), 'Yes', 2134])
+    sheet.append([102, 'South', 'East', 'East 1', 'Boston', datetime.datetime(2024, 3, 1, 14, 30), None, '10001'])
+    sheet.append([103, 'West', 'West', 'West 2', 'Reno', 'Pending', None, '89501'])
+    path = tmp_path / 'fac-list.xlsx'
+    book.save(path)
+    return str(path)
+
+
+def test_engines_agree(workbook):
+    assert check_parity([workbook]) == []
+
+
+def test_formats_agree(tmp_path):
+    pytest.importorskip('pyarrow')
+    from clinic_synth import generate, write
+
+    df = generate(300, seed=7)
+    paths = [str(tmp_path / f'fac-list.{ext}') for ext in ('xlsx', 'csv', 'parquet')]
+    for path in paths:
+        write(df, path)
+    assert check_parity(paths) == []
+    stores = [ClinicStore(apply_schema(parse_fac_list(path, ENGINES[engines_for(path)[0]]))) for path in paths]
+    for store in stores[1:]:
+        diff = diff_stores(stores[0], store)
+        assert (diff.added, diff.removed, diff.changed) == (set(), set(), set())
+
+
+@pytest.mark.parametrize('engine', ['openpyxl', 'calamine'])
+def test_date_cells(workbook, engine):
+    if engine not in engines_for(workbook):
+        pytest.skip(f'{engine} is not installed')
+    df = parse_fac_list(workbook, ENGINES[engine])
+    assert df['Traveler EIFs'].tolist() == ['2024-03-01', '2024-03-01 14:30:00', 'Pending']
+    assert df['Zip '].tolist() == ['02134', '10001', '89501']
+
+
+def test_parquet_dates(tmp_path):
+    pd = pytest.importorskip('pandas')
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'fac-list.parquet')
+    pd.DataFrame({
+        'Fac#': [101, 102, 103], 'Clinic Name': ['North', 'South', 'West'],
+        'Traveler EIFs': pd.Series([pd.Timestamp(2024, 3, 1), pd.Timestamp(2024, 3, 1, 14, 30), pd.NaT]),
+    }).to_parquet(path)
+    df = parse_fac_list(path, ENGINES['parquet'])
+    assert df['Traveler EIFs'].tolist()[:2] == ['2024-03-01', '2024-03-01 14:30:00']
+    assert df['Traveler EIFs'].isna().tolist()[2]
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from clinic_data import DETAIL_FIELDS, ClinicStore, apply_schema
+from clinic_render import DetailRenderer, PageCache, compile_page, value_fields
+
+FIELDS = (
+    ('Clinic Name', ('Clinic Name',)),
+    ('City, State, Zip', ('City', 'State', 'Zip '), '{}, {} {}'),
+    ('', ()),
+    ('Notes {x}', ()),
+    ('Manager', ('Clinic Manager',)),
+)
+
+
+@pytest.fixture
+def store():
+    raw = pd.DataFrame({
+        'Fac#': [101, 102],
+        'Clinic Name': ['A & B <Dialysis>', 'North {0}'],
+        'City': ['Reno', None],
+        'State': ['NV', 'MA'],
+        'Zip ': ['89501', '02134'],
+        'Clinic Manager': ['<script>alert(1)</script>', '"Bo" O\'Neil'],
+    })
+    return ClinicStore(apply_schema(raw))
+
+
+def test_compile_page():
+    template, columns = compile_page(FIELDS)
+    assert columns == ('Clinic Name', 'City', 'State', 'Zip ', 'Clinic Manager')
+    assert template.count('<tr>') == len(FIELDS)
+    assert '<b>Notes {{x}}:</b>' in template  # Braces in labels are not format fields
+    assert [field[0] for field in value_fields(FIELDS)] == ['Clinic Name', 'City, State, Zip', 'Manager']
+
+
+def test_cell_text_is_escaped(store):
+    page = DetailRenderer(FIELDS).render(store, 0)
+    assert '<td>A &amp; B &lt;Dialysis&gt;</td>' in page
+    assert '<td>Reno, NV 89501</td>' in page
+    assert '<script>' not in page and '&lt;script&gt;alert(1)&lt;/script&gt;' in page
+    assert '<b>Notes {x}:</b>' in page
+    page = DetailRenderer(FIELDS).render(store, 1)
+    assert '<td>North {0}</td>' in page  # Cell text is a value, never a format string
+    assert '<td>, MA 02134</td>' in page  # A missing cell is blank
+    assert '&quot;Bo&quot; O&#x27;Neil' in page
+
+
+def test_every_detail_field_renders(store):
+    page = DetailRenderer().render(store, 0)  # Most DETAIL_FIELDS columns are missing from this sheet
+    assert page.count('<tr>') == len(DETAIL_FIELDS)
+
+
+def test_pages_are_cached_per_version(store, monkeypatch):
+    renderer = DetailRenderer(FIELDS, capacity=1)
+    first = renderer.render(store, 0)
+    monkeypatch.setattr(store, 'row_values', lambda position, columns: pytest.fail('rendered again'))
+    assert renderer.render(store, 0) is first
+    monkeypatch.undo()
+    reloaded = ClinicStore(store.df)
+    assert reloaded.version != store.version
+    assert renderer.render(reloaded, 0) == first and len(renderer.pages) == 1
+    renderer.render(reloaded, 1)
+    assert renderer.pages.get((101, reloaded.version)) is None  # Evicted: capacity 1
+
+
+def test_page_cache_evicts_least_recently_used():
+    cache = PageCache(capacity=2)
+    cache.put('a', 'A')
+    cache.put('b', 'B')
+    assert cache.get('a') == 'A'
+    cache.put('c', 'C')
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == ('A', None, 'C')
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+import clinic_replica
+from clinic_replica import Replica, ReplicaError
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'share' / 'fac.xlsx'
+    path.parent.mkdir()
+    path.write_bytes(b'first version')
+    return str(path)
+
+
+def _replica(source, tmp_path):
+    return Replica(source, root=str(tmp_path / 'replica'))
+
+
+def test_sync_copies_the_source(source, tmp_path):
+    replica = _replica(source, tmp_path)
+    assert not replica.available()
+    assert replica.sync()
+    with open(replica.path, 'rb') as f:
+        assert f.read() == b'first version'
+    assert os.stat(replica.path).st_mtime_ns == os.stat(source).st_mtime_ns
+    with open(os.path.join(replica.directory, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['sha256'] == clinic_replica._digest(source)
+    assert _replica(source, tmp_path).available()  # The manifest is read back
+
+
+def test_unchanged_source_is_not_copied_again(source, tmp_path, monkeypatch):
+    replica = _replica(source, tmp_path)
+    replica.sync()
+    replica.manifest['checked'] -= 600
+    monkeypatch.setattr(clinic_replica, '_digest', lambda path: pytest.fail('hashed an unchanged source'))
+    assert not replica.sync()
+    assert replica.describe().endswith('checked just now')
+
+
+def test_unreachable_source_keeps_the_copy(source, tmp_path):
+    replica = _replica(source, tmp_path)
+    replica.sync()
+    os.remove(source)
+    with pytest.raises(ReplicaError):
+        replica.sync()
+    assert replica.available()
+    assert replica.manifest['error'].startswith('Cannot reach')
+    assert 'share unreachable' in replica.describe()
+
+
+def test_source_changed_during_copy(source, tmp_path):
+    replica = _replica(source, tmp_path)
+    replica.sync()
+    with open(source, 'wb') as f:
+        f.write(b'second version')
+
+    def append(copied, total):
+        if copied == total:
+            with open(source, 'ab') as f:
+                f.write(b' and more')
+
+    with pytest.raises(ReplicaError, match='changed while'):
+        replica.sync(append)
+    with open(replica.path, 'rb') as f:
+        assert f.read() == b'first version'
+    assert sorted(os.listdir(replica.directory)) == ['fac.xlsx', 'manifest.json']
+
+
+def test_second_read_that_differs_rejects_the_copy(source, tmp_path, monkeypatch):
+    replica = _replica(source, tmp_path)
+    replica.sync()
+    with open(source, 'wb') as f:
+        f.write(b'second version')
+    monkeypatch.setattr(clinic_replica, '_digest', lambda path: '0' * 64)  # Rewritten in place, same size and mtime
+    with pytest.raises(ReplicaError, match='read differently'):
+        replica.sync()
+    with open(replica.path, 'rb') as f:
+        assert f.read() == b'first version'
+    assert sorted(os.listdir(replica.directory)) == ['fac.xlsx', 'manifest.json']
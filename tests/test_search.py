@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from clinic_search import EXACT, ONE_EDIT, PREFIX, SearchIndex, tokenize, trigrams, within_one_edit
+
+FIELDS = {'Clinic Name': 3.0, 'City': 1.0}
+
+
+@pytest.fixture
+def index():
+    df = pd.DataFrame({
+        'Clinic Name': ['Reno Dialysis', 'Renown Kidney Center', 'Boston North', 'Boston South', None],
+        'City': ['Reno', 'Reno', 'Boston', 'Quincy', 'Reno'],
+    })
+    return SearchIndex(df, FIELDS)
+
+
+@pytest.mark.parametrize('a, b, expected', [
+    ('reno', 'reno', True),
+    ('reno', 'rena', True),  # substitution
+    ('reno', 'ren', True),  # deletion
+    ('reno', 'renoo', True),  # insertion
+    ('reno', 'rneo', True),  # adjacent swap
+    ('reno', 'rnoe', False),
+    ('reno', 'rant', False),  # two substitutions
+    ('reno', 're', False),
+])
+def test_within_one_edit(a, b, expected):
+    assert within_one_edit(a, b) is expected
+    assert within_one_edit(b, a) is expected
+
+
+def test_exact_match_ranks_first(index):
+    rows, scores = index.search('reno')
+    assert rows[0] == 0  # Name and city both say Reno
+    assert set(rows.tolist()) == {0, 1, 4}
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_prefix_and_typo(index):
+    assert index.matches('bost') == {index.words.tolist().index('boston'): PREFIX}
+    found = index.matches('rena')  # Too few shared trigrams for a fuzzy match; one edit from 'reno'
+    assert found[index.words.tolist().index('reno')] == ONE_EDIT
+    assert index.search('bostn north')[0].tolist() == [2]
+
+
+def test_every_word_must_match_first(index):
+    rows, _ = index.search('boston south')
+    assert rows.tolist() == [3]
+    rows, _ = index.search('boston nowhere')  # No row has both: rows with the most matched words
+    assert sorted(rows.tolist()) == [2, 3]
+
+
+def test_limit(index):
+    assert len(index.search('reno', limit=2)[0]) == 2
+
+
+@pytest.mark.parametrize('query', ['', '   ', '!!', 'zzzzzz'])
+def test_nothing_to_find(index, query):
+    rows, scores = index.search(query)
+    assert len(rows) == 0 and len(scores) == 0
+
+
+def test_empty_frame():
+    index = SearchIndex(pd.DataFrame({'Clinic Name': pd.Series([], dtype=object)}), FIELDS)
+    assert len(index.words) == 0
+    assert len(index.search('reno')[0]) == 0
+
+
+def test_postings_keep_the_heaviest_field(index):
+    word = index.words.tolist().index('reno')
+    start, end = index.offsets[word], index.offsets[word + 1]
+    postings = dict(zip(index.rows[start:end].tolist(), index.weights[start:end].tolist()))
+    assert postings == {0: 3.0, 1: 1.0, 4: 1.0}
+    assert index.offsets[-1] == len(index.rows) == len(index.weights)
+
+
+def test_trigram_csr(index):
+    words = index.words.tolist()
+    assert words == sorted(words)
+    assert np.all(np.diff(index.gram_offsets) > 0)
+    assert index.gram_offsets[-1] == len(index.gram_words)
+    for word_id, word in enumerate(words):
+        assert index.gram_counts[word_id] == len(trigrams(word))
+        assert index.word_lengths[word_id] == len(word)
+        for gram in trigrams(word):
+            assert word_id in index._gram_words(gram).tolist()
+    assert index._gram_words('xyz') is None
+
+
+def test_state_round_trip(index):
+    arrays, meta = index.state()
+    restored = SearchIndex.from_state({name: np.array(value) for name, value in arrays.items()}, meta)
+    for query in ('reno', 'bostn', 'kidney center', ''):
+        expected, actual = index.search(query), restored.search(query)
+        assert expected[0].tolist() == actual[0].tolist()
+        assert np.allclose(expected[1], actual[1])
+    assert restored.matches('reno') == index.matches('reno')
+
+
+def test_tokenize():
+    assert tokenize("St. Mary's_Clinic #2") == ['st', 'mary', 's', 'clinic', '2']
+    assert EXACT > PREFIX > ONE_EDIT
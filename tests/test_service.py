@@ -0,0 +1,113 @@
+import http.server
+import json
+import threading
+
+import pandas as pd
+import pytest
+
+import clinic_service
+from clinic_service import ClinicService, connect, make_server
+
+
+def _write(path, names):
+    pd.DataFrame({
+        'Fac#': range(101, 101 + len(names)), 'Clinic Name': names,
+        'GRP': 'East', 'REG': 'North', 'Area': 'Metro',
+    }).to_csv(path, index=False)
+
+
+def _start(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('CLINIC_TOOL_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setenv('CLINIC_TOOL_SERVICE_TOKEN', str(tmp_path / 'service.token'))
+    for name in ('CLINIC_TOOL_SNAPSHOT', 'CLINIC_TOOL_HISTORY', 'CLINIC_TOOL_REPLICA'):
+        monkeypatch.setenv(name, 'off')
+    return tmp_path
+
+
+@pytest.fixture
+def service(environment, monkeypatch):
+    workbook = str(environment / 'fac.csv')
+    _write(workbook, ['North Clinic', 'South Clinic', 'East Clinic'])
+    service = ClinicService(workbook)
+    server = _start(make_server(service, port=0, workers=2))
+    monkeypatch.setenv('CLINIC_TOOL_SERVICE', f'127.0.0.1:{server.server_address[1]}')
+    yield service
+    server.shutdown()
+    server.server_close()
+
+
+def test_round_trip(service):
+    store = connect(service.path)
+    assert store is not None and len(store) == 3
+    assert store.row(102) == 1
+    assert store.fac_at(2) == 103
+    assert store.version == service.store.version
+    assert store.search('south', 5).tolist() == [1]
+
+
+def test_other_workbook_is_not_served(service, environment):
+    assert connect(str(environment / 'other.csv')) is None
+
+
+def test_wrong_token_is_refused(service, environment):
+    (environment / 'service.token').write_bytes(b'not the token')
+    assert connect(service.path) is None
+
+
+def test_stale_version_moves_to_the_current_one(service, monkeypatch):
+    store = connect(service.path)
+    old_version = store.version
+    _write(service.path, ['North Clinic', 'South Clinic', 'East Clinic', 'West Clinic'])
+    service.store.source_stat = None  # Whatever the file system's timestamp resolution
+    service.refresh()
+    assert service.store.version != old_version
+    assert store.row(104) is None  # The previous version still answers
+
+    monkeypatch.setattr(clinic_service, 'KEEP_PREVIOUS', 0)
+    assert store.row(104) == 3  # 409, then the query is asked of the current version
+    assert store.version == service.store.version and len(store) == 4
+    new, diff = store.refresh()
+    assert new is not store and diff is None
+    assert new.version == service.store.version
+
+
+class _Impostor(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        data = json.dumps({'version': 'x', 'rows': 1, 'source_stat': None}).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_other_server_on_the_port(environment, monkeypatch):
+    clinic_service.create_token()
+    server = _start(http.server.HTTPServer(('127.0.0.1', 0), _Impostor))
+    monkeypatch.setenv('CLINIC_TOOL_SERVICE', f'127.0.0.1:{server.server_address[1]}')
+    try:
+        assert connect(str(environment / 'fac.csv')) is None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize('value', ['localhost:http', 'localhost', 'off'])
+def test_malformed_or_disabled_address(environment, monkeypatch, value):
+    clinic_service.create_token()
+    monkeypatch.setenv('CLINIC_TOOL_SERVICE', value)
+    assert connect(str(environment / 'fac.csv')) is None
+
+
+def test_no_token_file_means_no_service(environment):
+    assert clinic_service.read_token() is None
+    assert connect(str(environment / 'fac.csv')) is None
@@ -0,0 +1,64 @@
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import clinic_snapshot
+from clinic_data import ClinicStore, apply_schema
+
+STAT = (1234, 5678)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv('CLINIC_TOOL_SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    monkeypatch.delenv('CLINIC_TOOL_SNAPSHOT', raising=False)
+    raw = pd.DataFrame({'Fac#': [101, 102], 'Clinic Name': ['North', 'South'], 'GRP': ['East', 'West']})
+    return ClinicStore(apply_schema(raw), source_stat=STAT)
+
+
+def _directory(source):
+    return os.path.join(clinic_snapshot._source_dir(source), clinic_snapshot._version_name(STAT))
+
+
+def test_publish_and_open(store, tmp_path):
+    source = str(tmp_path / 'fac.xlsx')
+    assert clinic_snapshot.publish(store, source) is not None
+    assert clinic_snapshot.open_snapshot(source, STAT).row(102) == 1
+
+
+def test_transient_error_keeps_snapshot(store, tmp_path, monkeypatch):
+    source = str(tmp_path / 'fac.xlsx')
+    clinic_snapshot.publish(store, source)
+
+    def locked(directory):
+        raise PermissionError('sharing violation')
+
+    monkeypatch.setattr(clinic_snapshot, '_open', locked)
+    assert clinic_snapshot.open_snapshot(source, STAT) is None
+    assert os.path.exists(os.path.join(_directory(source), 'meta.json'))
+
+
+def test_damaged_snapshot_is_discarded(store, tmp_path):
+    source = str(tmp_path / 'fac.xlsx')
+    clinic_snapshot.publish(store, source)
+    with open(os.path.join(_directory(source), 'meta.json'), 'w') as f:
+        f.write('{not json')
+    assert clinic_snapshot.open_snapshot(source, STAT) is None
+    assert not os.path.exists(_directory(source))
+
+
+def test_failed_write_leaves_no_staging(store, tmp_path, monkeypatch):
+    import pyarrow as pa
+
+    source = str(tmp_path / 'fac.xlsx')
+
+    def broken(store, source, directory):
+        raise pa.ArrowInvalid('cannot convert column')
+
+    monkeypatch.setattr(clinic_snapshot, '_write', broken)
+    assert clinic_snapshot.publish(store, source) is None
+    parent = clinic_snapshot._source_dir(source)
+    assert not [name for name in os.listdir(parent) if name.startswith('.publish-')]